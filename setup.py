@@ -160,6 +160,7 @@ setup(
     # projects.
     extras_require={  # Optional
         'dist': ['build'],
+        'fast': ['orjson; python_version >= "3.8"'],
         'lint': ['pylint', 'flake8', 'mypy'],
         'test': ['pytest', 'coverage', 'pytest-cov', 'pytest-mock', 'attrs'],
     },
@@ -18,6 +18,8 @@
 
 import os
 
+from future.utils import raise_from
+
 from objdictgen.node import Node, ImportProfile, Find
 from objdictgen.nodemanager import NodeManager
 from objdictgen.maps import OD
@@ -38,6 +40,26 @@ if odgdir:
 
 JSON_SCHEMA = os.path.join(SCRIPT_DIRECTORY, 'schema', 'od.schema.json')
 
+# Fixed time, in seconds since the epoch, used for the timestamps in the
+# generated files instead of the current time. Used for reproducible output,
+# see https://reproducible-builds.org/specs/source-date-epoch/
+SOURCE_DATE_EPOCH = os.environ.get('SOURCE_DATE_EPOCH')
+
+
+def source_date_epoch():
+    ''' Return SOURCE_DATE_EPOCH as an int, or None if it is not set. Raises
+        ValueError if it is not an integer.
+    '''
+    if SOURCE_DATE_EPOCH is None or SOURCE_DATE_EPOCH == '':
+        return None
+    try:
+        return int(SOURCE_DATE_EPOCH)
+    except ValueError:
+        raise_from(ValueError(
+            "SOURCE_DATE_EPOCH must be an integer number of seconds, "
+            "not '{}'".format(SOURCE_DATE_EPOCH)), None)
+
+
 __all__ = [
     "Node",
     "ImportProfile",
@@ -18,12 +18,16 @@
 
 from __future__ import absolute_import
 from pprint import pformat
+import os
+import io
 import sys
+import shlex
 import getopt
 import argparse
 import functools
 import logging
-import attr
+import traceback
+from contextlib import contextmanager
 from colorama import init, Fore, Style
 
 import objdictgen
@@ -38,10 +42,12 @@ log.setLevel(logging.INFO)
 log.addHandler(logging.StreamHandler(sys.stdout))
 
 
-@attr.s
 class DebugOpts(object):
     ''' Options for main to control the debug_wrapper '''
-    show_debug = attr.ib(default=False)
+    # NOTE: Not using attr here, as it is slow to import
+
+    def __init__(self, show_debug=False):
+        self.show_debug = show_debug
 
     def set_debug(self, dbg):
         self.show_debug = dbg
@@ -83,6 +89,166 @@ def open_od(fname, validate=True, fix=False):
         raise
 
 
+def output_files(filepath, filetype):
+    ''' Return the list of files written when the OD is saved as filepath '''
+    if filetype == 'c':
+        filebase = os.path.splitext(filepath)[0]
+        return [filepath, filebase + '.h', filebase + '_objectdefines.h']
+    return [filepath]
+
+
+def write_depfile(depfile, targets, deps):
+    ''' Write a Makefile dependency file with the rule targets: deps. Each
+        dependency gets an empty rule, so make doesn't fail if it is removed.
+    '''
+    def _escape(path):
+        return path.replace('$', '$$').replace('#', '\\#').replace(' ', '\\ ')
+
+    with open(depfile, 'w') as f:
+        f.write("{}: {}\n".format(
+            " ".join(_escape(t) for t in targets),
+            " \\\n  ".join(_escape(d) for d in deps),
+        ))
+        for dep in deps:
+            f.write("\n{}:\n".format(_escape(dep)))
+
+
+def read_manifest(manifest):
+    ''' Return the list of convert arguments in the manifest file. Empty
+        lines and lines starting with # are skipped.
+    '''
+    with open(manifest, 'r') as f:
+        return [
+            shlex.split(line) for line in f
+            if line.strip() and not line.lstrip().startswith('#')
+        ]
+
+
+def batch_init():
+    ''' Initializer of the batch worker processes '''
+    # Compile the profiles once for all conversions in the worker
+    for base in objdictgen.PROFILE_DIRECTORIES:
+        if os.path.isdir(base):
+            for fname in sorted(os.listdir(base)):
+                if fname.endswith('.prf'):
+                    objdictgen.node.CompileProfile(os.path.join(base, fname))
+
+
+def batch_convert(args):
+    ''' Run one convert command with args in a batch worker. Returns the
+        exit code and the output of the command.
+    '''
+    try:
+        return run_main(['convert'] + args)
+    except Exception:  # pylint: disable=broad-except
+        # With -D the error is raised instead of being printed. It must only
+        # fail this conversion.
+        return 1, traceback.format_exc()
+
+
+def run_main(args):
+    ''' Run main() with args and capture the output. Used when main() is
+        called repeatedly in the same process. Returns the exit code and the
+        output of the command.
+    '''
+    out = io.StringIO()
+    handlers = [h for h in log.handlers if isinstance(h, logging.StreamHandler)]
+    saved = (sys.stdout, sys.stderr, [h.stream for h in handlers], log.level,
+             objdictgen.SOURCE_DATE_EPOCH)
+    sys.stdout = sys.stderr = out
+    for h in handlers:
+        h.stream = out
+    try:
+        main(args)  # pylint: disable=no-value-for-parameter
+        code = 0
+    except SystemExit as exc:
+        code = exc.code if isinstance(exc.code, int) else 1
+    finally:
+        # The process is reused, so the global state must be restored
+        sys.stdout, sys.stderr, streams, level, objdictgen.SOURCE_DATE_EPOCH = saved
+        for h, stream in zip(handlers, streams):
+            h.stream = stream
+        log.setLevel(level)
+    return code, out.getvalue()
+
+
+@contextmanager
+def reproducible_time(enable):
+    ''' Use the fixed time 0 in the timestamps if enable is set and
+        SOURCE_DATE_EPOCH is not set
+    '''
+    saved = objdictgen.SOURCE_DATE_EPOCH
+    if enable and objdictgen.source_date_epoch() is None:
+        objdictgen.SOURCE_DATE_EPOCH = 0
+    try:
+        yield
+    finally:
+        objdictgen.SOURCE_DATE_EPOCH = saved
+
+
+def run_batch(manifest, jobs=None):
+    ''' Run the conversions in the manifest in a process pool. The output is
+        printed in the order of the manifest, followed by a report of the
+        failed conversions. Returns the exit code.
+    '''
+    import concurrent.futures  # pylint: disable=import-outside-toplevel
+
+    batch = read_manifest(manifest)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=batch_init) as executor:
+        results = list(executor.map(batch_convert, batch))
+
+    failed = []
+    for args, (code, output) in zip(batch, results):
+        sys.stdout.write(output)
+        if code:
+            lines = output.splitlines() or ['exit code {}'.format(code)]
+            failed.append((args, lines[-1]))
+
+    if failed:
+        print("{}{}: {} of {} conversions failed:{}".format(
+            Fore.RED, objdictgen.ODG_PROGRAM, len(failed), len(batch), Style.RESET_ALL))
+        for args, error in failed:
+            print("    {}: {}".format(" ".join(args), error))
+        return 1
+    return 0
+
+
+def run_server(sockpath, args):
+    ''' Run the command on the odg server. Returns the exit code, or None if
+        the command must be run locally.
+    '''
+    from objdictgen import server  # pylint: disable=import-outside-toplevel
+
+    command = next((a for a in args if not a.startswith('-')), None)
+    if command is None or command in server.LOCAL_COMMANDS:
+        return None
+    try:
+        code, output = server.request(sockpath, args)
+    except (OSError, IOError, ValueError, KeyError) as exc:
+        # ValueError and KeyError are invalid replies from the server
+        log.debug("Unable to use odg server '%s': %s" % (sockpath, exc))
+        return None
+    sys.stdout.write(output)
+    return code
+
+
+def od_files(paths):
+    ''' Return the list of OD files, where the OD files in the directories
+        of paths are included
+    '''
+    filepaths = []
+    for path in paths:
+        if os.path.isdir(path):
+            filepaths.extend(sorted(
+                os.path.join(path, fn) for fn in os.listdir(path)
+                if os.path.splitext(fn)[1] in ('.json', '.od', '.eds')
+            ))
+        else:
+            filepaths.append(path)
+    return filepaths
+
+
 def print_diffs(diffs, show=False):
 
     def _pprint(text):
@@ -90,7 +256,8 @@ def print_diffs(diffs, show=False):
             print("       ", line)
 
     def _printlines(entries):
-        for chtype, change, path in entries:
+        for change in entries:
+            chtype, path = change.chtype, change.path
             if 'removed' in chtype:
                 print("<<<     {} only in LEFT".format(path))
                 if show:
@@ -102,7 +269,29 @@ def print_diffs(diffs, show=False):
             elif 'changed' in chtype:
                 print("<< - >> {} value changed from '{}' to '{}'".format(path, change.t1, change.t2))
             else:
-                print("{}{} {} {}{}".format(Fore.RED, chtype, path, change, Style.RESET_ALL))
+                print("{}{} {} {} {}{}".format(Fore.RED, chtype, path, change.t1, change.t2, Style.RESET_ALL))
+
+    rest = diffs.pop('', None)
+    if rest:
+        print("{}Changes:{}".format(Fore.GREEN, Style.RESET_ALL))
+        _printlines(rest)
+
+    for index in sorted(diffs):
+        print("{0}Index 0x{1:04x} ({1}){2}".format(Fore.GREEN, index, Style.RESET_ALL))
+        _printlines(diffs[index])
+
+
+def print_corpus_diffs(diffs):
+
+    def _printlines(entries):
+        for change in entries:
+            filepath = change.keys[0]
+            if 'removed' in change.chtype:
+                print("<<<     only in LEFT, missing in '{}'".format(filepath))
+            elif 'added' in change.chtype:
+                print("    >>> only in '{}'".format(filepath))
+            else:
+                print("<< - >> '{}' differs".format(filepath))
 
     rest = diffs.pop('', None)
     if rest:
@@ -118,6 +307,12 @@ def print_diffs(diffs, show=False):
 def main(debugopts, args=None):
     ''' Main command dispatcher '''
 
+    # Run the command line on the odg server if it is set up
+    if args is None and os.environ.get('ODG_SERVER'):
+        code = run_server(os.environ['ODG_SERVER'], sys.argv[1:])
+        if code is not None:
+            sys.exit(code)
+
     parser = argparse.ArgumentParser(
         prog=objdictgen.ODG_PROGRAM,
         description="""
@@ -139,7 +334,8 @@ def main(debugopts, args=None):
     opt_debug = dict(action='store_true', help="Debug: enable tracebacks on errors")
     opt_od = dict(metavar='od', default=None, help="Object dictionary")
 
-    parser.add_argument('--version', action='version', version='%(prog)s ' + objdictgen.ODG_VERSION)
+    parser.add_argument('--version', action='version', version='%(prog)s ' + objdictgen.ODG_VERSION
+                        + ' (json backend: ' + jsonod.JSON_BACKEND + ')')
     parser.add_argument('-D', '--debug', **opt_debug)
 
     # -- HELP --
@@ -153,17 +349,23 @@ def main(debugopts, args=None):
     subp = subparser.add_parser('convert', help='''
         Generate
     ''', **kw)
-    subp.add_argument('od', **opt_od)
-    subp.add_argument('out', default=None, help="Output file")
+    subp.add_argument('od', nargs="?", **opt_od)
+    subp.add_argument('out', nargs="?", default=None, help="Output file")
     subp.add_argument('-i', '--index', action="append", help="OD Index to include. Filter out the rest.")
     subp.add_argument('-x', '--exclude', action="append", help="OD Index to exclude.")
     subp.add_argument('-f', '--fix', action="store_true",
                       help="Fix any inconsistency errors in OD before generate output")
-    subp.add_argument('-t', '--type', choices=['od', 'eds', 'json', 'c'], help="Select output file type")
+    subp.add_argument('-t', '--type', choices=['od', 'eds', 'json', 'c', 'snap'], help="Select output file type")
     subp.add_argument('--drop-unused', action="store_true", help="Remove unused parameters")
     subp.add_argument('--internal', action="store_true", help="Store in internal format (json only)")
     subp.add_argument('--nosort', action="store_true", help="Don't order of parameters in output OD")
     subp.add_argument('--novalidate', action="store_true", help="Don't validate files before conversion")
+    subp.add_argument('--reproducible', action="store_true", help="Use SOURCE_DATE_EPOCH or a fixed time in timestamps")
+    subp.add_argument('--skip-unchanged', action="store_true", help="Don't rewrite output files with unchanged content")
+    subp.add_argument('--depfile', help="Write a Makefile dependency file of the files read")
+    subp.add_argument('--batch', metavar='manifest',
+                      help="Run the conversions in the manifest, one line of convert arguments each")
+    subp.add_argument('-j', '--jobs', type=int, default=None, help="Number of processes used by --batch")
     subp.add_argument('-D', '--debug', **opt_debug)
 
     # -- DIFF --
@@ -173,9 +375,13 @@ def main(debugopts, args=None):
     ''', **kw)
     subp.add_argument('od1', **opt_od)
     subp.add_argument('od2', **opt_od)
+    subp.add_argument('odn', nargs="*", metavar='od', help="More object dictionaries (--many)")
+    subp.add_argument('--many', action="store_true", help="Compare od2 and more files or directories with od1")
+    subp.add_argument('-j', '--jobs', type=int, default=None, help="Number of processes used by --many")
     subp.add_argument('--internal', action="store_true", help="Diff internal object")
     subp.add_argument('--novalidate', action="store_true", help="Don't validate input files before diff")
     subp.add_argument('--show', action="store_true", help="Show difference data")
+    subp.add_argument('-q', '--quiet', '--brief', action="store_true", help="Only report if the files differ")
     subp.add_argument('-D', '--debug', **opt_debug)
 
     # -- EDIT --
@@ -207,6 +413,13 @@ def main(debugopts, args=None):
     subp.add_argument('dir', nargs="?", help="Project directory")
     subp.add_argument('-D', '--debug', **opt_debug)
 
+    # -- SERVE --
+    subp = subparser.add_parser('serve', help='''
+        Run commands from clients. Set ODG_SERVER to the socket to use it.
+    ''')
+    subp.add_argument('socket', help="Unix socket to listen on")
+    subp.add_argument('-D', '--debug', **opt_debug)
+
     # -- NODELIST --
     subp = subparser.add_parser('nodelist', help='''
         List project nodes
@@ -224,6 +437,11 @@ def main(debugopts, args=None):
     if opts.debug:
         debugopts.set_debug(opts.debug)
 
+    # Check SOURCE_DATE_EPOCH before it is used in the output
+    try:
+        objdictgen.source_date_epoch()
+    except ValueError as exc:
+        parser.error(str(exc))
 
     # -- HELP command --
     if opts.command == "help":
@@ -241,40 +459,61 @@ def main(debugopts, args=None):
     # -- CONVERT command --
     if opts.command in ("convert", "conv", "gen"):
 
-        od = open_od(opts.od, fix=opts.fix)
-
-        to_remove = set()
-
-        # Drop excluded parameters
-        if opts.exclude:
-            to_remove |= set(jsonod.str_to_number(i) for i in opts.exclude)
-
-        # Drop unused parameters
-        if opts.drop_unused:
-            to_remove |= set(od.GetUnusedParameters())
-
-        # Drop all other indexes than specified
-        if opts.index:
-            index = [jsonod.str_to_number(i) for i in opts.index]
-            to_remove |= (set(od.GetAllParameters()) - set(index))
-
-        # Have any parameters to delete?
-        if to_remove:
-            print("Removed parameters:")
-            info = [
-                od.GetPrintLine(k, unused=True)
-                for k in sorted(to_remove)
-            ]
-            for index in to_remove:
-                od.RemoveIndex(index)
-            for line, fmt in info:
-                print(line.format(**fmt))
-
-        # Write the data
-        od.DumpFile(opts.out,
-            filetype=opts.type, sort=not opts.nosort,
-            internal=opts.internal, validate=not opts.novalidate
-        )
+        if opts.batch:
+            if sys.version_info[0] < 3:
+                parser.error("--batch does not work with python 2")
+            if opts.od or opts.out:
+                parser.error("od and out cannot be used with --batch")
+            parser.exit(run_batch(opts.batch, jobs=opts.jobs))
+
+        if not opts.od or not opts.out:
+            parser.error("the following arguments are required: od, out")
+
+        # Record the files read, for the dependency file
+        with reproducible_time(opts.reproducible), \
+                objdictgen.node.RecordInputFiles() as inputs:
+
+            od = open_od(opts.od, fix=opts.fix)
+
+            to_remove = set()
+
+            # Drop excluded parameters
+            if opts.exclude:
+                to_remove |= set(jsonod.str_to_number(i) for i in opts.exclude)
+
+            # Drop unused parameters
+            if opts.drop_unused:
+                to_remove |= set(od.GetUnusedParameters())
+
+            # Drop all other indexes than specified
+            if opts.index:
+                index = [jsonod.str_to_number(i) for i in opts.index]
+                to_remove |= (set(od.GetAllParameters()) - set(index))
+
+            # Have any parameters to delete?
+            if to_remove:
+                print("Removed parameters:")
+                info = [
+                    od.GetPrintLine(k, unused=True)
+                    for k in sorted(to_remove)
+                ]
+                for index in to_remove:
+                    od.RemoveIndex(index)
+                for line, fmt in info:
+                    print(line.format(**fmt))
+
+            # Write the data
+            changed = od.DumpFile(opts.out,
+                filetype=opts.type, sort=not opts.nosort,
+                internal=opts.internal, validate=not opts.novalidate,
+                skip_unchanged=opts.skip_unchanged,
+            )
+
+        if opts.depfile:
+            write_depfile(opts.depfile, output_files(opts.out, opts.type), inputs)
+
+        if not changed:
+            print("'{}' unchanged".format(opts.out))
 
 
     # -- DIFF command --
@@ -282,12 +521,31 @@ def main(debugopts, args=None):
         if sys.version_info[0] < 3:
             parser.error("diff does not work with python 2")
 
+        if opts.many:
+            filepaths = [opts.od1] + od_files([opts.od2] + opts.odn)
+            diffs = jsonod.diff_corpus(
+                filepaths, as_dict=not opts.internal,
+                validate=not opts.novalidate, processes=opts.jobs,
+            )
+            files = set(change.keys[0] for changes in diffs.values() for change in changes)
+
+            errcode = 1 if files else 0
+            print("{}: {} of {} files differ from '{}'".format(
+                objdictgen.ODG_PROGRAM, len(files), len(filepaths) - 1, opts.od1))
+
+            if not opts.quiet:
+                print_corpus_diffs(diffs)
+            parser.exit(errcode)
+
+        if opts.odn:
+            parser.error("--many is required to compare more than two files")
+
         od1 = open_od(opts.od1, validate=not opts.novalidate)
         od2 = open_od(opts.od2, validate=not opts.novalidate)
 
         diffs = jsonod.diff_nodes(
             od1, od2, as_dict=not opts.internal,
-            validate=not opts.novalidate,
+            validate=not opts.novalidate, brief=opts.quiet,
         )
 
         if diffs:
@@ -297,7 +555,8 @@ def main(debugopts, args=None):
             errcode = 0
             print("{}: '{}' and '{}' are equal".format(objdictgen.ODG_PROGRAM, opts.od1, opts.od2))
 
-        print_diffs(diffs, show=opts.show)
+        if not opts.quiet:
+            print_diffs(diffs, show=opts.show)
         parser.exit(errcode)
 
 
@@ -379,6 +638,22 @@ def main(debugopts, args=None):
         uimain(opts.dir)
 
 
+    # -- SERVE command --
+    elif opts.command == "serve":
+
+        from objdictgen import server  # pylint: disable=import-outside-toplevel
+
+        if not hasattr(server.socket, 'AF_UNIX'):
+            parser.error("Unix sockets are not supported on this platform")
+
+        try:
+            server.serve(opts.socket, run_main)
+        except ValueError as exc:
+            parser.error(str(exc))
+        except KeyboardInterrupt:
+            pass
+
+
     # -- NODELIST command --
     elif opts.command == "nodelist":
 
@@ -0,0 +1,97 @@
+""" Concise DCF encoding and decoding """
+#
+#    Copyright (C) 2022-2023  Svein Seldal, Laerdal Medical AS
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301
+#    USA
+
+# The concise DCF is the configuration of a slave node stored in the DOMAIN
+# entry 0x1F22 of the master, one subindex per slave node id. The layout is
+# (little endian):
+#   uint32     Number of entries
+# followed by each entry:
+#   uint16     Index
+#   uint8      Subindex
+#   uint32     Size of the value in bytes
+#   size bytes Value
+
+from __future__ import absolute_import
+
+import struct
+from future.utils import raise_from
+
+from objdictgen.node import DomainToBytes, BytesToDomain
+
+COUNT = struct.Struct('<I')
+ENTRY = struct.Struct('<HBI')
+
+
+def EncodeEntries(entries):
+    """ Return the concise DCF data, without the number of entries, of the
+        (index, subindex, size, value) entries
+    """
+    data = bytearray()
+    for index, subindex, size, value in entries:
+        data += ENTRY.pack(index, subindex, size)
+        data += bytearray((value >> (8 * i)) & 0xFF for i in range(size))
+    return data
+
+
+def EncodeConciseDCF(entries):
+    """ Return the concise DCF DOMAIN value of the list of
+        (index, subindex, size, value) entries
+    """
+    entries = list(entries)
+    return BytesToDomain(COUNT.pack(len(entries)) + EncodeEntries(entries))
+
+
+def DecodeConciseDCF(value):
+    """ Return the list of (index, subindex, size, value) entries of the
+        concise DCF DOMAIN value
+    """
+    if not value:
+        return []
+    data = DomainToBytes(value)
+    try:
+        count, = COUNT.unpack_from(data)
+        offset = COUNT.size
+        entries = []
+        for _ in range(count):
+            index, subindex, size = ENTRY.unpack_from(data, offset)
+            offset += ENTRY.size
+            if offset + size > len(data):
+                raise struct.error("value exceeds the data")
+            value = 0
+            for i, byte in enumerate(bytearray(data[offset:offset + size])):
+                value |= byte << (8 * i)
+            offset += size
+            entries.append((index, subindex, size, value))
+    except struct.error as exc:
+        raise_from(ValueError("Invalid concise DCF: {}".format(exc)), exc)
+    return entries
+
+
+def AppendConciseDCF(value, entries):
+    """ Return the concise DCF DOMAIN value with the (index, subindex, size,
+        value) entries appended
+    """
+    entries = list(entries)
+    data = DomainToBytes(value) if value else COUNT.pack(0)
+    if len(data) < COUNT.size:
+        raise ValueError("Invalid concise DCF: missing number of entries")
+    count, = COUNT.unpack_from(data)
+    return BytesToDomain(
+        COUNT.pack(count + len(entries)) + data[COUNT.size:] + EncodeEntries(entries)
+    )
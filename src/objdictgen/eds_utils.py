@@ -27,25 +27,32 @@ from builtins import range
 import os
 import re
 import sys
-from time import localtime, strftime
+import json
+import logging
+import hashlib
+from time import gmtime, localtime, strftime
 from past.builtins import long  # type: ignore
 from future.utils import raise_from
 
 import objdictgen
+from objdictgen import snapshot
 from objdictgen.maps import OD
 
+log = logging.getLogger('objdictgen')
+
 if sys.version_info[0] >= 3:
     unicode = str  # pylint: disable=invalid-name
     INT_TYPES = int  # pylint: disable=invalid-name
 else:
     INT_TYPES = (int, long)
 
-# Regular expression for finding index section names
-RE_INDEX = re.compile(r'([0-9A-F]{1,4}$)')
-# Regular expression for finding subindex section names
-RE_SUBINDEX = re.compile(r'([0-9A-F]{1,4})SUB([0-9A-F]{1,2}$)')
-# Regular expression for finding index section names
-RE_INDEX_OBJECTLINKS = re.compile(r'([0-9A-F]{1,4}OBJECTLINKS$)')
+# Regular expression for finding index, subindex and index objectlinks
+# section names
+RE_SECTION = re.compile(r'([0-9A-F]{1,4})(?:SUB([0-9A-F]{1,2})|(OBJECTLINKS))?$')
+
+# Number of parsed EDS files kept in the cache dir. The least recently used
+# files are removed from the cache.
+EDS_CACHE_SIZE = 500
 
 # Regular expression for finding NodeXPresent keynames
 RE_NODEPRESENT = re.compile(r'NODE([0-9]{1,3})PRESENT$')
@@ -135,7 +142,7 @@ def GetDefaultValue(node, index, subindex=None):
 # an EDS file
 SECTION_KEYNAMES = ["FILEINFO", "DEVICEINFO", "DUMMYUSAGE", "COMMENTS",
                     "MANDATORYOBJECTS", "OPTIONALOBJECTS", "MANUFACTUREROBJECTS",
-                    "STANDARDDATATYPES", "SUPPORTEDMODULES"]
+                    "STANDARDDATATYPES", "SUPPORTEDMODULES", "DEVICECOMISSIONING"]
 
 
 # Function that extract sections from a file and returns a dictionary of the informations
@@ -152,12 +159,18 @@ def ExtractSections(file):
 
 # Function that parse an CPJ file and returns a dictionary of the informations
 def ParseCPJFile(filepath):
-    networks = []
-
     # Read file text
     with open(filepath, "r") as f:
         cpj_file = f.read()
 
+    return ParseCPJContent(cpj_file)
+
+
+# Function that parse the content of a CPJ file and returns a list of the
+# networks
+def ParseCPJContent(cpj_file):
+    networks = []
+
     sections = ExtractSections(cpj_file)
     # Parse assignments for each section
     for section_name, assignments in sections:
@@ -264,156 +277,186 @@ def ParseCPJFile(filepath):
     return networks
 
 
+# Function that add the section to the EDS information dictionary and returns
+# the dictionary for its values and if the section is an entry
+def AddEDSSection(eds_dict, section_name):
+    # Values of entry
+    values = {}
+
+    usection_name = section_name.upper()
+    # First case, section name is in SECTION_KEYNAMES
+    if usection_name in SECTION_KEYNAMES:
+        # Verify that entry is not already defined
+        if usection_name in eds_dict:
+            raise ValueError("'[%s]' section is defined two times" % section_name)
+        eds_dict[usection_name] = values
+        return values, False
+
+    # Search if the section name match an index, subindex or objectlinks expression
+    result = RE_SECTION.match(usection_name)
+    if not result:
+        # In any other case, there is a syntax problem into EDS file
+        raise ValueError("Section '[%s]' is unrecognized" % section_name)
+
+    index, subindex, objectlinks = result.groups()
+    # Second case, section name is an index objectlinks name
+    if objectlinks:
+        return values, False
+
+    index = int(index, 16)
+    # Third case, section name is an index name
+    if subindex is None:
+        # If index hasn't been referenced before, we add an entry into the dictionary
+        if index not in eds_dict:
+            eds_dict[index] = values
+            values["subindexes"] = {}
+        elif list(eds_dict[index]) == ["subindexes"]:
+            values["subindexes"] = eds_dict[index]["subindexes"]
+            eds_dict[index] = values
+        else:
+            raise ValueError("'[%s]' section is defined two times" % section_name)
+        return values, True
+
+    # Forth case, section name is a subindex name
+    subindex = int(subindex, 16)
+    # If index hasn't been referenced before, we add an entry into the dictionary
+    # that will be updated later
+    subindexes = eds_dict.setdefault(index, {"subindexes": {}})["subindexes"]
+    if subindex in subindexes:
+        raise ValueError("'[%s]' section is defined two times" % section_name)
+    subindexes[subindex] = values
+    return values, True
+
+
+# Function that verify the values of an index or subindex section
+def VerifyEDSEntry(values, section_name):
+    # Verify that entry has an ObjectType
+    values["OBJECTTYPE"] = values.get("OBJECTTYPE", 7)
+    # Extract parameters defined
+    keys = set(values)
+    keys.discard("subindexes")
+    # Extract possible parameters and parameters required
+    possible = set(ENTRY_TYPES[values["OBJECTTYPE"]]["require"]
+                   + ENTRY_TYPES[values["OBJECTTYPE"]]["optional"])
+    required = set(ENTRY_TYPES[values["OBJECTTYPE"]]["require"])
+    # Verify that parameters defined contains all the parameters required
+    if not keys.issuperset(required):
+        missing = required.difference(keys)
+        if len(missing) > 1:
+            attributes = "Attributes %s are" % ", ".join(["'%s'" % attribute for attribute in missing])
+        else:
+            attributes = "Attribute '%s' is" % missing.pop()
+        raise ValueError("Error on section '[%s]': '%s' required for a '%s' entry" % (section_name, attributes, ENTRY_TYPES[values["OBJECTTYPE"]]["name"]))
+    # Verify that parameters defined are all in the possible parameters
+    if not keys.issubset(possible):
+        unsupported = keys.difference(possible)
+        if len(unsupported) > 1:
+            attributes = "Attributes %s are" % ", ".join(["'%s'" % attribute for attribute in unsupported])
+        else:
+            attributes = "Attribute '%s' is" % unsupported.pop()
+        raise ValueError("Error on section '[%s]': '%s' unsupported for a '%s' entry" % (section_name, attributes, ENTRY_TYPES[values["OBJECTTYPE"]]["name"]))
+
+    VerifyValue(values, section_name, "ParameterValue")
+    VerifyValue(values, section_name, "DefaultValue")
+
+
 # Function that parse an EDS file and returns a dictionary of the informations
 def ParseEDSFile(filepath):
-    eds_dict = {}
-
-    # Read file text
     with open(filepath, 'r') as f:
-        eds_file = f.read()
+        return ParseEDSStream(f)
 
-    sections = ExtractSections(eds_file)
 
-    # Parse assignments for each section
-    for section_name, assignments in sections:
-        # Reset values of entry
-        values = {}
-
-        # Search if the section name match an index or subindex expression
-        index_result = RE_INDEX.match(section_name.upper())
-        subindex_result = RE_SUBINDEX.match(section_name.upper())
-        index_objectlinks_result = RE_INDEX_OBJECTLINKS.match(section_name.upper())
-
-        # Compilation of the EDS information dictionary
-
-        is_entry = False
-        # First case, section name is in SECTION_KEYNAMES
-        if section_name.upper() in SECTION_KEYNAMES:
-            # Verify that entry is not already defined
-            if section_name.upper() not in eds_dict:
-                eds_dict[section_name.upper()] = values
-            else:
-                raise ValueError("'[%s]' section is defined two times" % section_name)
-        # Second case, section name is an index name
-        elif index_result:
-            # Extract index number
-            index = int(index_result.groups()[0], 16)
-            # If index hasn't been referenced before, we add an entry into the dictionary
-            if index not in eds_dict:
-                eds_dict[index] = values
-                eds_dict[index]["subindexes"] = {}
-            elif list(eds_dict[index]) == ["subindexes"]:
-                values["subindexes"] = eds_dict[index]["subindexes"]
-                eds_dict[index] = values
-            else:
-                raise ValueError("'[%s]' section is defined two times" % section_name)
-            is_entry = True
-        # Third case, section name is a subindex name
-        elif subindex_result:
-            # Extract index and subindex number
-            index, subindex = [int(value, 16) for value in subindex_result.groups()]
-            # If index hasn't been referenced before, we add an entry into the dictionary
-            # that will be updated later
-            if index not in eds_dict:
-                eds_dict[index] = {"subindexes": {}}
-            if subindex not in eds_dict[index]["subindexes"]:
-                eds_dict[index]["subindexes"][subindex] = values
+# Function that parses the EDS from the text file object f
+def ParseEDSStream(f):
+    eds_dict = {}
+
+    # Name and values of the current section. Values is None when the lines
+    # are outside of any valid section and are ignored.
+    section_name = None
+    values = None
+    is_entry = False
+
+    # The file is read line by line and each section is added to the
+    # dictionary as it is read
+    for line in f:
+        line = line.rstrip("\r\n")
+
+        # A new section starts, so the previous is complete
+        if line.startswith("["):
+            if is_entry:
+                VerifyEDSEntry(values, section_name)
+
+            # The rest of the line after the section name is parsed as
+            # an assignment
+            section_name, sep, line = line[1:].partition("]")
+            if sep and section_name.isalnum():
+                values, is_entry = AddEDSSection(eds_dict, section_name)
             else:
-                raise ValueError("'[%s]' section is defined two times" % section_name)
-            is_entry = True
-        # Third case, section name is a subindex name
-        elif index_objectlinks_result:
-            pass
-        # In any other case, there is a syntax problem into EDS file
-        else:
-            raise ValueError("Section '[%s]' is unrecognized" % section_name)
+                values, is_entry = None, False
 
-        for assignment in assignments:
-            # Escape any comment
-            if assignment.startswith(";"):
-                pass
-            # Verify that line is a valid assignment
-            elif "=" in assignment:
-                # Split assignment into the two values keyname and value
-                keyname, value = assignment.split("=", 1)
-
-                # keyname must be immediately followed by the "=" sign, so we
-                # verify that there is no whitespace into keyname
-                if keyname.isalnum():
-                    # value can be preceded and followed by whitespaces, so we escape them
-                    value = value.strip()
-                    # First case, value starts with "$NODEID", then it's a formula
-                    if value.upper().startswith("$NODEID"):
-                        try:
-                            _ = int(value.upper().replace("$NODEID+", ""), 16)
-                            computed_value = '"%s"' % value
-                        except ValueError:
-                            raise_from(ValueError("'%s' is not a valid formula for attribute '%s' of section '[%s]'" % (value, keyname, section_name)), None)
-                    # Second case, value starts with "0x", then it's an hexadecimal value
-                    elif value.startswith("0x") or value.startswith("-0x"):
-                        try:
-                            computed_value = int(value, 16)
-                        except ValueError:
-                            raise_from(ValueError("'%s' is not a valid value for attribute '%s' of section '[%s]'" % (value, keyname, section_name)), None)
-                    elif value.isdigit() or value.startswith("-") and value[1:].isdigit():
-                        # Third case, value is a number and starts with "0", then it's an octal value
-                        if value.startswith("0") or value.startswith("-0"):
-                            computed_value = int(value, 8)
-                        # Forth case, value is a number and don't start with "0", then it's a decimal value
-                        else:
-                            computed_value = int(value)
-                    # In any other case, we keep string value
-                    else:
-                        computed_value = value
-
-                    # Add value to values dictionary
-                    # NOTE! The value can be 0 that must be added to the output
-                    if computed_value != "":
-                        # If entry is an index or a subindex
-                        if is_entry:
-                            # Verify that keyname is a possible attribute
-                            if keyname.upper() not in ENTRY_ATTRIBUTES:
-                                raise ValueError("Keyname '%s' not recognised for section '[%s]'" % (keyname, section_name))
-                            # Verify that value is valid
-                            if not ENTRY_ATTRIBUTES[keyname.upper()](computed_value):
-                                raise ValueError("Invalid value '%s' for keyname '%s' of section '[%s]'" % (value, keyname, section_name))
-                            values[keyname.upper()] = computed_value
-                        else:
-                            values[keyname.upper()] = computed_value
+        if values is None:
+            continue
+
+        # Escape any comment
+        if line.startswith(";"):
+            continue
+
+        # Verify that line is a valid assignment
+        keyname, sep, value = line.partition("=")
+        if not sep:
             # All lines that are not empty and are neither a comment neither not a valid assignment
-            elif assignment.strip():
-                raise ValueError("'%s' is not a valid EDS line" % assignment.strip())
+            if line.strip():
+                raise ValueError("'%s' is not a valid EDS line" % line.strip())
+            continue
+
+        # keyname must be immediately followed by the "=" sign, so we
+        # verify that there is no whitespace into keyname
+        if not keyname.isalnum():
+            continue
+
+        # value can be preceded and followed by whitespaces, so we escape them
+        value = value.strip()
+        # NOTE! The value can be 0 that must be added to the output
+        if not value:
+            continue
+
+        # First case, value starts with "$NODEID", then it's a formula
+        if value[:7].upper() == "$NODEID":
+            try:
+                _ = int(value.upper().replace("$NODEID+", ""), 16)
+                computed_value = '"%s"' % value
+            except ValueError:
+                raise_from(ValueError("'%s' is not a valid formula for attribute '%s' of section '[%s]'" % (value, keyname, section_name)), None)
+        # Second case, value starts with "0x", then it's an hexadecimal value
+        elif value.startswith("0x") or value.startswith("-0x"):
+            try:
+                computed_value = int(value, 16)
+            except ValueError:
+                raise_from(ValueError("'%s' is not a valid value for attribute '%s' of section '[%s]'" % (value, keyname, section_name)), None)
+        elif value.isdigit() or value[0] == "-" and value[1:].isdigit():
+            # Third case, value is a number and starts with "0", then it's an octal value
+            if value[0] == "0" or value.startswith("-0"):
+                computed_value = int(value, 8)
+            # Forth case, value is a number and don't start with "0", then it's a decimal value
+            else:
+                computed_value = int(value)
+        # In any other case, we keep string value
+        else:
+            computed_value = value
 
+        ukeyname = keyname.upper()
         # If entry is an index or a subindex
         if is_entry:
-            # Verify that entry has an ObjectType
-            values["OBJECTTYPE"] = values.get("OBJECTTYPE", 7)
-            # Extract parameters defined
-            keys = set(values)
-            keys.discard("subindexes")
-            # Extract possible parameters and parameters required
-            possible = set(ENTRY_TYPES[values["OBJECTTYPE"]]["require"]
-                           + ENTRY_TYPES[values["OBJECTTYPE"]]["optional"])
-            required = set(ENTRY_TYPES[values["OBJECTTYPE"]]["require"])
-            # Verify that parameters defined contains all the parameters required
-            if not keys.issuperset(required):
-                missing = required.difference(keys)
-                if len(missing) > 1:
-                    attributes = "Attributes %s are" % ", ".join(["'%s'" % attribute for attribute in missing])
-                else:
-                    attributes = "Attribute '%s' is" % missing.pop()
-                raise ValueError("Error on section '[%s]': '%s' required for a '%s' entry" % (section_name, attributes, ENTRY_TYPES[values["OBJECTTYPE"]]["name"]))
-            # Verify that parameters defined are all in the possible parameters
-            if not keys.issubset(possible):
-                unsupported = keys.difference(possible)
-                if len(unsupported) > 1:
-                    attributes = "Attributes %s are" % ", ".join(["'%s'" % attribute for attribute in unsupported])
-                else:
-                    attributes = "Attribute '%s' is" % unsupported.pop()
-                raise ValueError("Error on section '[%s]': '%s' unsupported for a '%s' entry" % (section_name, attributes, ENTRY_TYPES[values["OBJECTTYPE"]]["name"]))
+            # Verify that keyname is a possible attribute
+            if ukeyname not in ENTRY_ATTRIBUTES:
+                raise ValueError("Keyname '%s' not recognised for section '[%s]'" % (keyname, section_name))
+            # Verify that value is valid
+            if not ENTRY_ATTRIBUTES[ukeyname](computed_value):
+                raise ValueError("Invalid value '%s' for keyname '%s' of section '[%s]'" % (value, keyname, section_name))
+        values[ukeyname] = computed_value
 
-            VerifyValue(values, section_name, "ParameterValue")
-            VerifyValue(values, section_name, "DefaultValue")
+    if is_entry:
+        VerifyEDSEntry(values, section_name)
 
     return eds_dict
 
@@ -434,13 +477,69 @@ def VerifyValue(values, section_name, param):
             raise_from(ValueError("Error on section '[%s]': '%s' incompatible with DataType" % (section_name, param)), None)
 
 
-# Function that generate the EDS file content for the current node in the manager
-def GenerateFileContent(node, filepath):
-    # Dictionary of each index contents
-    indexcontents = {}
-
-    # Extract local time
-    current_time = localtime()
+# Function that generate the EDS section text of an entry and its subindexes
+def GenerateEntryContent(node, entry, entry_infos):
+    values = node.GetEntry(entry, compute=False)
+    # If there is only one value, it's a VAR entry
+    if not isinstance(values, list):
+        # Extract the informations of the first subindex
+        subentry_infos = node.GetSubentryInfos(entry, 0)
+        if subentry_infos["type"] == 1:
+            values = BOOL_TRANSLATE[values]
+        # Generate EDS informations for the entry
+        return (
+            "\n[%X]\n"
+            "ParameterName=%s\n"
+            "ObjectType=0x7\n"
+            "DataType=0x%4.4X\n"
+            "AccessType=%s\n"
+            "DefaultValue=%s\n"
+            "PDOMapping=%s\n"
+        ) % (entry, subentry_infos["name"], subentry_infos["type"],
+             subentry_infos["access"], values, BOOL_TRANSLATE[subentry_infos["pdo"]])
+
+    # Generate EDS informations for subindexes of the entry
+    subtexts = []
+    for subentry, value in enumerate(values):
+        # Extract the informations of each subindex
+        subentry_infos = node.GetSubentryInfos(entry, subentry)
+        # If entry is not for the compatibility, generate informations for subindex
+        if subentry_infos["name"] != "Compatibility Entry":
+            if subentry_infos["type"] == 1:
+                value = BOOL_TRANSLATE[value]
+            subtexts.append((
+                "\n[%Xsub%X]\n"
+                "ParameterName=%s\n"
+                "ObjectType=0x7\n"
+                "DataType=0x%4.4X\n"
+                "AccessType=%s\n"
+                "DefaultValue=%s\n"
+                "PDOMapping=%s\n"
+            ) % (entry, subentry, subentry_infos["name"], subentry_infos["type"],
+                 subentry_infos["access"], value, BOOL_TRANSLATE[subentry_infos["pdo"]]))
+
+    # Generate EDS informations for the entry, with the number of subindex defined
+    subtexts.insert(0, (
+        "\n[%X]\n"
+        "ParameterName=%s\n"
+        "ObjectType=%s\n"
+        "SubNumber=%d\n"
+    ) % (entry, entry_infos["name"],
+         "0x8" if entry_infos["struct"] & OD.IdenticalSubindexes else "0x9",
+         len(subtexts)))
+    return "".join(subtexts)
+
+
+# Function that generate the EDS file content for the current node in the
+# manager. The content is returned section by section. If commissioning is
+# given, the content is a DCF file with the commissioning attributes.
+def IterFileContent(node, filepath, commissioning=None):
+    # Extract local time, or the fixed time for reproducible output
+    epoch = objdictgen.source_date_epoch()
+    if epoch is not None:
+        current_time = gmtime(epoch)
+    else:
+        current_time = localtime()
     # Extract node informations
     nodename = node.Name
     # nodeid = node.ID
@@ -450,82 +549,96 @@ def GenerateFileContent(node, filepath):
     # Retreiving lists of indexes defined
     entries = node.GetIndexes()
 
-    # FIXME: Too many camelCase vars in here
-    # pylint: disable=invalid-name
-
-    # Generate FileInfo section
-    fileContent = "[FileInfo]\n"
-    fileContent += "FileName=%s\n" % os.path.split(filepath)[-1]
-    fileContent += "FileVersion=1\n"
-    fileContent += "FileRevision=1\n"
-    fileContent += "EDSVersion=4.0\n"
-    fileContent += "Description=%s\n" % description
-    fileContent += "CreationTime=%s" % strftime("%I:%M", current_time)
-    # %p option of strftime seems not working, then generate AM/PM by hands
-    if strftime("%I", current_time) == strftime("%H", current_time):
-        fileContent += "AM\n"
-    else:
-        fileContent += "PM\n"
-    fileContent += "CreationDate=%s\n" % strftime("%m-%d-%Y", current_time)
-    fileContent += "CreatedBy=CANFestival\n"
-    fileContent += "ModificationTime=%s" % strftime("%I:%M", current_time)
     # %p option of strftime seems not working, then generate AM/PM by hands
     if strftime("%I", current_time) == strftime("%H", current_time):
-        fileContent += "AM\n"
+        ampm = "AM"
     else:
-        fileContent += "PM\n"
-    fileContent += "ModificationDate=%s\n" % strftime("%m-%d-%Y", current_time)
-    fileContent += "ModifiedBy=CANFestival\n"
+        ampm = "PM"
+
+    # Generate FileInfo section
+    yield (
+        "[FileInfo]\n"
+        "FileName=%s\n"
+        "FileVersion=1\n"
+        "FileRevision=1\n"
+        "EDSVersion=4.0\n"
+        "Description=%s\n"
+        "CreationTime=%s%s\n"
+        "CreationDate=%s\n"
+        "CreatedBy=CANFestival\n"
+        "ModificationTime=%s%s\n"
+        "ModificationDate=%s\n"
+        "ModifiedBy=CANFestival\n"
+    ) % (os.path.split(filepath)[-1], description,
+         strftime("%I:%M", current_time), ampm, strftime("%m-%d-%Y", current_time),
+         strftime("%I:%M", current_time), ampm, strftime("%m-%d-%Y", current_time))
 
     # Generate DeviceInfo section
-    fileContent += "\n[DeviceInfo]\n"
-    fileContent += "VendorName=CANFestival\n"
-    # Use information typed by user in Identity entry
-    fileContent += "VendorNumber=0x%8.8X\n" % node.GetEntry(0x1018, 1)
-    fileContent += "ProductName=%s\n" % nodename
-    fileContent += "ProductNumber=0x%8.8X\n" % node.GetEntry(0x1018, 2)
-    fileContent += "RevisionNumber=0x%8.8X\n" % node.GetEntry(0x1018, 3)
-    # CANFestival support all baudrates as soon as driver choosen support them
-    fileContent += "BaudRate_10=1\n"
-    fileContent += "BaudRate_20=1\n"
-    fileContent += "BaudRate_50=1\n"
-    fileContent += "BaudRate_125=1\n"
-    fileContent += "BaudRate_250=1\n"
-    fileContent += "BaudRate_500=1\n"
-    fileContent += "BaudRate_800=1\n"
-    fileContent += "BaudRate_1000=1\n"
-    # Select BootUp type from the informations given by user
-    fileContent += "SimpleBootUpMaster=%s\n" % BOOL_TRANSLATE[nodetype == "master"]
-    fileContent += "SimpleBootUpSlave=%s\n" % BOOL_TRANSLATE[nodetype == "slave"]
-    # CANFestival characteristics
-    fileContent += "Granularity=8\n"
-    fileContent += "DynamicChannelsSupported=0\n"
-    fileContent += "CompactPDO=0\n"
-    fileContent += "GroupMessaging=0\n"
-    # Calculate receive and tranmit PDO numbers with the entry available
-    fileContent += "NrOfRXPDO=%d\n" % len([idx for idx in entries if 0x1400 <= idx <= 0x15FF])
-    fileContent += "NrOfTXPDO=%d\n" % len([idx for idx in entries if 0x1800 <= idx <= 0x19FF])
-    # LSS not supported as soon as DS-302 was not fully implemented
-    fileContent += "LSS_Supported=0\n"
+    yield (
+        "\n[DeviceInfo]\n"
+        "VendorName=CANFestival\n"
+        # Use information typed by user in Identity entry
+        "VendorNumber=0x%8.8X\n"
+        "ProductName=%s\n"
+        "ProductNumber=0x%8.8X\n"
+        "RevisionNumber=0x%8.8X\n"
+        # CANFestival support all baudrates as soon as driver choosen support them
+        "BaudRate_10=1\n"
+        "BaudRate_20=1\n"
+        "BaudRate_50=1\n"
+        "BaudRate_125=1\n"
+        "BaudRate_250=1\n"
+        "BaudRate_500=1\n"
+        "BaudRate_800=1\n"
+        "BaudRate_1000=1\n"
+        # Select BootUp type from the informations given by user
+        "SimpleBootUpMaster=%s\n"
+        "SimpleBootUpSlave=%s\n"
+        # CANFestival characteristics
+        "Granularity=8\n"
+        "DynamicChannelsSupported=0\n"
+        "CompactPDO=0\n"
+        "GroupMessaging=0\n"
+        # Calculate receive and tranmit PDO numbers with the entry available
+        "NrOfRXPDO=%d\n"
+        "NrOfTXPDO=%d\n"
+        # LSS not supported as soon as DS-302 was not fully implemented
+        "LSS_Supported=0\n"
+    ) % (node.GetEntry(0x1018, 1), nodename, node.GetEntry(0x1018, 2),
+         node.GetEntry(0x1018, 3),
+         BOOL_TRANSLATE[nodetype == "master"], BOOL_TRANSLATE[nodetype == "slave"],
+         len([idx for idx in entries if 0x1400 <= idx <= 0x15FF]),
+         len([idx for idx in entries if 0x1800 <= idx <= 0x19FF]))
+
+    # Generate DeviceComissioning section of DCF files
+    if commissioning is not None:
+        yield "\n[DeviceComissioning]\n%s" % "".join(
+            "%s=%s\n" % (keyname, value) for keyname, value in commissioning
+        )
 
     # Generate Dummy Usage section
-    fileContent += "\n[DummyUsage]\n"
-    fileContent += "Dummy0001=0\n"
-    fileContent += "Dummy0002=1\n"
-    fileContent += "Dummy0003=1\n"
-    fileContent += "Dummy0004=1\n"
-    fileContent += "Dummy0005=1\n"
-    fileContent += "Dummy0006=1\n"
-    fileContent += "Dummy0007=1\n"
+    yield (
+        "\n[DummyUsage]\n"
+        "Dummy0001=0\n"
+        "Dummy0002=1\n"
+        "Dummy0003=1\n"
+        "Dummy0004=1\n"
+        "Dummy0005=1\n"
+        "Dummy0006=1\n"
+        "Dummy0007=1\n"
+    )
 
     # Generate Comments section
-    fileContent += "\n[Comments]\n"
-    fileContent += "Lines=0\n"
+    yield (
+        "\n[Comments]\n"
+        "Lines=0\n"
+    )
 
     # List of entry by type (Mandatory, Optional or Manufacturer
     mandatories = []
     optionals = []
     manufacturers = []
+    entries_infos = {}
 
     # Remove all unused PDO
     # for entry in entries[:]:
@@ -535,63 +648,10 @@ def GenerateFileContent(node, filepath):
     #            entries.remove(entry)
     #            entries.remove(entry - 0x200)
 
-    # For each entry, we generate the entry section or sections if there is subindexes
+    # Add each entry in the right list. The entry sections are generated when
+    # they are written.
     for entry in entries:
-        # Extract infos and values for the entry
-        entry_infos = node.GetEntryInfos(entry)
-        values = node.GetEntry(entry, compute=False)
-        # Define section name
-        text = "\n[%X]\n" % entry
-        # If there is only one value, it's a VAR entry
-        if not isinstance(values, list):
-            # Extract the informations of the first subindex
-            subentry_infos = node.GetSubentryInfos(entry, 0)
-            # Generate EDS informations for the entry
-            text += "ParameterName=%s\n" % subentry_infos["name"]
-            text += "ObjectType=0x7\n"
-            text += "DataType=0x%4.4X\n" % subentry_infos["type"]
-            text += "AccessType=%s\n" % subentry_infos["access"]
-            if subentry_infos["type"] == 1:
-                text += "DefaultValue=%s\n" % BOOL_TRANSLATE[values]
-            else:
-                text += "DefaultValue=%s\n" % values
-            text += "PDOMapping=%s\n" % BOOL_TRANSLATE[subentry_infos["pdo"]]
-        else:
-            # Generate EDS informations for the entry
-            text += "ParameterName=%s\n" % entry_infos["name"]
-            if entry_infos["struct"] & OD.IdenticalSubindexes:
-                text += "ObjectType=0x8\n"
-            else:
-                text += "ObjectType=0x9\n"
-
-            # Generate EDS informations for subindexes of the entry in a separate text
-            subtext = ""
-            # Reset number of subindex defined
-            nb_subentry = 0
-            for subentry, value in enumerate(values):
-                # Extract the informations of each subindex
-                subentry_infos = node.GetSubentryInfos(entry, subentry)
-                # If entry is not for the compatibility, generate informations for subindex
-                if subentry_infos["name"] != "Compatibility Entry":
-                    subtext += "\n[%Xsub%X]\n" % (entry, subentry)
-                    subtext += "ParameterName=%s\n" % subentry_infos["name"]
-                    subtext += "ObjectType=0x7\n"
-                    subtext += "DataType=0x%4.4X\n" % subentry_infos["type"]
-                    subtext += "AccessType=%s\n" % subentry_infos["access"]
-                    if subentry_infos["type"] == 1:
-                        subtext += "DefaultValue=%s\n" % BOOL_TRANSLATE[value]
-                    else:
-                        subtext += "DefaultValue=%s\n" % value
-                    subtext += "PDOMapping=%s\n" % BOOL_TRANSLATE[subentry_infos["pdo"]]
-                    # Increment number of subindex defined
-                    nb_subentry += 1
-            # Write number of subindex defined for the entry
-            text += "SubNumber=%d\n" % nb_subentry
-            # Write subindex definitions
-            text += subtext
-
-        # Then we add the entry in the right list
-
+        entry_infos = entries_infos[entry] = node.GetEntryInfos(entry)
         # First case, entry is between 0x2000 and 0x5FFF, then it's a manufacturer entry
         if 0x2000 <= entry <= 0x5FFF:
             manufacturers.append(entry)
@@ -601,51 +661,45 @@ def GenerateFileContent(node, filepath):
         # In any other case, it's an optional entry
         else:
             optionals.append(entry)
-        # Save text of the entry in the dictiionary of contents
-        indexcontents[entry] = text
-
-    # Before generate File Content we sort the entry list
-    manufacturers.sort()
-    mandatories.sort()
-    optionals.sort()
-
-    # Generate Definition of mandatory objects
-    fileContent += "\n[MandatoryObjects]\n"
-    fileContent += "SupportedObjects=%d\n" % len(mandatories)
-    for idx, entry in enumerate(mandatories):
-        fileContent += "%d=0x%4.4X\n" % (idx + 1, entry)
-    # Write mandatory entries
-    for entry in mandatories:
-        fileContent += indexcontents[entry]
-
-    # Generate Definition of optional objects
-    fileContent += "\n[OptionalObjects]\n"
-    fileContent += "SupportedObjects=%d\n" % len(optionals)
-    for idx, entry in enumerate(optionals):
-        fileContent += "%d=0x%4.4X\n" % (idx + 1, entry)
-    # Write optional entries
-    for entry in optionals:
-        fileContent += indexcontents[entry]
-
-    # Generate Definition of manufacturer objects
-    fileContent += "\n[ManufacturerObjects]\n"
-    fileContent += "SupportedObjects=%d\n" % len(manufacturers)
-    for idx, entry in enumerate(manufacturers):
-        fileContent += "%d=0x%4.4X\n" % (idx + 1, entry)
-    # Write manufacturer entries
-    for entry in manufacturers:
-        fileContent += indexcontents[entry]
-
-    # Return File Content
-    return fileContent
+
+    for section, objects in (("MandatoryObjects", mandatories),
+                             ("OptionalObjects", optionals),
+                             ("ManufacturerObjects", manufacturers)):
+        objects.sort()
+        # Generate Definition of the objects
+        yield "\n[%s]\nSupportedObjects=%d\n%s" % (section, len(objects), "".join(
+            "%d=0x%4.4X\n" % (idx + 1, entry) for idx, entry in enumerate(objects)
+        ))
+        # Write the entries
+        for entry in objects:
+            yield GenerateEntryContent(node, entry, entries_infos[entry])
+
+
+# Function that generate the EDS file content for the current node in the manager
+def GenerateFileContent(node, filepath):
+    return "".join(IterFileContent(node, filepath))
 
 
 # Function that generates EDS file from current node edited
 def GenerateEDSFile(filepath, node):
-    content = GenerateFileContent(node, filepath)
+    # The existing file is kept if the export fails
+    with objdictgen.node.OpenOutput(filepath) as f:
+        f.writelines(IterFileContent(node, filepath))
+
 
-    with open(filepath, "w") as f:
-        f.write(content)
+# Function that generates DCF file for the node with the given node id
+def GenerateDCFFile(filepath, node, nodeid, nodename=None, netname=None):
+    commissioning = [
+        ("NodeID", "0x%2.2X" % nodeid),
+        ("NodeName", nodename or node.Name),
+    ]
+    if netname:
+        commissioning.append(("NetworkName", netname))
+    commissioning.append(("CANopenManager", BOOL_TRANSLATE[node.Type == "master"]))
+
+    # The existing file is kept if the export fails
+    with objdictgen.node.OpenOutput(filepath) as f:
+        f.writelines(IterFileContent(node, filepath, commissioning))
 
 
 # Function that generate the CPJ file content for the nodelist
@@ -665,13 +719,137 @@ def GenerateCPJContent(nodelist):
     return filecontent
 
 
-# Function that generates Node from an EDS file
-def GenerateNode(filepath, nodeid=0):
+# Function that generates Node from an EDS file. The nodes are cached in
+# cachedir, which defaults to the environment variable ODG_CACHE_DIR. f is the
+# binary file object of filepath if it is already open.
+def GenerateNode(filepath, nodeid=0, cachedir=None, f=None):
+    if f is None:
+        with open(filepath, 'rb') as f:
+            return GenerateNode(filepath, nodeid, cachedir, f)
+
+    if cachedir is None:
+        cachedir = os.environ.get('ODG_CACHE_DIR')
+    if not cachedir:
+        return BuildNode(filepath, nodeid, f)
+
+    # The cache is keyed by the content of the file and the directories the
+    # profiles are looked up in
+    key = hashlib.sha1("eds {} {} {}".format(
+        objdictgen.ODG_VERSION, nodeid, os.pathsep.join(objdictgen.PROFILE_DIRECTORIES),
+    ).encode('utf-8') + b'\0')
+    with objdictgen.node.MapFile(f) as data:
+        key.update(data)
+    cachefile = os.path.join(cachedir, key.hexdigest() + '.eds.snap')
+
+    node = LoadCachedNode(cachefile)
+    if node is not None:
+        log.debug("Loading cached EDS '%s'" % filepath)
+        return node
+
+    # Record the profiles used by the node, as the cached node must be
+    # regenerated if any of them are changed, or if a profile which was not
+    # found is added
+    with objdictgen.node.RecordInputFiles() as inputfiles:
+        node = BuildNode(filepath, nodeid, f)
+    try:
+        SaveCachedNode(cachefile, node, inputfiles)
+    except (IOError, OSError, ValueError) as exc:
+        log.debug("Unable to cache '%s': %s" % (filepath, exc))
+    return node
+
+
+# Function that loads the node from the EDS cache file. Returns None if the
+# cache file doesn't exist or it is stale.
+def LoadCachedNode(cachefile):
+    try:
+        with open(cachefile, 'rb') as f:
+            # The first line is the list of input files and their mtimes
+            header = f.readline()
+            inputfiles = json.loads(header.decode('utf-8'))
+            if not objdictgen.node.InputFilesUnchanged(inputfiles):
+                return None
+            with objdictgen.node.MapFile(f) as data:
+                node = snapshot.LoadSnapshot(data[len(header):])
+        # Mark the cache file as recently used
+        os.utime(cachefile, None)
+    except (IOError, OSError, ValueError):
+        return None
+
+    objdictgen.node.AddInputFilesState(inputfiles)
+    return node
+
+
+# Function that saves the node to the EDS cache file and removes the least
+# recently used cache files if the cache is full
+def SaveCachedNode(cachefile, node, inputfiles):
+    header = json.dumps(objdictgen.node.InputFilesState(inputfiles))
+    data = header.encode('utf-8') + b'\n' + snapshot.GenerateSnapshot(node)
+
+    cachedir = os.path.dirname(cachefile)
+    if not os.path.exists(cachedir):
+        os.makedirs(cachedir)
+    # Write via a temporary file to never leave a partial cache entry
+    with objdictgen.node.OpenOutput(cachefile, 'wb') as f:
+        f.write(data)
+
+    objdictgen.node.PruneCache(cachedir, '.eds.snap', EDS_CACHE_SIZE)
+
+
+# Function that returns the default value of the data type, using and
+# updating the type_defaults cache
+def GetTypeDefaultValue(node, typeindex, type_defaults):
+    if typeindex not in type_defaults:
+        type_defaults[typeindex] = node.GetTypeDefaultValue(typeindex)
+    return type_defaults[typeindex]
+
+
+# Function that adds an entry which is defined in the mappings of the node
+def AddKnownEntry(node, entry, values):
+    # First case, entry is a DOMAIN or VAR
+    if values["OBJECTTYPE"] in [2, 7]:
+        # Take default value if it is defined
+        if "PARAMETERVALUE" in values:
+            value = values["PARAMETERVALUE"]
+        elif "DEFAULTVALUE" in values:
+            value = values["DEFAULTVALUE"]
+        # Find default value for value type of the entry
+        else:
+            value = GetDefaultValue(node, entry)
+        node.AddEntry(entry, 0, value)
+    # Second case, entry is an ARRAY or a RECORD
+    elif values["OBJECTTYPE"] in [8, 9]:
+        # Verify that "Subnumber" attribute is defined and has a valid value
+        if "SUBNUMBER" in values and values["SUBNUMBER"] > 0:
+            # Extract maximum subindex number defined
+            max_subindex = max(values["subindexes"])
+            node.AddEntry(entry, value=[])
+            # Define value for all subindexes except the first
+            for subindex in range(1, int(max_subindex) + 1):
+                # Take default value if it is defined and entry is defined
+                if subindex in values["subindexes"] and "PARAMETERVALUE" in values["subindexes"][subindex]:
+                    value = values["subindexes"][subindex]["PARAMETERVALUE"]
+                elif subindex in values["subindexes"] and "DEFAULTVALUE" in values["subindexes"][subindex]:
+                    value = values["subindexes"][subindex]["DEFAULTVALUE"]
+                # Find default value for value type of the subindex
+                else:
+                    value = GetDefaultValue(node, entry, subindex)
+                node.AddEntry(entry, subindex, value)
+        else:
+            raise ValueError("Array or Record entry 0x%4.4X must have a 'SubNumber' attribute" % entry)
+
+
+# Function that generates Node from an EDS file without using the cache. f is
+# the binary file object of filepath if it is already open.
+def BuildNode(filepath, nodeid=0, f=None):
     # Create a new node
     node = objdictgen.Node(id=nodeid)
 
     # Parse file and extract dictionary of EDS entry
-    eds_dict = ParseEDSFile(filepath)
+    if f is None:
+        eds_dict = ParseEDSFile(filepath)
+    else:
+        with objdictgen.node.TextStream(f) as text:
+            eds_dict = ParseEDSStream(text)
 
     # Ensure we have the ODs we need
     missing = ["0x%04X" % i for i in (
@@ -692,125 +870,105 @@ def GenerateNode(filepath, nodeid=0):
             node.ProfileName = profilename
             node.Profile = mapping
             node.SpecificMenu = menuentries
+            node.InvalidateFingerprint()
         except ValueError:
             # Loading profile failed and it will be silently ignored
             pass
 
+    # Extract the entries which are defined in the profile or DS-301. This
+    # is done before the user mapping is built, as the lookup of an entry
+    # searches the whole user mapping.
+    known = set(
+        entry for entry in eds_dict
+        if entry not in SECTION_KEYNAMES and node.GetEntryInfos(entry)
+    )
+
+    # Default value of each data type
+    type_defaults = {}
+
     # Read all entries in the EDS dictionary
     for entry, values in eds_dict.items():
         # All sections with a name in keynames are escaped
         if entry in SECTION_KEYNAMES:
-            pass
-        else:
-            # Extract informations for the entry
-            entry_infos = node.GetEntryInfos(entry)
-
-            # If no informations are available, then we write them
-            if not entry_infos:
-                # First case, entry is a DOMAIN or VAR
-                if values["OBJECTTYPE"] in [2, 7]:
-                    if values["OBJECTTYPE"] == 2:
-                        values["DATATYPE"] = values.get("DATATYPE", 0xF)
-                        if values["DATATYPE"] != 0xF:
-                            raise ValueError("Domain entry 0x%4.4X DataType must be 0xF(DOMAIN) if defined" % entry)
-                    # Add mapping for entry
-                    node.AddMappingEntry(entry, name=values["PARAMETERNAME"], struct=OD.VAR)
-                    # Add mapping for first subindex
-                    node.AddMappingEntry(entry, 0, values={
-                        "name": values["PARAMETERNAME"],
-                        "type": values["DATATYPE"],
-                        "access": ACCESS_TRANSLATE[values["ACCESSTYPE"].upper()],
-                        "pdo": values.get("PDOMAPPING", 0) == 1,
+            continue
+
+        if entry in known:
+            AddKnownEntry(node, entry, values)
+            continue
+
+        # If no informations are available, then we write the mapping and
+        # the entry in one go
+
+        # First case, entry is a DOMAIN or VAR
+        if values["OBJECTTYPE"] in [2, 7]:
+            if values["OBJECTTYPE"] == 2:
+                values["DATATYPE"] = values.get("DATATYPE", 0xF)
+                if values["DATATYPE"] != 0xF:
+                    raise ValueError("Domain entry 0x%4.4X DataType must be 0xF(DOMAIN) if defined" % entry)
+            # Add mapping for entry and its first subindex
+            node.AddMappingEntry(entry, name=values["PARAMETERNAME"], struct=OD.VAR, values=[{
+                "name": values["PARAMETERNAME"],
+                "type": values["DATATYPE"],
+                "access": ACCESS_TRANSLATE[values["ACCESSTYPE"].upper()],
+                "pdo": values.get("PDOMAPPING", 0) == 1,
+            }])
+            # Take default value if it is defined
+            if "PARAMETERVALUE" in values:
+                value = values["PARAMETERVALUE"]
+            elif "DEFAULTVALUE" in values:
+                value = values["DEFAULTVALUE"]
+            # Find default value for value type of the entry
+            else:
+                value = GetTypeDefaultValue(node, values["DATATYPE"], type_defaults)
+            node.AddEntry(entry, 0, value)
+
+        # Second case, entry is an ARRAY or RECORD
+        elif values["OBJECTTYPE"] in [8, 9]:
+            subindexes = values["subindexes"]
+            # Extract maximum subindex number defined
+            max_subindex = max(subindexes)
+            # Mapping for first subindex
+            mapping = [{
+                "name": "Number of Entries",
+                "type": 0x05,
+                "access": "ro",
+                "pdo": False,
+            }]
+            # Mapping for other subindexes
+            for subindex in range(1, int(max_subindex) + 1):
+                # if subindex is defined
+                if subindex in subindexes:
+                    mapping.append({
+                        "name": subindexes[subindex]["PARAMETERNAME"],
+                        "type": subindexes[subindex]["DATATYPE"],
+                        "access": ACCESS_TRANSLATE[subindexes[subindex]["ACCESSTYPE"].upper()],
+                        "pdo": subindexes[subindex].get("PDOMAPPING", 0) == 1,
                     })
-                # Second case, entry is an ARRAY or RECORD
-                elif values["OBJECTTYPE"] in [8, 9]:
-                    # Extract maximum subindex number defined
-                    max_subindex = max(values["subindexes"])
-                    # Add mapping for entry
-                    node.AddMappingEntry(entry, name=values["PARAMETERNAME"], struct=OD.RECORD)
-                    # Add mapping for first subindex
-                    node.AddMappingEntry(entry, 0, values={
-                        "name": "Number of Entries",
+                # if not, we add a mapping for compatibility
+                else:
+                    mapping.append({
+                        "name": "Compatibility Entry",
                         "type": 0x05,
-                        "access": "ro",
+                        "access": "rw",
                         "pdo": False,
                     })
-                    # Add mapping for other subindexes
-                    for subindex in range(1, int(max_subindex) + 1):
-                        # if subindex is defined
-                        if subindex in values["subindexes"]:
-                            node.AddMappingEntry(entry, subindex, values={
-                                "name": values["subindexes"][subindex]["PARAMETERNAME"],
-                                "type": values["subindexes"][subindex]["DATATYPE"],
-                                "access": ACCESS_TRANSLATE[values["subindexes"][subindex]["ACCESSTYPE"].upper()],
-                                "pdo": values["subindexes"][subindex].get("PDOMAPPING", 0) == 1,
-                            })
-                        # if not, we add a mapping for compatibility
-                        else:
-                            node.AddMappingEntry(entry, subindex, values={
-                                "name": "Compatibility Entry",
-                                "type": 0x05,
-                                "access": "rw",
-                                "pdo": False,
-                            })
-
-                # # Third case, entry is an RECORD
-                # elif values["OBJECTTYPE"] == 9:
-                #     # Verify that the first subindex is defined
-                #     if 0 not in values["subindexes"]:
-                #         raise ValueError("Error on entry 0x%4.4X: Subindex 0 must be defined for a RECORD entry" % entry)
-                #     # Add mapping for entry
-                #     node.AddMappingEntry(entry, name=values["PARAMETERNAME"], struct=OD.ARRAY)
-                #     # Add mapping for first subindex
-                #     node.AddMappingEntry(entry, 0, values={
-                #         "name": "Number of Entries",
-                #         "type": 0x05,
-                #         "access": "ro",
-                #         "pdo": False,
-                #     })
-                #     # Verify that second subindex is defined
-                #     if 1 in values["subindexes"]:
-                #         node.AddMappingEntry(entry, 1, values={
-                #             "name": values["PARAMETERNAME"] + " %d[(sub)]",
-                #             "type": values["subindexes"][1]["DATATYPE"],
-                #             "access": ACCESS_TRANSLATE[values["subindexes"][1]["ACCESSTYPE"].upper()],
-                #             "pdo": values["subindexes"][1].get("PDOMAPPING", 0) == 1,
-                #             "nbmax": 0xFE,
-                #         })
-                #     else:
-                #         raise ValueError("Error on entry 0x%4.4X: A RECORD entry must have at least 2 subindexes" % entry)
-
-            # Define entry for the new node
-
-            # First case, entry is a DOMAIN or VAR
-            if values["OBJECTTYPE"] in [2, 7]:
-                # Take default value if it is defined
-                if "PARAMETERVALUE" in values:
-                    value = values["PARAMETERVALUE"]
-                elif "DEFAULTVALUE" in values:
-                    value = values["DEFAULTVALUE"]
-                # Find default value for value type of the entry
-                else:
-                    value = GetDefaultValue(node, entry)
-                node.AddEntry(entry, 0, value)
-            # Second case, entry is an ARRAY or a RECORD
-            elif values["OBJECTTYPE"] in [8, 9]:
-                # Verify that "Subnumber" attribute is defined and has a valid value
-                if "SUBNUMBER" in values and values["SUBNUMBER"] > 0:
-                    # Extract maximum subindex number defined
-                    max_subindex = max(values["subindexes"])
-                    node.AddEntry(entry, value=[])
-                    # Define value for all subindexes except the first
-                    for subindex in range(1, int(max_subindex) + 1):
-                        # Take default value if it is defined and entry is defined
-                        if subindex in values["subindexes"] and "PARAMETERVALUE" in values["subindexes"][subindex]:
-                            value = values["subindexes"][subindex]["PARAMETERVALUE"]
-                        elif subindex in values["subindexes"] and "DEFAULTVALUE" in values["subindexes"][subindex]:
-                            value = values["subindexes"][subindex]["DEFAULTVALUE"]
-                        # Find default value for value type of the subindex
-                        else:
-                            value = GetDefaultValue(node, entry, subindex)
-                        node.AddEntry(entry, subindex, value)
+            node.AddMappingEntry(entry, name=values["PARAMETERNAME"], struct=OD.RECORD, values=mapping)
+
+            # Verify that "Subnumber" attribute is defined and has a valid value
+            if "SUBNUMBER" not in values or values["SUBNUMBER"] <= 0:
+                raise ValueError("Array or Record entry 0x%4.4X must have a 'SubNumber' attribute" % entry)
+
+            # Define value for all subindexes except the first
+            subvalues = []
+            for subindex in range(1, int(max_subindex) + 1):
+                subindex_values = subindexes.get(subindex, {})
+                # Take default value if it is defined and entry is defined
+                if "PARAMETERVALUE" in subindex_values:
+                    subvalues.append(subindex_values["PARAMETERVALUE"])
+                elif "DEFAULTVALUE" in subindex_values:
+                    subvalues.append(subindex_values["DEFAULTVALUE"])
+                # Find default value for value type of the subindex
                 else:
-                    raise ValueError("Array or Record entry 0x%4.4X must have a 'SubNumber' attribute" % entry)
+                    subvalues.append(GetTypeDefaultValue(node, mapping[subindex]["type"], type_defaults))
+            node.AddEntry(entry, value=subvalues)
     return node
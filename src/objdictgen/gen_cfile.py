@@ -27,6 +27,7 @@ import re
 import os
 
 from objdictgen.maps import OD
+from objdictgen.node import DomainToC, OpenOutput
 
 RE_WORD = re.compile(r'([a-zA-Z_0-9]*)')
 RE_TYPE = re.compile(r'([\_A-Z]*)([0-9]*)')
@@ -97,7 +98,7 @@ def ComputeValue(type_, value):
     if type_ == "visible_string":
         return '"%s"' % value, ""
     if type_ == "domain":
-        return '"%s"' % ''.join(["\\x%2.2x" % ord(char) for char in value]), ""
+        return '"%s"' % DomainToC(value), ""
     if type_.startswith("real"):
         return "%f" % value, ""
     # value is integer; make sure to handle negative numbers correctly
@@ -654,13 +655,13 @@ def GenerateFile(filepath, node, pointers_dict=None):
     content, header, header_defs = GenerateFileContent(node, os.path.basename(headerfilepath), pointers_dict)
 
     # Write main .c contents
-    with open(filepath, "wb") as f:
+    with OpenOutput(filepath, "wb") as f:
         f.write(content.encode('utf-8'))
 
     # Write header file
-    with open(headerfilepath, "wb") as f:
+    with OpenOutput(headerfilepath, "wb") as f:
         f.write(header.encode('utf-8'))
 
     # Write object definitions header
-    with open(filebase + "_objectdefines.h", "wb") as f:
+    with OpenOutput(filebase + "_objectdefines.h", "wb") as f:
         f.write(header_defs.encode('utf-8'))
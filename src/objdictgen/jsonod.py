@@ -17,15 +17,22 @@
 #    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301
 #    USA
 
-from datetime import datetime
+from datetime import datetime, timedelta
+import copy
+import hashlib
 import sys
 import os
 import re
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 import logging
 import json
-import jsonschema
-import deepdiff
+from future.utils import raise_from
+
+try:
+    from importlib.util import find_spec
+except ImportError:
+    # Python 2
+    from pkgutil import find_loader as find_spec
 
 import objdictgen
 from objdictgen import maps
@@ -40,8 +47,31 @@ else:
 
 log = logging.getLogger('objdictgen')
 
+# NOTE: jsonschema, deepdiff, multiprocessing and orjson are imported where
+# they are used, as they are slow to import and not needed by most commands.
+
 
 SCHEMA = None
+VALIDATORS = None
+
+# JSON files of at least this size are read incrementally with
+# GenerateNodeStream(). Smaller files are loaded at once with json_loads(),
+# which is faster, especially with orjson.
+STREAM_THRESHOLD = 1024 * 1024
+
+# Number of the most recently used fingerprint files kept in the cache
+CORPUS_CACHE_SIZE = 500
+
+# The JSON backend. orjson is used when it is installed, unless the
+# environment variable ODG_JSON_BACKEND is set to "json".
+ORJSON_INSTALLED = find_spec('orjson') is not None
+JSON_BACKEND = "json"
+if ORJSON_INSTALLED and os.environ.get('ODG_JSON_BACKEND', 'orjson') == 'orjson':
+    JSON_BACKEND = "orjson"
+
+# Output from orjson which might differ from the json module: Non-ascii
+# and DEL characters, float exponents and NaN/Infinity (written as null)
+RE_ORJSON_DIFFERS = re.compile(br'[^\n\x20-\x7e]|[0-9][eE]|null')
 
 
 class ValidationError(Exception):
@@ -161,11 +191,15 @@ SUBINDEX0 = {
 }
 
 
-def remove_jasonc(text):
-    ''' Remove jsonc annotations '''
+def remove_jasonc(text, keeplines=False):
+    ''' Remove jsonc annotations. If keeplines is set, the newlines of the
+        comments are kept, so the line numbers of the text are unchanged.
+    '''
     # Copied from https://github.com/NickolaiBeloguzov/jsonc-parser/blob/master/jsonc_parser/parser.py#L11-L39
     def __re_sub(match):
         if match.group(2) is not None:
+            if keeplines:
+                return "\n" * match.group(2).count("\n")
             return ""
         return match.group(1)
 
@@ -177,6 +211,210 @@ def remove_jasonc(text):
     )
 
 
+class JsonStreamReader(object):
+    ''' Incremental reader of JSON values from a file object. The file is
+        read in chunks of whole lines, and jsonc comments are removed from
+        each chunk as it is read. The line numbers of the errors are the
+        lines of the file.
+    '''
+
+    RE_WHITESPACE = re.compile(r'\s*')
+    # Strings, line comments and the start of block comments
+    RE_COMMENT_START = re.compile(r'"(?:\\.|[^"\\])*"|//|/\*')
+    CHUNKSIZE = 65536
+
+    def __init__(self, f, chunksize=None):
+        self.f = f
+        self.chunksize = chunksize or self.CHUNKSIZE
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        # Position in the file of the start of buf: the number of characters
+        # and lines before it and its column in the line
+        self.offset = 0
+        self.lineno = 0
+        self.colno = 0
+        if sys.version_info[0] < 3:
+            self.decoder = json.JSONDecoder(object_pairs_hook=ordereddict_hook)
+        else:
+            self.decoder = json.JSONDecoder()
+
+    def in_comment(self, line, comment):
+        ''' Return True if the line ends within a /* */ comment. comment is
+            True if the line starts within the comment.
+        '''
+        pos = 0
+        while True:
+            if comment:
+                end = line.find('*/', pos)
+                if end < 0:
+                    return True
+                pos, comment = end + 2, False
+            else:
+                match = self.RE_COMMENT_START.search(line, pos)
+                if not match or match.group() == '//':
+                    return False
+                pos, comment = match.end(), match.group() == '/*'
+
+    def fill(self):
+        ''' Read the next chunk from the file. Returns False at end of file '''
+        if self.eof:
+            return False
+        lines = []
+        size = 0
+        comment = False
+        for line in self.f:
+            lines.append(line)
+            size += len(line)
+            # Don't split the chunk inside a /* */ comment
+            comment = self.in_comment(line, comment)
+            if size >= self.chunksize and not comment:
+                break
+        else:
+            self.eof = True
+
+        # Keep track of the position in the file of the discarded text
+        done = self.buf[:self.pos]
+        self.offset += len(done)
+        newlines = done.count('\n')
+        if newlines:
+            self.lineno += newlines
+            self.colno = len(done) - done.rfind('\n') - 1
+        else:
+            self.colno += len(done)
+
+        self.buf = self.buf[self.pos:] + remove_jasonc(''.join(lines), keeplines=True)
+        self.pos = 0
+        return bool(lines)
+
+    def position(self, pos):
+        ''' Return the line and column number in the file of pos in buf '''
+        lineno = self.buf.count('\n', 0, pos)
+        start = self.buf.rfind('\n', 0, pos) + 1
+        colno = pos - start + (self.colno if not lineno else 0)
+        return self.lineno + lineno + 1, colno + 1
+
+    def error(self, exc):
+        ''' Return the JSON decode error exc with the position in the file '''
+        if not hasattr(exc, 'lineno'):
+            # Python 2 doesn't give the position
+            return exc
+        lineno, colno = self.position(exc.pos)
+        err = json.JSONDecodeError(exc.msg, exc.doc, exc.pos)
+        err.pos, err.lineno, err.colno = self.offset + exc.pos, lineno, colno
+        err.args = ("%s: line %d column %d (char %d)" % (exc.msg, lineno, colno, err.pos), )
+        return err
+
+    def peek(self):
+        ''' Return the next non-whitespace character, or '' at end of file '''
+        while True:
+            self.pos = self.RE_WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self.fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, chars):
+        ''' Consume the next character, which must be one of chars '''
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError("Expected one of '{}', found '{}': line {} column {}".format(
+                chars, c, *self.position(self.pos)))
+        self.pos += 1
+        return c
+
+    def value(self):
+        ''' Decode and return the next JSON value '''
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number at the end of the buffer might continue in the
+                # next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except ValueError as exc:
+                if self.eof:
+                    raise_from(self.error(exc), None)
+            self.fill()
+
+
+def read_json_iter(f):
+    ''' Generator parsing a JSON OD from the file object f incrementally.
+        The top-level fields are produced as (key, value). The start of the
+        "dictionary" list is produced as ("dictionary", []), followed by
+        ("dictionary.item", obj) for each of the objects in the list.
+    '''
+
+    reader = JsonStreamReader(f)
+
+    reader.expect('{')
+    if reader.peek() == '}':
+        reader.expect('}')
+    else:
+        while True:
+            key = reader.value()
+            if not isinstance(key, (str, unicode)):
+                raise ValueError("Expected a string as key, found '{}'".format(key))
+            reader.expect(':')
+            if key == 'dictionary' and reader.peek() == '[':
+                reader.expect('[')
+                yield key, []
+                if reader.peek() == ']':
+                    reader.expect(']')
+                else:
+                    while True:
+                        yield 'dictionary.item', reader.value()
+                        if reader.expect(',]') == ']':
+                            break
+            else:
+                yield key, reader.value()
+            if reader.expect(',}') == '}':
+                break
+
+    if reader.peek():
+        raise ValueError("Extra data after the JSON object")
+
+
+def json_loads(text):
+    ''' Load JSON text using the selected JSON backend '''
+    if JSON_BACKEND == "orjson":
+        import orjson  # pylint: disable=import-outside-toplevel
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            # The json module accepts a few more inputs, such as NaN and
+            # very large integers. It will also report any errors.
+            pass
+
+    # Load the json, with awareness on ordering in py2
+    if sys.version_info[0] < 3:
+        return json.loads(text, object_pairs_hook=ordereddict_hook)
+    return json.loads(text)
+
+
+def json_dumps(obj, compact=False):
+    ''' Dump obj to JSON text using the selected JSON backend. The output
+        is identical to the json module with either compact separators or
+        indent of 2.
+    '''
+    if JSON_BACKEND == "orjson":
+        import orjson  # pylint: disable=import-outside-toplevel
+        option = orjson.OPT_NON_STR_KEYS
+        if not compact:
+            option |= orjson.OPT_INDENT_2
+        try:
+            data = orjson.dumps(obj, option=option)
+            if not RE_ORJSON_DIFFERS.search(data):
+                return data.decode()
+        except TypeError:
+            # E.g. integers exceeding 64-bit
+            pass
+
+    if compact:
+        return json.dumps(obj, separators=(',', ':'))
+    return json.dumps(obj, separators=(',', ': '), indent=2)
+
+
 def exc_amend(exc, text):
     """ Helper to prefix text to an exception """
     args = list(exc.args)
@@ -299,26 +537,34 @@ def get_object_types(node=None, dictionary=None):
     if len(i2s) != len(s2i):
         raise ValidationError("Multiple names or numbers for object types in OD")
 
-    # Must check everything, as this is used with unvalidated input
     for obj in dictionary or []:
-        if not isinstance(obj, dict):
-            continue
-        index = str_to_number(obj.get('index'))
-        name = obj.get('name')
-        if not isinstance(index, int) or not isinstance(name, str):
-            continue
-        if index >= 0x1000 or not name:
-            continue
-        if index in i2s:
-            raise ValidationError("Index {} ('{}') is already defined as a type with name '{}'".format(index, name, i2s[index]))
-        if name in s2i:
-            raise ValidationError("Name '{}' in index {} is already defined in index {}".format(name, index, s2i[name]))
-        i2s[index] = name
-        s2i[name] = index
+        add_object_type(obj, i2s, s2i)
 
     return i2s, s2i
 
 
+def add_object_type(obj, i2s, s2i):
+    ''' Add the object type defined by the dictionary entry obj to the
+        object type mappings. Entries not defining a type are ignored.
+    '''
+
+    # Must check everything, as this is used with unvalidated input
+    if not isinstance(obj, dict):
+        return
+    index = str_to_number(obj.get('index'))
+    name = obj.get('name')
+    if not isinstance(index, int) or not isinstance(name, str):
+        return
+    if index >= 0x1000 or not name:
+        return
+    if index in i2s:
+        raise ValidationError("Index {} ('{}') is already defined as a type with name '{}'".format(index, name, i2s[index]))
+    if name in s2i:
+        raise ValidationError("Name '{}' in index {} is already defined in index {}".format(name, index, s2i[name]))
+    i2s[index] = name
+    s2i[name] = index
+
+
 def compare_profile(profilename, params, menu=None):
     try:
         dsmap, menumap = objdictgen.ImportProfile(profilename)
@@ -338,21 +584,10 @@ def compare_profile(profilename, params, menu=None):
         return False, False
 
 
-def GenerateJson(node, compact=False, sort=False, internal=False, validate=True):
-    ''' Export a JSON string representation of the node '''
-
-    # Get the dict representation
-    jd, objtypes_s2i = node_todict(
-        node, sort=sort, internal=internal, validate=validate,
-        rich=not compact,
-    )
-
-    if compact:
-        # Return a compact representation
-        return json.dumps(jd, separators=(',', ':'))
-
-    # Generate the json string
-    text = json.dumps(jd, separators=(',', ': '), indent=2)
+def annotate_jasonc(text, objtypes_s2i):
+    ''' Convert the special __ fields to jasonc comments and annotate the
+        symbolic fields with comments of their numeric value
+    '''
 
     # Convert the special __ fields to jasonc comments
     out = re.sub(
@@ -389,6 +624,130 @@ def GenerateJson(node, compact=False, sort=False, internal=False, validate=True)
     return out
 
 
+def load_schema():
+    ''' Load the JSON schema. Returns None if the schema isn't in use '''
+    global SCHEMA  # pylint: disable=global-statement
+    if not SCHEMA and sys.version_info[0] >= 3:
+        with open(os.path.join(objdictgen.JSON_SCHEMA), 'r') as f:
+            SCHEMA = json.loads(remove_jasonc(f.read()))
+    return SCHEMA
+
+
+def load_validators():
+    ''' Return the JSON schema validators for the top-level object and for
+        the dictionary entries. They are created once, as it is costly.
+        Returns (None, None) if the schema isn't in use.
+    '''
+    global VALIDATORS  # pylint: disable=global-statement
+    if VALIDATORS is None:
+        VALIDATORS = (None, None)
+        schema = load_schema()
+        if schema:
+            import jsonschema  # pylint: disable=import-outside-toplevel
+            cls = jsonschema.validators.validator_for(schema)
+            cls.check_schema(schema)
+            VALIDATORS = (cls(schema), cls({
+                '$schema': schema['$schema'],
+                '$id': schema['$id'],
+                'definitions': schema['definitions'],
+                'allOf': [{'$ref': '#object'}],
+            }))
+    return VALIDATORS
+
+
+def GenerateJson(node, compact=False, sort=False, internal=False, validate=True):
+    ''' Export a JSON string representation of the node '''
+
+    return ''.join(node_tojson_iter(
+        node, compact=compact, sort=sort, internal=internal, validate=validate,
+    ))
+
+
+def GenerateJsonStream(node, f, compact=False, sort=False, internal=False, validate=True):
+    ''' Write the JSON representation of the node to the file object f. Each
+        dictionary entry is written as soon as it has been converted, so the
+        complete dict representation of the node is never built in memory.
+    '''
+
+    for text in node_tojson_iter(
+        node, compact=compact, sort=sort, internal=internal, validate=validate,
+    ):
+        f.write(text)
+
+
+def node_tojson_iter(node, compact=False, sort=False, internal=False, validate=True):
+    ''' Generator producing the JSON text of the node in fragments. The joined
+        output is the same as json.dumps() of node_todict().
+    '''
+
+    # Get the object type mappings forwards (int to str) and backwards (str to int)
+    objtypes = get_object_types(node=node)
+    objtypes_i2s, objtypes_s2i = objtypes
+
+    # Get the top-level fields. The dictionary entries are produced by the
+    # generator and are written as they are made available.
+    jd = node_todict_header(node, internal=internal)
+    jd["dictionary"] = []
+    jd = copy_in_order(jd, JSON_TOP_ORDER)
+
+    # Cross check verification of the top-level fields
+    if validate and not internal:
+        validate_fromdict(remove_underscore(jd), objtypes_i2s, objtypes_s2i)
+
+    entries = node_todict_iter(
+        node, sort=sort, rich=not compact, internal=internal,
+        validate=validate, objtypes=objtypes,
+    )
+
+    if compact:
+        # Generate a compact representation
+        sep = '{'
+        for k, v in jd.items():
+            yield sep + json.dumps(k) + ':'
+            sep = ','
+            if k != 'dictionary':
+                yield json_dumps(v, compact=True)
+                continue
+            yield '['
+            comma = ''
+            for obj in entries:
+                yield comma + json_dumps(obj, compact=True)
+                comma = ','
+            yield ']'
+        yield '}'
+        return
+
+    def _dumps(obj, indent):
+        return json_dumps(obj).replace('\n', '\n' + indent)
+
+    # Generate the json text. Each fragment consists of complete lines, which
+    # allows the jsonc annotation to be done one fragment at a time.
+    yield '{'
+    keys = list(jd)
+    for i, k in enumerate(keys):
+        comma = ',' if i < len(keys) - 1 else ''
+        head = '\n  ' + json.dumps(k) + ': '
+        if k != 'dictionary':
+            yield annotate_jasonc(head + _dumps(jd[k], '  ') + comma, objtypes_s2i)
+            continue
+
+        # An entry is not written before the next is known, as the last
+        # entry must be written without the trailing comma
+        prev = None
+        for obj in entries:
+            if prev is None:
+                yield head + '['
+            else:
+                yield annotate_jasonc(prev + ',', objtypes_s2i)
+            prev = '\n    ' + _dumps(obj, '    ')
+        if prev is None:
+            yield head + '[]' + comma
+        else:
+            yield annotate_jasonc(prev, objtypes_s2i)
+            yield '\n  ]' + comma
+    yield '\n}'
+
+
 def GenerateNode(contents):
     ''' Import from JSON string or objects '''
 
@@ -398,11 +757,8 @@ def GenerateNode(contents):
         # Remove jsonc annotations
         jsontext = remove_jasonc(contents)
 
-        # Load the json, with awareness on ordering in py2
-        if sys.version_info[0] < 3:
-            jd = json.loads(jsontext, object_pairs_hook=ordereddict_hook)
-        else:
-            jd = json.loads(jsontext)
+        # Load the json
+        jd = json_loads(jsontext)
 
         # Remove any __ in the file
         jd = remove_underscore(jd)
@@ -412,17 +768,116 @@ def GenerateNode(contents):
     #        Often the od validator is better at giving useful errors
     #        than the json validator. However the type checking of the json
     #        validator is better.
-    global SCHEMA  # pylint: disable=global-statement
-    if not SCHEMA and sys.version_info[0] >= 3:
-        with open(os.path.join(objdictgen.JSON_SCHEMA), 'r') as f:
-            SCHEMA = json.loads(remove_jasonc(f.read()))
-
-    if SCHEMA:
-        jsonschema.validate(jd, schema=SCHEMA)
+    validator, _ = load_validators()
+    if validator:
+        validator.validate(jd)
 
     return node_fromdict(jd)
 
 
+def GenerateNodeStream(f):
+    ''' Import from a JSON file object. The entries in the dictionary are
+        read, validated and converted one at a time.
+    '''
+
+    # Get the validators for the top-level object and for the entries
+    validator, entry_validator = load_validators()
+
+    # The object type mappings are extended as the entries are read
+    objtypes_i2s, objtypes_s2i = get_object_types()
+
+    jd = ODict()
+    node = None
+    internal = False
+    trailing = False
+    order = []
+    deferred = []
+
+    def _header(node=None):
+        if validator:
+            validator.validate(jd)
+        validate_fromdict(jd, objtypes_i2s, objtypes_s2i)
+        return node_fromdict_header(jd, node)
+
+    def _ready(obj):
+        # The entry can't be converted before the header has been read
+        # or if it uses object types that haven't been defined yet
+        if node is None:
+            return False
+        if not isinstance(obj, dict) or not isinstance(obj.get('sub'), list):
+            return True
+        for sub in obj['sub'] + [obj.get('each')]:
+            if not isinstance(sub, dict) or 'type' not in sub:
+                continue
+            if sub['type'] not in objtypes_s2i and sub['type'] not in objtypes_i2s:
+                return False
+        return True
+
+    def _entry(num, obj):
+        if not internal:
+            validate_fromdict_parameter(obj, num, objtypes_i2s, objtypes_s2i)
+        node_fromdict_entry(node, obj, objtypes_s2i, internal=internal)
+        order[num] = obj["index"]
+
+    for key, value in read_json_iter(f):
+
+        if key != 'dictionary.item':
+            jd[key] = remove_underscore(value)
+
+            if node is not None:
+                # An optional header field follows the dictionary
+                trailing = True
+            elif key == 'dictionary' and FIELDS_DATA_MUST <= set(jd):
+                # The header is complete, as the dictionary is written last
+                node = _header()
+                internal = jd['$version'] == JSON_INTERNAL_VERSION
+            continue
+
+        obj = remove_underscore(value)
+        if entry_validator:
+            entry_validator.validate(obj)
+        num = len(order)
+        order.append(None)
+
+        add_object_type(obj, objtypes_i2s, objtypes_s2i)
+
+        if _ready(obj):
+            _entry(num, obj)
+        else:
+            deferred.append((num, obj))
+
+    if node is None:
+        node = _header()
+        internal = jd['$version'] == JSON_INTERNAL_VERSION
+    elif trailing:
+        _header(node)
+
+    # Convert the entries that had to wait for the complete input
+    for num, obj in deferred:
+        _entry(num, obj)
+
+    # See node_fromdict() for the use of IndexOrder
+    node.IndexOrder = order
+
+    return node
+
+
+def ScanJson(f):
+    ''' Generator producing (index, entry) for each of the entries in the
+        dictionary of the JSON file object f. No Node is created and the
+        entries are not validated.
+    '''
+
+    for key, value in read_json_iter(f):
+        if key != 'dictionary.item':
+            continue
+        obj = remove_underscore(value)
+        index = None
+        if isinstance(obj, dict):
+            index = str_to_number(obj.get('index'))
+        yield index, obj
+
+
 def node_todict(node, sort=False, rich=True, internal=False, validate=True):
     '''
         Convert a node to dict representation for serialization.
@@ -441,8 +896,53 @@ def node_todict(node, sort=False, rich=True, internal=False, validate=True):
             output is valid. Used to double check format.
     '''
 
+    # Get the object type mappings forwards (int to str) and backwards (str to int)
+    objtypes = get_object_types(node=node)
+    objtypes_i2s, objtypes_s2i = objtypes
+
     # Get the dict representation of the node object
-    jd = node.GetDict()
+    jd = node_todict_header(node, internal=internal)
+
+    # Parse through all parameters
+    jd["dictionary"] = list(node_todict_iter(
+        node, sort=sort, rich=rich, internal=internal,
+        validate=validate, objtypes=objtypes,
+    ))
+
+    # Rearrange the order of the top-level dict
+    jd = copy_in_order(jd, JSON_TOP_ORDER)
+
+    # Cross check verification to see if we later can import the generated
+    # dict. The dictionary entries are verified by node_todict_iter()
+    if validate and not internal:
+        validate_fromdict(remove_underscore(dict(jd, dictionary=[])), objtypes_i2s, objtypes_s2i)
+
+    return jd, objtypes_s2i
+
+
+def output_datetime():
+    ''' Return the time for the $date field, which is SOURCE_DATE_EPOCH if
+        it is set
+    '''
+    epoch = objdictgen.source_date_epoch()
+    if epoch is not None:
+        return datetime(1970, 1, 1) + timedelta(seconds=epoch)
+    return datetime.now()
+
+
+def node_todict_header(node, internal=False):
+    ''' Return the top-level fields of the node in dict representation. The
+        dictionary entries are not included, see node_todict_iter()
+    '''
+
+    # Get the dict representation of the node object, except the members
+    # containing the parameters
+    # - NOTE: SpecificMenu is not used in dict representation
+    jd = ODict(
+        (k, copy.deepcopy(v)) for k, v in node.__dict__.items()
+        if k not in ('Dictionary', 'ParamsDictionary', 'Profile', 'SpecificMenu',
+                     'DS302', 'UserMapping', 'IndexOrder')
+    )
 
     # Rename the top-level fields
     for k, v in {
@@ -462,121 +962,129 @@ def node_todict(node, sort=False, rich=True, internal=False, validate=True):
         '$version': JSON_INTERNAL_VERSION if internal else JSON_VERSION,
         '$description': JSON_DESCRIPTION,
         '$tool': str(objdictgen.ODG_PROGRAM) + ' ' + str(objdictgen.ODG_VERSION),
-        '$date': datetime.isoformat(datetime.now()),
+        '$date': datetime.isoformat(output_datetime()),
     })
 
-    # Get the order for the indexes
-    order = node.GetAllParameters(sort=sort)
+    return jd
 
-    # Get the object type mappings forwards (int to str) and backwards (str to int)
-    objtypes_i2s, objtypes_s2i = get_object_types(node=node)
 
-    # Parse through all parameters
-    dictionary = []
-    for index in order:
-        obj = None
-        try:
-            # Get the internal dict representation of the node parameter
-            obj = node.GetIndexDict(index)
-
-            # Add in the index (as dictionary is a list)
-            obj["index"] = "0x{:04X}".format(index) if rich else index
+def node_todict_iter(node, sort=False, rich=True, internal=False, validate=True,
+                     objtypes=None):
+    ''' Generator of the dict representation of the parameters in the node.
+        The parameters are converted one at a time as they are requested.
+        See node_todict() for the arguments.
+    '''
 
-            # Don't wrangle further if the internal format is wanted
-            if internal:
-                continue
+    # Get the object type mappings forwards (int to str) and backwards (str to int)
+    if objtypes is None:
+        objtypes = get_object_types(node=node)
+    objtypes_i2s, objtypes_s2i = objtypes
 
-            # The internal memory model of Node is complex, this function exists
-            # to validate the input data, i.e. the Node object before migrating
-            # to JSON format. This is mainly to ensure no wrong assumptions
-            # produce unexpected output.
-            if validate:
-                validate_nodeindex(node, index, obj)
+    # Get the order for the indexes
+    order = node.GetAllParameters(sort=sort)
 
-            # Get the parameter for the index
-            obj = node_todict_parameter(obj, node, index)
+    for num, index in enumerate(order):
 
-            # JSON format adoptions
-            # ---------------------
+        obj = node_todict_index(node, index, objtypes_i2s, rich=rich,
+                                internal=internal, validate=validate)
 
-            # The struct describes what kind of object structure this object have
-            # See OD_* in node.py
-            struct = obj["struct"]
-            unused = obj.get("unused", False)
+        # Rearrange order of Dictionary[*]
+        obj = copy_in_order(obj, JSON_DICTIONARY_ORDER)
 
-            info = []
-            if not unused:
-                info = list(node.GetAllSubentryInfos(index))
+        # Cross check verification to see if we later can import the generated dict
+        if validate and not internal:
+            validate_fromdict_parameter(remove_underscore(obj), num, objtypes_i2s, objtypes_s2i)
 
-            # Rename the mandatory field
-            if "need" in obj:
-                obj["mandatory"] = obj.pop("need")
+        yield obj
 
-            # Replace numerical struct with symbolic value
-            if rich:
-                obj["struct"] = OD.to_string(struct, struct)
 
-            if rich and "name" not in obj:
-                obj["__name"] = node.GetEntryName(index)
+def node_todict_index(node, index, objtypes_i2s, rich=True, internal=False, validate=True):
+    ''' Return the dict representation of one parameter in the node '''
 
-            # Iterater over the sub-indexes (if present)
-            for i, sub in enumerate(obj.get("sub", [])):
+    try:
+        # Get the internal dict representation of the node parameter. The
+        # internal format is returned as-is, so it needs its own copy. The
+        # data is otherwise not copied here, as node_todict_parameter()
+        # copies the parts it modifies.
+        obj = node.GetIndexDict(index, deepcopy=internal)
+
+        # Add in the index (as dictionary is a list)
+        obj["index"] = "0x{:04X}".format(index) if rich else index
+
+        # Don't wrangle further if the internal format is wanted
+        if internal:
+            return obj
+
+        # The internal memory model of Node is complex, this function exists
+        # to validate the input data, i.e. the Node object before migrating
+        # to JSON format. This is mainly to ensure no wrong assumptions
+        # produce unexpected output.
+        if validate:
+            validate_nodeindex(node, index, obj)
+
+        # Get the parameter for the index
+        obj = node_todict_parameter(obj, node, index)
+
+        # JSON format adoptions
+        # ---------------------
+
+        # The struct describes what kind of object structure this object have
+        # See OD_* in node.py
+        struct = obj["struct"]
+        unused = obj.get("unused", False)
 
-                # Add __name when rich format
-                if rich and info and "name" not in sub:
-                    sub["__name"] = info[i]["name"]
+        info = []
+        if not unused:
+            info = list(node.GetAllSubentryInfos(index))
 
-                # Replace numeric type with string value
-                if rich and "type" in sub:
-                    sub["type"] = objtypes_i2s.get(sub["type"], sub["type"])
+        # Rename the mandatory field
+        if "need" in obj:
+            obj["mandatory"] = obj.pop("need")
 
-                # # Add __type when rich format
-                if rich and info and "type" not in sub:
-                    sub["__type"] = objtypes_i2s.get(info[i]["type"], info[i]["type"])
+        # Replace numerical struct with symbolic value
+        if rich:
+            obj["struct"] = OD.to_string(struct, struct)
 
-            if 'each' in obj:
-                sub = obj["each"]
+        if rich and "name" not in obj:
+            obj["__name"] = node.GetEntryName(index)
 
-                # Replace numeric type with string value
-                if rich and "type" in sub:
-                    sub["type"] = objtypes_i2s.get(sub["type"], sub["type"])
+        # Iterater over the sub-indexes (if present)
+        for i, sub in enumerate(obj.get("sub", [])):
 
-            # ---------------------
+            # Add __name when rich format
+            if rich and info and "name" not in sub:
+                sub["__name"] = info[i]["name"]
 
-            # Rearrage order of 'sub' and 'each'
-            obj["sub"] = [
-                copy_in_order(k, JSON_SUB_ORDER)
-                for k in obj["sub"]
-            ]
-            if 'each' in obj:
-                obj["each"] = copy_in_order(obj["each"], JSON_SUB_ORDER)
+            # Replace numeric type with string value
+            if rich and "type" in sub:
+                sub["type"] = objtypes_i2s.get(sub["type"], sub["type"])
 
-        except Exception as exc:
-            exc_amend(exc, "Index 0x{0:04x} ({0}): ".format(index))
-            raise
+            # # Add __type when rich format
+            if rich and info and "type" not in sub:
+                sub["__type"] = objtypes_i2s.get(info[i]["type"], info[i]["type"])
 
-        finally:
-            dictionary.append(obj)
+        if 'each' in obj:
+            sub = obj["each"]
 
-    # Rearrange order of Dictionary[*]
-    jd["dictionary"] = [
-        copy_in_order(k, JSON_DICTIONARY_ORDER) for k in dictionary
-    ]
+            # Replace numeric type with string value
+            if rich and "type" in sub:
+                sub["type"] = objtypes_i2s.get(sub["type"], sub["type"])
 
-    # Rearrange the order of the top-level dict
-    jd = copy_in_order(jd, JSON_TOP_ORDER)
+        # ---------------------
 
-    # Cleanup of unwanted members
-    # - NOTE: SpecificMenu is not used in dict representation
-    for k in ('Dictionary', 'ParamsDictionary', 'Profile', 'SpecificMenu',
-              'DS302', 'UserMapping', 'IndexOrder'):
-        jd.pop(k, None)
+        # Rearrage order of 'sub' and 'each'
+        obj["sub"] = [
+            copy_in_order(k, JSON_SUB_ORDER)
+            for k in obj["sub"]
+        ]
+        if 'each' in obj:
+            obj["each"] = copy_in_order(obj["each"], JSON_SUB_ORDER)
 
-    # Cross check verification to see if we later can import the generated dict
-    if validate and not internal:
-        validate_fromdict(remove_underscore(jd), objtypes_i2s, objtypes_s2i)
+        return obj
 
-    return jd, objtypes_s2i
+    except Exception as exc:
+        exc_amend(exc, "Index 0x{0:04x} ({0}): ".format(index))
+        raise
 
 
 def node_todict_parameter(obj, node, index):
@@ -619,7 +1127,7 @@ def node_todict_parameter(obj, node, index):
         if group != 'user':
             obj['group'] = group
 
-        baseobj = obj.pop(group)
+        baseobj = dict(obj.pop(group))  # Copy, as it is emptied below
         struct = baseobj["struct"]  # Checked in B
 
     else:
@@ -637,9 +1145,9 @@ def node_todict_parameter(obj, node, index):
         if k in baseobj:
             obj[k] = baseobj.pop(k)
 
-    # Ensure fields exists
+    # Ensure fields exists. The subs are copied as they are modified
     obj['struct'] = struct
-    obj['sub'] = obj.pop('values', [])
+    obj['sub'] = [dict(v) for v in obj.pop('values', [])]
 
     # Move subindex[1] to 'each' on objecs that contain 'nbmax'
     if len(obj['sub']) > 1 and 'nbmax' in obj['sub'][1]:
@@ -655,12 +1163,16 @@ def node_todict_parameter(obj, node, index):
     # Extract the params
     has_params = 'params' in obj
     has_dictionary = 'dictionary' in obj
-    params = obj.pop("params", {})
     dictvals = obj.pop("dictionary", [])
 
+    # Copy the params, as they are mutated here
+    params = {
+        k: dict(v) if isinstance(v, dict) else v
+        for k, v in obj.pop("params", {}).items()
+    }
+
     # These types places the params in the top-level dict
     if has_params and struct in (OD.VAR, OD.NVAR):
-        params = params.copy()  # Important, as its mutated here
         param0 = {}
         for k in FIELDS_PARAMS:
             if k in params:
@@ -872,66 +1384,15 @@ def node_fromdict(jd, internal=False):
     # Validate the input json against the schema
     validate_fromdict(jd, objtypes_i2s, objtypes_s2i)
 
-    # Create default values for optional components
-    jd.setdefault("id", 0)
-    jd.setdefault("profile", "None")
-
     # Create the node and fill the most basic data
-    node = objdictgen.Node(
-        name=jd["name"], type=jd["type"], id=jd["id"],
-        description=jd["description"], profilename=jd["profile"],
-    )
-
-    # Restore optional values
-    if 'default_string_size' in jd:
-        node.DefaultStringSize = jd["default_string_size"]
+    node = node_fromdict_header(jd)
 
     # An import of a internal JSON file?
     internal = internal or jd['$version'] == JSON_INTERNAL_VERSION
 
     # Iterate over the items to convert them to Node object
     for obj in jd["dictionary"]:
-
-        # Convert the index number (which might be "0x" string)
-        index = str_to_number(obj['index'])
-        obj["index"] = index
-        assert isinstance(index, int)  # For mypy
-
-        try:
-            if not internal:
-                # Mutate obj containing the generic dict to the internal node format
-                obj = node_fromdict_parameter(obj, objtypes_s2i)
-
-        except Exception as exc:
-            exc_amend(exc, "Index 0x{0:04x} ({0}): ".format(index))
-            raise
-
-        # Copy the object to node object entries
-        if 'dictionary' in obj:
-            node.Dictionary[index] = obj['dictionary']
-        if 'params' in obj:
-            node.ParamsDictionary[index] = {str_to_number(k): v for k, v in obj['params'].items()}
-        if 'profile' in obj:
-            node.Profile[index] = obj['profile']
-        if 'ds302' in obj:
-            node.DS302[index] = obj['ds302']
-        if 'user' in obj:
-            node.UserMapping[index] = obj['user']
-
-        # Verify against built-in data (don't verify repeated params)
-        if 'built-in' in obj and not obj.get('repeat', False):
-            baseobj = maps.MAPPING_DICTIONARY.get(index)
-
-            diff = deepdiff.DeepDiff(baseobj, obj['built-in'], view='tree')
-            if diff:
-                if sys.version_info[0] >= 3:
-                    log.debug("Index 0x{0:04x} ({0}) Difference between built-in object and imported:".format(index))
-                    for line in diff.pretty().splitlines():
-                        log.debug('  ' + line)
-                else:
-                    # FIXME: No print
-                    print("WARNING: Py2 cannot print difference of objects")
-                raise ValidationError("Built-in parameter index 0x{0:04x} ({0}) does not match against system parameters".format(index))
+        node_fromdict_entry(node, obj, objtypes_s2i, internal=internal)
 
     # There is a weakness to the Node implementation: There is no store
     # of the order of the incoming parameters, instead the data is spread over
@@ -942,6 +1403,77 @@ def node_fromdict(jd, internal=False):
     return node
 
 
+def node_fromdict_header(jd, node=None):
+    ''' Create a new Node from the top-level fields in jd, or set the
+        top-level fields of node
+    '''
+
+    # Create default values for optional components
+    jd.setdefault("id", 0)
+    jd.setdefault("profile", "None")
+
+    # Create the node and fill the most basic data
+    if node is None:
+        node = objdictgen.Node()
+    node.Name = jd["name"]
+    node.Type = jd["type"]
+    node.ID = jd["id"]
+    node.Description = jd["description"]
+    node.ProfileName = jd["profile"]
+
+    # Restore optional values
+    if 'default_string_size' in jd:
+        node.DefaultStringSize = jd["default_string_size"]
+
+    return node
+
+
+def node_fromdict_entry(node, obj, objtypes_s2i, internal=False):
+    ''' Convert the dict entry obj and add it into the node '''
+
+    # Convert the index number (which might be "0x" string)
+    index = str_to_number(obj['index'])
+    obj["index"] = index
+    assert isinstance(index, int)  # For mypy
+
+    try:
+        if not internal:
+            # Mutate obj containing the generic dict to the internal node format
+            obj = node_fromdict_parameter(obj, objtypes_s2i)
+
+    except Exception as exc:
+        exc_amend(exc, "Index 0x{0:04x} ({0}): ".format(index))
+        raise
+
+    # Copy the object to node object entries
+    if 'dictionary' in obj:
+        node.Dictionary[index] = obj['dictionary']
+    if 'params' in obj:
+        node.ParamsDictionary[index] = {str_to_number(k): v for k, v in obj['params'].items()}
+    if 'profile' in obj:
+        node.Profile[index] = obj['profile']
+    if 'ds302' in obj:
+        node.DS302[index] = obj['ds302']
+    if 'user' in obj:
+        node.UserMapping[index] = obj['user']
+
+    # Verify against built-in data (don't verify repeated params)
+    if 'built-in' in obj and not obj.get('repeat', False):
+        baseobj = maps.MAPPING_DICTIONARY.get(index)
+
+        import deepdiff  # pylint: disable=import-outside-toplevel
+        diff = deepdiff.DeepDiff(baseobj, obj['built-in'], view='tree')
+        if diff:
+            if sys.version_info[0] >= 3:
+                log.debug("Index 0x{0:04x} ({0}) Difference between built-in object and imported:".format(index))
+                for line in diff.pretty().splitlines():
+                    log.debug('  ' + line)
+            else:
+                # FIXME: No print
+                print("WARNING: Py2 cannot print difference of objects")
+            raise ValidationError("Built-in parameter index 0x{0:04x} ({0}) does not match against system parameters".format(index))
+
+
 def node_fromdict_parameter(obj, objtypes_s2i):
 
     # -- STEP 1a) --
@@ -1091,6 +1623,19 @@ def validate_fromdict(jsonobj, objtypes_i2s=None, objtypes_s2i=None):
     # Verify that we have the expected members
     member_compare(jsonobj.keys(), FIELDS_DATA_MUST, FIELDS_DATA_OPT)
 
+    # Validate "dictionary" (must)
+    if not isinstance(jd['dictionary'], list):
+        raise ValidationError("No dictionary or dictionary not list")
+
+    for num, obj in enumerate(jd['dictionary']):
+        validate_fromdict_parameter(obj, num, objtypes_i2s, objtypes_s2i)
+
+
+def validate_fromdict_parameter(obj, num=0, objtypes_i2s=None, objtypes_s2i=None):
+    ''' Validate one entry of the dictionary list. num is the position of the
+        entry in the list.
+    '''
+
     def _validate_sub(obj, idx=0, is_var=False, is_repeat=False, is_each=False):
 
         # Validated: (See FIELDS_MAPVAPS_*, FIELDS_PARAMS and FIELDS_VALUE)
@@ -1309,77 +1854,297 @@ def validate_fromdict(jsonobj, objtypes_i2s=None, objtypes_s2i=None):
                 if sum(has_name) != len(has_name):
                     raise ValidationError("Not all subitems have name, {} of {}".format(sum(has_name), len(has_name)))
 
-    # Validate "dictionary" (must)
-    if not isinstance(jd['dictionary'], list):
-        raise ValidationError("No dictionary or dictionary not list")
+    if not isinstance(obj, dict):
+        raise ValidationError("Item number {} of 'dictionary' is not a dict".format(num))
 
-    for num, obj in enumerate(jd['dictionary']):
-        if not isinstance(obj, dict):
-            raise ValidationError("Item number {} of 'dictionary' is not a dict".format(num))
+    sindex = obj.get('index', 'item {}'.format(num))
+    index = str_to_number(sindex)
 
-        sindex = obj.get('index', 'item {}'.format(num))
-        index = str_to_number(sindex)
+    try:
+        _validate_dictionary(index, obj)
+    except Exception as exc:
+        exc_amend(exc, "Index 0x{0:04x} ({0}): ".format(index))
+        raise
 
-        try:
-            _validate_dictionary(index, obj)
-        except Exception as exc:
-            exc_amend(exc, "Index 0x{0:04x} ({0}): ".format(index))
-            raise
 
+class DiffChange(namedtuple('DiffChange', ('chtype', 'index', 'keys', 't1', 't2'))):
+    ''' A difference between two nodes. index is the OD index of the change or
+        '' for the node data outside the dictionary. keys is the path to the
+        changed value within the index. t1 and t2 are the left and right value,
+        None if the value only exists on one side.
+    '''
+    __slots__ = ()
 
-def diff_nodes(node1, node2, as_dict=True, validate=True):
+    @property
+    def path(self):
+        ''' The keys as a path string, e.g. ['sub'][1]['value'] '''
+        return ''.join('[{!r}]'.format(k) for k in self.keys)
 
-    diffs = {}
 
+def canonical_text(obj):
+    ''' Return a canonical text representation of obj. Dicts are represented
+        independent of the order of their keys.
+    '''
+    if isinstance(obj, dict):
+        items = sorted((repr(k), canonical_text(v)) for k, v in obj.items())
+        return '{' + ','.join(k + ':' + v for k, v in items) + '}'
+    if isinstance(obj, list):
+        return '[' + ','.join(canonical_text(v) for v in obj) + ']'
+    if isinstance(obj, tuple):
+        return '(' + ','.join(canonical_text(v) for v in obj) + ')'
+    return repr(obj)
+
+
+def fingerprint(obj):
+    ''' Return a hash of the canonical representation of obj '''
+    return hashlib.sha1(canonical_text(obj).encode('utf-8')).hexdigest()
+
+
+def diff_data(node, as_dict, validate):
+    ''' Return the node data outside the dictionary and a generator of
+        (index, data) for each of the indexes in the node, in index order.
+    '''
     if as_dict:
-        jd1, _ = node_todict(node1, sort=True, validate=validate)
-        jd2, _ = node_todict(node2, sort=True, validate=validate)
-
-        dt = datetime.isoformat(datetime.now())
-        jd1['$date'] = jd2['$date'] = dt
-
-        diff = deepdiff.DeepDiff(jd1, jd2, exclude_paths=[
-            "root['dictionary']"
-        ], view='tree')
-
-        for chtype, changes in diff.items():
-            for change in changes:
-                path = change.path()
-                entries = diffs.setdefault('', [])
-                entries.append((chtype, change, path.replace('root', '')))
-
-        diff = deepdiff.DeepDiff(jd1['dictionary'], jd2['dictionary'], view='tree', group_by='index')
-
-        res = re.compile(r"root\[('0x[0-9a-fA-F]+'|\d+)\]")
-
-        for chtype, changes in diff.items():
-            for change in changes:
-                path = change.path()
-                m = res.search(path)
-                if m:
-                    num = str_to_number(m.group(1).strip("'"))
-                    entries = diffs.setdefault(num, [])
-                    entries.append((chtype, change, path.replace(m.group(0), '')))
-                else:
-                    entries = diffs.setdefault('', [])
-                    entries.append((chtype, change, path.replace('root', '')))
+        objtypes = get_object_types(node=node)
+        data = node_todict_header(node)
+        data.pop('$date', None)
+        if validate:
+            validate_fromdict(remove_underscore(dict(data, dictionary=[])), *objtypes)
+        entries = (
+            (str_to_number(obj['index']), obj)
+            for obj in node_todict_iter(node, sort=True, validate=validate, objtypes=objtypes)
+        )
+        return data, entries
 
+    # Index data is spread across these attributes of the node
+    groups = objdictgen.node.INDEX_GROUPS
+    data = ODict(
+        (k, v) for k, v in node.__dict__.items()
+        if k not in groups and k != 'IndexOrder'
+    )
+    entries = ODict()
+    for group in groups:
+        for index, value in getattr(node, group, {}).items():
+            entries.setdefault(index, ODict())[group] = value
+    return data, iter(sorted(entries.items(), key=lambda kv: kv[0]))
+
+
+def diff_changes(index, data1, data2):
+    ''' Return a list of DiffChange for the differences between data1 and
+        data2 of the given index.
+    '''
+    if fingerprint(data1) == fingerprint(data2):
+        return []
+    import deepdiff  # pylint: disable=import-outside-toplevel
+    diff = deepdiff.DeepDiff(data1, data2, view='tree')
+    return [
+        DiffChange(
+            chtype, index, tuple(change.path(output_format='list')),
+            None if 'added' in chtype else change.t1,
+            None if 'removed' in chtype else change.t2,
+        )
+        for chtype, changes in diff.items()
+        for change in changes
+    ]
+
+
+def diff_nodes(node1, node2, as_dict=True, validate=True, brief=False):
+    ''' Compare two nodes and return a dict with the list of DiffChange for
+        each index that differ. The '' key contains the changes outside the
+        dictionary. Only the indexes where the fingerprint differ are compared
+        in detail.
+
+        brief: Stop at the first index that differ and return it with an
+            empty list of changes. Used when only equality is needed.
+    '''
+
+    diffs = {}
+
+    data1, entries1 = diff_data(node1, as_dict, validate)
+    data2, entries2 = diff_data(node2, as_dict, validate)
+
+    if brief:
+        if fingerprint(data1) != fingerprint(data2):
+            return {'': []}
     else:
-        diff = deepdiff.DeepDiff(node1, node2, exclude_paths=[
-            "root.IndexOrder"
-        ], view='tree')
-
-        res = re.compile(r"root\.(Profile|Dictionary|ParamsDictionary|UserMapping|DS302)\[(\d+)\]")
-
-        for chtype, changes in diff.items():
-            for change in changes:
-                path = change.path()
-                m = res.search(path)
-                if m:
-                    entries = diffs.setdefault(int(m.group(2)), [])
-                    entries.append((chtype, change, path.replace(m.group(0), m.group(1))))
-                else:
-                    entries = diffs.setdefault('', [])
-                    entries.append((chtype, change, path.replace('root.', '')))
+        changes = diff_changes('', data1, data2)
+        if changes:
+            diffs[''] = changes
+
+    # Walk both sides in index order. The entries are generated as they are
+    # needed, so brief mode doesn't convert the indexes after the first
+    # difference.
+    end = (None, None)
+    index1, obj1 = next(entries1, end)
+    index2, obj2 = next(entries2, end)
+    while index1 is not None or index2 is not None:
+        if index2 is None or (index1 is not None and index1 < index2):
+            index = index1
+            changes = [DiffChange('dictionary_item_removed', index, (), obj1, None)]
+            index1, obj1 = next(entries1, end)
+        elif index1 is None or index2 < index1:
+            index = index2
+            changes = [DiffChange('dictionary_item_added', index, (), None, obj2)]
+            index2, obj2 = next(entries2, end)
+        else:
+            index = index1
+            if brief:
+                changes = fingerprint(obj1) != fingerprint(obj2)
+            else:
+                changes = diff_changes(index, obj1, obj2)
+            index1, obj1 = next(entries1, end)
+            index2, obj2 = next(entries2, end)
+        if changes:
+            if brief:
+                return {index: []}
+            diffs[index] = changes
+
+    return diffs
+
+
+def node_fingerprints(node, as_dict=True, validate=True):
+    ''' Return a dict with the fingerprint of each index in the node. The ''
+        key contains the fingerprint of the data outside the dictionary.
+    '''
+    data, entries = diff_data(node, as_dict, validate)
+    fingerprints = ODict([('', fingerprint(data))])
+    for index, obj in entries:
+        fingerprints[index] = fingerprint(obj)
+    return fingerprints
+
+
+def file_fingerprints(args):
+    ''' Load the OD file and return its fingerprints and the list of
+        (inputfile, mtime) of the files used to load it. Called by the
+        workers of diff_corpus() with the tuple (filepath, as_dict, validate).
+    '''
+    filepath, as_dict, validate = args
+    try:
+        with objdictgen.node.RecordInputFiles() as inputfiles:
+            node = objdictgen.LoadFile(filepath)
+            if validate:
+                node.Validate()
+            fps = node_fingerprints(node, as_dict=as_dict, validate=validate)
+        return fps, objdictgen.node.InputFilesState(inputfiles)
+    except Exception as exc:
+        exc_amend(exc, "{}: ".format(filepath))
+        raise
+
+
+def load_cached_fingerprints(cachefile):
+    ''' Return the fingerprints from the cache file, or None if it doesn't
+        exist or any of the files used to load the OD have changed.
+    '''
+    try:
+        with open(cachefile, 'r') as f:
+            entry = json.load(f)
+        if not objdictgen.node.InputFilesUnchanged(entry['inputfiles']):
+            return None
+        fps = ODict((k, v) for k, v in entry['fingerprints'])
+        # Mark the cache file as recently used
+        os.utime(cachefile, None)
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        return None
+    return fps
+
+
+def corpus_fingerprints(filepaths, as_dict=True, validate=True, cachedir=None,
+                        processes=None):
+    ''' Return a dict with the fingerprints of each of the OD files. The
+        files are loaded in parallel in a process pool with processes workers.
+        The fingerprints are cached in cachedir, which defaults to the
+        environment variable ODG_CACHE_DIR. The cache is keyed by the content
+        of the file, so only new or changed files are loaded. The cached
+        fingerprints are not used if the profiles used by the file change.
+    '''
+    if cachedir is None:
+        cachedir = os.environ.get('ODG_CACHE_DIR')
+
+    # The profiles are looked up in the profile directories
+    mode = "{} {} {} {}".format(
+        objdictgen.ODG_VERSION, 'dict' if as_dict else 'internal',
+        'validate' if validate else 'novalidate',
+        os.pathsep.join(objdictgen.PROFILE_DIRECTORIES),
+    )
+
+    result = ODict()
+    todo = []
+    for filepath in filepaths:
+        result[filepath] = None
+        if not cachedir:
+            todo.append((filepath, None))
+            continue
+        key = hashlib.sha1(mode.encode('utf-8') + b'\0')
+        with open(filepath, 'rb') as f, objdictgen.node.MapFile(f) as data:
+            key.update(data)
+        cachefile = os.path.join(cachedir, key.hexdigest() + '.json')
+        result[filepath] = load_cached_fingerprints(cachefile)
+        if result[filepath] is None:
+            todo.append((filepath, cachefile))
+
+    # Load the files which are not in the cache
+    args = [(filepath, as_dict, validate) for filepath, _ in todo]
+    if processes == 1 or len(args) < 2:
+        fingerprints = [file_fingerprints(arg) for arg in args]
+    else:
+        import multiprocessing  # pylint: disable=import-outside-toplevel
+        pool = multiprocessing.Pool(processes)
+        try:
+            fingerprints = pool.map(file_fingerprints, args)
+        finally:
+            pool.close()
+            pool.join()
+
+    for (filepath, cachefile), (fps, inputfiles) in zip(todo, fingerprints):
+        result[filepath] = fps
+        if not cachefile:
+            continue
+        if not os.path.exists(cachedir):
+            os.makedirs(cachedir)
+        # Write via a temporary file to never leave a partial cache entry
+        with objdictgen.node.OpenOutput(cachefile) as f:
+            json.dump({
+                'inputfiles': inputfiles, 'fingerprints': list(fps.items()),
+            }, f)
+
+    if todo and cachedir:
+        objdictgen.node.PruneCache(cachedir, '.json', CORPUS_CACHE_SIZE)
+
+    return result
+
+
+
+def diff_corpus(filepaths, as_dict=True, validate=True, cachedir=None,
+                processes=None):
+    ''' Compare the fingerprints of the OD files with the first file, the
+        reference. Returns a dict with the list of DiffChange for each index
+        that differ in any of the files. The keys of each change is the
+        filepath that differ and t1 and t2 are the fingerprints. See
+        corpus_fingerprints() for the arguments.
+    '''
+    corpus = corpus_fingerprints(filepaths, as_dict=as_dict, validate=validate,
+                                 cachedir=cachedir, processes=processes)
+    reference, others = filepaths[0], filepaths[1:]
+    fps1 = corpus[reference]
+
+    indexes = set(fps1)
+    for filepath in others:
+        indexes.update(corpus[filepath])
+
+    diffs = {}
+    for index in sorted(indexes, key=lambda i: (i != '', i)):
+        for filepath in others:
+            fp1, fp2 = fps1.get(index), corpus[filepath].get(index)
+            if fp1 == fp2:
+                continue
+            if fp2 is None:
+                chtype = 'dictionary_item_removed'
+            elif fp1 is None:
+                chtype = 'dictionary_item_added'
+            else:
+                chtype = 'values_changed'
+            diffs.setdefault(index, []).append(
+                DiffChange(chtype, index, (filepath,), fp1, fp2)
+            )
 
     return diffs
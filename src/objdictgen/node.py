@@ -26,21 +26,25 @@ from builtins import object
 from builtins import range
 
 import os
+import io
 import sys
 import re
+import mmap
 import copy
 import logging
+import weakref
+import binascii
+import hashlib
+from contextlib import contextmanager
 from collections import OrderedDict
 import traceback
-from past.builtins import execfile
-from future.utils import raise_from
+from future.utils import raise_from, exec_
 import colorama
 
 import objdictgen
-from objdictgen.nosis import pickle as nosis
 from objdictgen import maps
 from objdictgen.maps import OD, MAPPING_DICTIONARY
-from objdictgen import jsonod, eds_utils, gen_cfile
+from objdictgen import jsonod, eds_utils, snapshot
 
 if sys.version_info[0] >= 3:
     unicode = str  # pylint: disable=invalid-name
@@ -55,20 +59,157 @@ Style = colorama.Style
 
 RE_NAME = re.compile(r'(.*)\[(.*)\]')
 
+# The Node members which contain the data of the indexes
+INDEX_GROUPS = ('Profile', 'Dictionary', 'ParamsDictionary', 'UserMapping', 'DS302')
+
+# Cache of the index fingerprints of each node. It is kept outside the Node
+# objects, as the Node __dict__ is the data of the node.
+FINGERPRINTS = weakref.WeakKeyDictionary()
+
+# The Node members which are not part of the fingerprint of the node, as they
+# don't change the content of the OD. SpecificMenu is the menu of the editor.
+FINGERPRINT_IGNORE = ('IndexOrder', 'SpecificMenu', 'Description')
+
+# The lists of the active RecordInputFiles() contexts
+INPUT_FILES = []
+
+# Cache of the compiled profiles, {profilepath: (mtime, code)}
+PROFILE_CODE = {}
+
+# Cache of the loaded nodes, {(filepath, profiledirs): (stat, [(inputfile,
+# mtime), ...], snapshot)}. The cache is only used when this is set to a dict,
+# e.g. by the odg server. It is ordered from the least recently used.
+NODE_CACHE = None
+
+# Number of the most recently used nodes kept in NODE_CACHE
+NODE_CACHE_SIZE = 100
+
+# Number of bytes read from the start of a file to detect its format
+SNIFF_SIZE = 64
+
+# Input files of at least this size are memory-mapped instead of read
+MMAP_THRESHOLD = 1024 * 1024
+
 
 # ------------------------------------------------------------------------------
 #                         Utils
 # ------------------------------------------------------------------------------
+def SniffFileType(header):
+    """ Return the format of the file starting with the bytes header, one of
+        'snap', 'xml', 'eds' or 'json'
+    """
+    if header.startswith(snapshot.MAGIC):
+        return 'snap'
+    if header.startswith(b"<?xml"):
+        return 'xml'
+    lines = header.splitlines()
+    if lines and lines[0].rstrip() == b"[FileInfo]":
+        return 'eds'
+    return 'json'
+
+
+def SniffFile(filepath):
+    """ Return the format of the file filepath """
+    with open(filepath, 'rb') as f:
+        return SniffFileType(f.read(SNIFF_SIZE))
+
+
 def isXml(filepath):
-    with open(filepath, 'r') as f:
-        header = f.read(5)
-        return header == "<?xml"
+    return SniffFile(filepath) == 'xml'
 
 
 def isEds(filepath):
-    with open(filepath, 'r') as f:
-        header = f.readline().rstrip()
-        return header == "[FileInfo]"
+    return SniffFile(filepath) == 'eds'
+
+
+def isSnapshot(filepath):
+    return SniffFile(filepath) == 'snap'
+
+
+def ReplaceFile(src, dst):
+    """ Rename the file src to dst, replacing dst if it exists """
+    if sys.version_info[0] >= 3:
+        os.replace(src, dst)
+        return
+    # Python 2 has no os.replace() and os.rename() doesn't replace an
+    # existing file on Windows
+    if os.name == 'nt' and os.path.exists(dst):
+        os.remove(dst)
+    os.rename(src, dst)
+
+
+@contextmanager
+def OpenOutput(filepath, mode="w"):
+    """ Give a temporary file object for writing the file filepath. It
+        replaces filepath if the context exits without errors, otherwise the
+        existing filepath is kept as is.
+    """
+    tmpfile = "{}.{}.tmp".format(filepath, os.getpid())
+    try:
+        with open(tmpfile, mode) as f:
+            yield f
+        ReplaceFile(tmpfile, filepath)
+    finally:
+        if os.path.exists(tmpfile):
+            os.remove(tmpfile)
+
+
+def PruneCache(cachedir, suffix, size):
+    """ Remove the least recently used files ending with suffix from the
+        cache directory cachedir, leaving at most size of them
+    """
+    cachefiles = [
+        os.path.join(cachedir, fname) for fname in os.listdir(cachedir)
+        if fname.endswith(suffix)
+    ]
+    if len(cachefiles) > size:
+        cachefiles.sort(key=os.path.getmtime)
+        for fname in cachefiles[:len(cachefiles) - size]:
+            try:
+                os.remove(fname)
+            except OSError:
+                pass
+
+
+@contextmanager
+def MapFile(f):
+    """ Give the whole content of the binary file object f. Large files are
+        memory-mapped and given as a read-only memoryview, which is only valid
+        within the context.
+    """
+    f.seek(0)
+    size = os.fstat(f.fileno()).st_size
+    if sys.version_info[0] < 3 or not size or size < MMAP_THRESHOLD:
+        yield f.read()
+        return
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        with memoryview(mm) as view:
+            yield view
+    finally:
+        try:
+            mm.close()
+        except BufferError:
+            # Views of the data are still referenced, e.g. by a traceback.
+            # The map is closed when they are released.
+            pass
+
+
+@contextmanager
+def TextStream(f):
+    """ Give the binary file object f as a text file object, which reads from
+        the start of the file
+    """
+    f.seek(0)
+    if sys.version_info[0] < 3:
+        yield f
+        return
+    text = io.TextIOWrapper(f)
+    try:
+        yield text
+    finally:
+        # Leave f open for the owner of it
+        text.detach()
 
 
 def StringFormat(text, idx, sub):  # pylint: disable=unused-argument
@@ -105,7 +246,7 @@ def BE_to_LE(value):
 
     # FIXME: The function title is confusing as the input data type (str) is
     # different than the output (int)
-    return int("".join(["%2.2X" % ord(char) for char in reversed(value)]), 16)
+    return int(binascii.hexlify(DomainToBytes(value)[::-1]), 16)
 
 
 def LE_to_BE(value, size):
@@ -119,14 +260,214 @@ def LE_to_BE(value, size):
     # FIXME: The function title is confusing as the input data type (int) is
     # different than the output (str)
     data = ("%" + str(size * 2) + "." + str(size * 2) + "X") % value
-    list_car = [data[i:i + 2] for i in range(0, len(data), 2)]
-    list_car.reverse()
-    return "".join([chr(int(car, 16)) for car in list_car])
+    if len(data) % 2:
+        data = "0" + data
+    return BytesToDomain(binascii.unhexlify(data)[::-1])
+
+
+# DOMAIN values are stored in the node as strings with one character per byte.
+# The functions below convert them to and from bytes, which is what the
+# outputs are made from. The conversion is lossless, as latin-1 maps the
+# characters 0-0xff to the same byte values.
+
+def EncodeDomain(value):
+    """
+    Return the bytes of the DOMAIN text value. Raises ValueError if it has
+    characters above 0xff, which are not bytes.
+    """
+    try:
+        return value.encode('latin-1')
+    except UnicodeEncodeError as exc:
+        raise_from(ValueError(
+            "Invalid DOMAIN value: The character %r at position %s is not a byte"
+            % (value[exc.start], exc.start)), None)
+
+
+if sys.version_info[0] >= 3:
+    def DomainToBytes(value):
+        """
+        Return the bytes of the DOMAIN value
+        """
+        if isinstance(value, str):
+            return EncodeDomain(value)
+        return bytes(value)
+
+    def BytesToDomain(data):
+        """
+        Return the DOMAIN value of the bytes, bytearray or memoryview data
+        """
+        return bytes(data).decode('latin-1')
+else:
+    def DomainToBytes(value):
+        """
+        Return the bytes of the DOMAIN value
+        """
+        if isinstance(value, unicode):
+            return EncodeDomain(value)
+        return str(value)
+
+    def BytesToDomain(data):
+        """
+        Return the DOMAIN value of the bytes, bytearray or memoryview data
+        """
+        return str(data) if not isinstance(data, memoryview) else data.tobytes()
+
+
+def DomainToHex(value):
+    """
+    Return the DOMAIN value as a hex string
+    """
+    return binascii.hexlify(DomainToBytes(value)).decode('ascii')
+
+
+def HexToDomain(text):
+    """
+    Return the DOMAIN value of the hex string. Raises ValueError if the hex
+    string is malformed.
+    """
+    if len(text) % 2 != 0:
+        text = "0" + text
+    try:
+        return BytesToDomain(binascii.unhexlify(text))
+    except (TypeError, binascii.Error) as exc:
+        raise_from(ValueError("Invalid hex value '%s': %s" % (text, exc)), exc)
+
+
+# The C escape of each byte value
+C_ESCAPES = ["\\x%2.2x" % i for i in range(256)]
+
+
+def DomainToC(value):
+    """
+    Return the DOMAIN value escaped for a C string literal
+    """
+    return "".join(map(C_ESCAPES.__getitem__, bytearray(DomainToBytes(value))))
+
+
+class InputFiles(list):
+    """ The list of the files read while RecordInputFiles() is active. The
+        files which were looked for, but didn't exist, e.g. a profile which
+        is not in all of the profile directories, are listed in missing.
+    """
+    def __init__(self):
+        list.__init__(self)
+        self.missing = []
+
+
+@contextmanager
+def RecordInputFiles():
+    """ Context manager which yields an InputFiles list of the files read by
+        LoadFile() and ImportProfile() while the context is active
+    """
+    files = InputFiles()
+    INPUT_FILES.append(files)
+    try:
+        yield files
+    finally:
+        INPUT_FILES[:] = [f for f in INPUT_FILES if f is not files]
+
+
+def AddInputFile(filepath):
+    """ Add the file to the active RecordInputFiles() lists """
+    for files in INPUT_FILES:
+        if filepath not in files:
+            files.append(filepath)
+
+
+def AddMissingFile(filepath):
+    """ Add the file, which was looked for but didn't exist, to the active
+        RecordInputFiles() lists
+    """
+    for files in INPUT_FILES:
+        if filepath not in files.missing:
+            files.missing.append(filepath)
+
+
+def InputFilesState(inputfiles):
+    """ Return the [(inputfile, mtime), ...] list of the InputFiles, which
+        is used to check if any of them have changed. The mtime of the missing
+        files is None.
+    """
+    return [
+        (inputfile, os.stat(inputfile).st_mtime) for inputfile in inputfiles
+    ] + [(inputfile, None) for inputfile in inputfiles.missing]
+
+
+def AddInputFilesState(state):
+    """ Add the files of the InputFilesState() list to the active
+        RecordInputFiles() lists, e.g. when the node is loaded from a cache
+    """
+    for inputfile, mtime in state:
+        if mtime is None:
+            AddMissingFile(inputfile)
+        else:
+            AddInputFile(inputfile)
+
+
+def LoadCachedFile(filepath):
+    """ Load the node from NODE_CACHE if neither the file nor the files used
+        to load it, e.g. profiles, have been changed since it was cached.
+        Otherwise read the file and add it to the cache.
+    """
+    st = os.stat(filepath)
+    stat = (st.st_mtime, st.st_size, st.st_ino)
+    # The profiles are looked up in the profile directories
+    key = (os.path.abspath(filepath), tuple(objdictgen.PROFILE_DIRECTORIES))
+
+    cached = NODE_CACHE.pop(key, None)
+    if cached and cached[0] == stat and InputFilesUnchanged(cached[1]):
+        log.debug("Loading cached OD '%s'" % filepath)
+        # Move it last, as the most recently used
+        NODE_CACHE[key] = cached
+        AddInputFilesState(cached[1])
+        # A new node is created from the snapshot, as the caller might
+        # modify it
+        return snapshot.LoadSnapshot(cached[2])
+
+    with RecordInputFiles() as inputfiles:
+        node = Node.ReadFile(filepath)
+    try:
+        NODE_CACHE[key] = (
+            stat, InputFilesState(inputfiles), snapshot.GenerateSnapshot(node),
+        )
+    except (OSError, ValueError) as exc:
+        log.debug("Unable to cache '%s': %s" % (filepath, exc))
+    while len(NODE_CACHE) > NODE_CACHE_SIZE:
+        del NODE_CACHE[next(iter(NODE_CACHE))]
+    return node
+
+
+def InputFilesUnchanged(inputfiles):
+    """ Return True if none of the (inputfile, mtime) files have changed. A
+        file with the mtime None must not exist.
+    """
+    for inputfile, mtime in inputfiles:
+        try:
+            if os.stat(inputfile).st_mtime != mtime:
+                return False
+        except OSError:
+            if mtime is not None:
+                return False
+    return True
 
 
 # ------------------------------------------------------------------------------
 #                         Load mapping
 # ------------------------------------------------------------------------------
+def CompileProfile(profilepath):
+    """ Return the compiled code of the profile. The code is cached until
+        the file is modified.
+    """
+    mtime = os.path.getmtime(profilepath)
+    cached = PROFILE_CODE.get(profilepath)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(profilepath, "rb") as f:
+        code = compile(f.read(), profilepath, "exec")
+    PROFILE_CODE[profilepath] = (mtime, code)
+    return code
+
+
 def ImportProfile(profilename):
     # Import profile
 
@@ -136,21 +477,25 @@ def ImportProfile(profilename):
     profilepath = profilename
     if not os.path.exists(profilepath):
         fname = "%s.prf" % profilename
-        try:
-            profilepath = next(
-                os.path.join(base, fname)
-                for base in objdictgen.PROFILE_DIRECTORIES
-                if os.path.exists(os.path.join(base, fname))
-            )
-        except StopIteration:
-            raise_from(ValueError("Unable to load profile '%s': '%s': No such file or directory" % (profilename, fname)), None)
+        for base in objdictgen.PROFILE_DIRECTORIES:
+            profilepath = os.path.join(base, fname)
+            if os.path.exists(profilepath):
+                break
+            # The result changes if the profile is added to this directory
+            AddMissingFile(profilepath)
+        else:
+            raise ValueError("Unable to load profile '%s': '%s': No such file or directory" % (profilename, fname))
+
+    AddInputFile(profilepath)
 
     # Mapping and AddMenuEntries are expected to be defined by the execfile
     # The profiles requires some vars to be set
     # pylint: disable=unused-variable
     try:
         log.debug("EXECFILE %s" % (profilepath,))
-        execfile(profilepath)  # FIXME: Using execfile is unsafe
+        # The profile is executed every time, as the returned objects are
+        # modified by the caller
+        exec_(CompileProfile(profilepath), globals())  # FIXME: Using exec is unsafe
         # pylint: disable=undefined-variable
         return Mapping, AddMenuEntries  # pyright: ignore  # noqa: F821
     except Exception as exc:  # pylint: disable=broad-except
@@ -364,49 +709,104 @@ class Node(object):
     def LoadFile(filepath):
         # type: (str) -> Node
         """ Open a file and create a new node """
-        if isXml(filepath):
-            log.debug("Loading XML OD '%s'" % filepath)
-            with open(filepath, "r") as f:
-                return nosis.xmlload(f)  # type: ignore
+        AddInputFile(filepath)
 
-        if isEds(filepath):
-            log.debug("Loading EDS '%s'" % filepath)
-            return eds_utils.GenerateNode(filepath)
+        if NODE_CACHE is not None:
+            return LoadCachedFile(filepath)
+        return Node.ReadFile(filepath)
 
-        log.debug("Loading JSON OD '%s'" % filepath)
-        with open(filepath, "r") as f:
-            return Node.LoadJson(f.read())
+    @staticmethod
+    def ReadFile(filepath):
+        # type: (str) -> Node
+        """ Read the file and create a new node, without using the cache """
+        # The file is opened once and its format is detected from the header
+        with open(filepath, 'rb') as f:
+            filetype = SniffFileType(f.read(SNIFF_SIZE))
+
+            if filetype == 'snap':
+                log.debug("Loading OD snapshot '%s'" % filepath)
+                return snapshot.GenerateNode(filepath, f)
+
+            if filetype == 'xml':
+                log.debug("Loading XML OD '%s'" % filepath)
+                # The XML parser decodes the file as given by its declaration
+                f.seek(0)
+                return load_nosis().xmlload(f)  # type: ignore
+
+            if filetype == 'eds':
+                log.debug("Loading EDS '%s'" % filepath)
+                return eds_utils.GenerateNode(filepath, f=f)
+
+            log.debug("Loading JSON OD '%s'" % filepath)
+            with TextStream(f) as text:
+                if os.fstat(f.fileno()).st_size < jsonod.STREAM_THRESHOLD:
+                    return jsonod.GenerateNode(text.read())
+                return jsonod.GenerateNodeStream(text)
 
     @staticmethod
     def LoadJson(contents):
         """ Import a new Node from a JSON string """
         return jsonod.GenerateNode(contents)
 
-    def DumpFile(self, filepath, filetype="json", **kwargs):
-        """ Save node into file """
+    def DumpFile(self, filepath, filetype="json", skip_unchanged=False, **kwargs):
+        """ Save node into file. If skip_unchanged is set, the files which
+            would get the same content are not written, so their modification
+            time is kept. Returns False if no files were changed.
+        """
+        if skip_unchanged:
+            # Write into a temporary directory and only move the files that
+            # differ from the existing files. The file names are kept, as
+            # they are used in the content of the c and eds files.
+            # pylint: disable=import-outside-toplevel
+            import filecmp
+            import shutil
+            import tempfile
+            dirname = os.path.dirname(os.path.abspath(filepath))
+            tmpdir = tempfile.mkdtemp(dir=dirname)
+            try:
+                self.DumpFile(os.path.join(tmpdir, os.path.basename(filepath)),
+                              filetype=filetype, **kwargs)
+                changed = False
+                for fname in sorted(os.listdir(tmpdir)):
+                    tmpfile = os.path.join(tmpdir, fname)
+                    outfile = os.path.join(dirname, fname)
+                    if os.path.exists(outfile) and filecmp.cmp(tmpfile, outfile, shallow=False):
+                        log.debug("Unchanged '%s'" % outfile)
+                        continue
+                    ReplaceFile(tmpfile, outfile)
+                    changed = True
+                return changed
+            finally:
+                shutil.rmtree(tmpdir)
+
         if filetype == 'od':
             log.debug("Writing XML OD '%s'" % filepath)
-            with open(filepath, "w") as f:
+            with OpenOutput(filepath, "w") as f:
                 # Never generate an od with IndexOrder in it
-                nosis.xmldump(f, self, omit=('IndexOrder', ))
-            return
+                load_nosis().xmldump(f, self, omit=('IndexOrder', ))
+            return True
 
         if filetype == 'eds':
             log.debug("Writing EDS '%s'" % filepath)
             eds_utils.GenerateEDSFile(filepath, self)
-            return
+            return True
 
         if filetype == 'json':
             log.debug("Writing JSON OD '%s'" % filepath)
-            jdata = self.DumpJson(**kwargs)
-            with open(filepath, "w") as f:
-                f.write(jdata)
-            return
+            with OpenOutput(filepath) as f:
+                self.DumpJsonStream(f, **kwargs)
+            return True
+
+        if filetype == 'snap':
+            log.debug("Writing OD snapshot '%s'" % filepath)
+            snapshot.GenerateSnapshotFile(filepath, self)
+            return True
 
         if filetype == 'c':
             log.debug("Writing C files '%s'" % filepath)
+            from objdictgen import gen_cfile  # pylint: disable=import-outside-toplevel
             gen_cfile.GenerateFile(filepath, self)
-            return
+            return True
 
         raise ValueError("Unknown file suffix, unable to write file")
 
@@ -416,6 +816,12 @@ class Node(object):
             self, compact=compact, sort=sort, internal=internal, validate=validate
         )
 
+    def DumpJsonStream(self, f, compact=False, sort=False, internal=False, validate=True):
+        """ Write the node as JSON into the file object f """
+        jsonod.GenerateJsonStream(
+            self, f, compact=compact, sort=sort, internal=internal, validate=validate
+        )
+
     # --------------------------------------------------------------------------
     #                         Node Functions
     # --------------------------------------------------------------------------
@@ -432,6 +838,7 @@ class Node(object):
         """
         Add a new entry in the Object Dictionary
         """
+        self.InvalidateFingerprint(index)
         if index not in self.Dictionary:
             if not subindex:
                 self.Dictionary[index] = value
@@ -448,6 +855,7 @@ class Node(object):
         """
         Warning ! Modifies an existing entry in the Object Dictionary. Can't add a new one.
         """
+        self.InvalidateFingerprint(index)
         if index not in self.Dictionary:
             return False
         if not subindex:
@@ -461,6 +869,7 @@ class Node(object):
         return False
 
     def SetParamsEntry(self, index, subindex=None, comment=None, buffer_size=None, save=None, callback=None):
+        self.InvalidateFingerprint(index)
         if index not in self.Dictionary:
             return False
         if (comment is not None or save is not None or callback is not None or buffer_size is not None) and index not in self.ParamsDictionary:
@@ -493,6 +902,7 @@ class Node(object):
         it will remove this subindex only if it's the last of the index. If no subindex
         is specified it removes the whole index and subIndexes from the Object Dictionary.
         """
+        self.InvalidateFingerprint(index)
         if index not in self.Dictionary:
             return False
         if not subindex:
@@ -605,6 +1015,7 @@ class Node(object):
         """
         Add a new entry in the User Mapping Dictionary
         """
+        self.InvalidateFingerprint(index)
         if index not in self.UserMapping:
             if values is None:
                 values = []
@@ -628,6 +1039,7 @@ class Node(object):
         """
         Warning ! Modifies an existing entry in the User Mapping Dictionary. Can't add a new one.
         """
+        self.InvalidateFingerprint(index)
         if index not in self.UserMapping:
             return False
         if subindex is None:
@@ -696,6 +1108,7 @@ class Node(object):
         it will remove this subindex only if it's the last of the index. If no subindex
         is specified it removes the whole index and subIndexes from the User Mapping Dictionary.
         """
+        self.InvalidateFingerprint(index)
         if index in self.UserMapping:
             if subindex is None:
                 self.UserMapping.pop(index)
@@ -716,6 +1129,7 @@ class Node(object):
                 for j, value in enumerate(self.Dictionary[i]):
                     if (value & mask) == model:
                         self.Dictionary[i][j] = 0
+                        self.InvalidateFingerprint(i)
 
     def UpdateMapVariable(self, index, subindex, size):
         model = index << 16
@@ -728,13 +1142,16 @@ class Node(object):
                 for j, value in enumerate(self.Dictionary[i]):
                     if (value & mask) == model:
                         self.Dictionary[i][j] = model + size
+                        self.InvalidateFingerprint(i)
 
     def RemoveLine(self, index, max_, incr=1):
         i = index
         while i < max_ and self.IsEntry(i + incr):
             self.Dictionary[i] = self.Dictionary[i + incr]
+            self.InvalidateFingerprint(i)
             i += incr
         self.Dictionary.pop(i)
+        self.InvalidateFingerprint(i)
 
     def Copy(self):
         """
@@ -746,8 +1163,11 @@ class Node(object):
         """ Return the class data as a dict """
         return copy.deepcopy(self.__dict__)
 
-    def GetIndexDict(self, index):
-        ''' Return a dict representation of the index '''
+    def GetIndexDict(self, index, deepcopy=True):
+        ''' Return a dict representation of the index. If deepcopy is False,
+            the returned dict refers to the data in the node, which must not
+            be modified by the caller.
+        '''
         obj = {}
         if index in self.Dictionary:
             obj['dictionary'] = self.Dictionary[index]
@@ -763,8 +1183,61 @@ class Node(object):
             obj['built-in'] = maps.MAPPING_DICTIONARY[index]
         obj['base'] = self.GetBaseIndex(index)
         obj['groups'] = tuple(g for g in ('profile', 'ds302', 'user', 'built-in') if g in obj)
+        if not deepcopy:
+            return obj
         return copy.deepcopy(obj)
 
+    def GetIndexFingerprint(self, index):
+        """ Return the fingerprint of the data of the index, or None if the
+            index does not exist. The fingerprints are cached with a hash of
+            the repr() of the data, which is much faster to make than the
+            fingerprint. The cached fingerprint is only used while the data
+            has the same repr(), so changes made directly to the data, e.g.
+            to the lists in self.Dictionary by the editor, are also seen.
+        """
+        cache = FINGERPRINTS.setdefault(self, {})
+        data = ODict(
+            (group, getattr(self, group)[index]) for group in INDEX_GROUPS
+            if index in getattr(self, group)
+        )
+        if not data:
+            cache.pop(index, None)
+            return None
+        key = hashlib.sha1(repr(data).encode('utf-8')).digest()
+        cached = cache.get(index)
+        if cached is None or cached[0] != key:
+            cached = cache[index] = (key, jsonod.fingerprint(data))
+        return cached[1]
+
+    def Fingerprint(self):
+        """ Return a fingerprint of the content of the node. It does not
+            depend on the order of the indexes, nor on the display only
+            attributes in FINGERPRINT_IGNORE.
+        """
+        data = ODict(
+            (k, v) for k, v in self.__dict__.items()
+            if k not in INDEX_GROUPS and k not in FINGERPRINT_IGNORE
+        )
+        data.setdefault('DefaultStringSize', self.DefaultStringSize)
+        indexes = [
+            (index, self.GetIndexFingerprint(index))
+            for index in self.GetAllParameters(sort=True)
+        ]
+        return jsonod.fingerprint([data, indexes])
+
+    def InvalidateFingerprint(self, index=None):
+        """ Discard the cached fingerprint of the index, or of all indexes if
+            index is None. The Node methods do this when they change an index.
+            It is not needed for correctness, as the cached fingerprints are
+            checked against the data, but it frees the cache entries.
+        """
+        cache = FINGERPRINTS.get(self)
+        if cache:
+            if index is None:
+                cache.clear()
+            else:
+                cache.pop(index, None)
+
     def GetIndexes(self):
         """
         Return a sorted list of indexes in Object Dictionary
@@ -1072,6 +1545,7 @@ class Node(object):
 
     def RemoveIndex(self, index):
         """ Remove the given index """
+        self.InvalidateFingerprint(index)
         self.UserMapping.pop(index, None)
         self.Dictionary.pop(index, None)
         self.ParamsDictionary.pop(index, None)
@@ -1106,6 +1580,7 @@ class Node(object):
                 _warn("Parameter without any value")
                 if fix:
                     del self.ParamsDictionary[index]
+                    self.InvalidateFingerprint(index)
                     _warn("FIX: Deleting ParamDictionary entry")
                 continue
 
@@ -1128,6 +1603,7 @@ class Node(object):
                 _warn("Excessive user parameters ({}) or too few dictionary values ({})".format(len(excessive_params), dictlen))
 
                 if index in self.Dictionary:
+                    self.InvalidateFingerprint(index)
                     for idx in excessive_params:
                         del self.ParamsDictionary[index][idx]
                         del params[idx]
@@ -1150,6 +1626,7 @@ class Node(object):
                     _warn("Sub index {}: Missing name".format(idx))
                     if fix:
                         subvals["name"] = "Subindex {}".format(idx)
+                        self.InvalidateFingerprint(index)
                         _warn("FIX: Set name to '{}'".format(subvals["name"]))
 
     # --------------------------------------------------------------------------
@@ -1279,5 +1756,12 @@ class Node(object):
                 yield ""
 
 
-# Register node with gnosis
-nosis.add_class_to_store('Node', Node)
+def load_nosis():
+    """ Return the nosis pickle module used for the XML OD files. It is
+        imported when it is needed, as it is slow to import.
+    """
+    from objdictgen.nosis import pickle as nosis  # pylint: disable=import-outside-toplevel
+
+    # Register node with gnosis
+    nosis.add_class_to_store('Node', Node)
+    return nosis
@@ -31,6 +31,146 @@ from future.utils import raise_from
 
 from objdictgen import eds_utils
 
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+
+# ------------------------------------------------------------------------------
+#                          Load EDS files
+# ------------------------------------------------------------------------------
+
+
+def load_eds(edspath):
+    """ Load the EDS file and return the node and the error message. Called by
+        the workers of NodeList.LoadEDSFiles().
+    """
+    try:
+        return eds_utils.GenerateNode(edspath), None
+    except Exception as exc:  # pylint: disable=broad-except
+        return None, "%s: %s" % (exc.__class__.__name__, exc)
+
+
+class EDSNodeDict(MutableMapping):
+    """
+    Mapping of the EDS file names in the EDS folder to their nodes. The EDS
+    files are only loaded when their node is used.
+    """
+
+    def __init__(self, folder="", files=()):
+        self.Folder = folder
+        self.Nodes = dict((eds, None) for eds in files)
+
+    def __getitem__(self, eds):
+        node = self.Nodes[eds]
+        if node is None:
+            node = eds_utils.GenerateNode(os.path.join(self.Folder, eds))
+            self.Nodes[eds] = node
+        return node
+
+    def __setitem__(self, eds, node):
+        self.Nodes[eds] = node
+
+    def __delitem__(self, eds):
+        del self.Nodes[eds]
+
+    def __contains__(self, eds):
+        # Must not load the file, as the default implementation does
+        return eds in self.Nodes
+
+    def __iter__(self):
+        return iter(sorted(self.Nodes))
+
+    def __len__(self):
+        return len(self.Nodes)
+
+    def IsLoaded(self, eds):
+        return self.Nodes.get(eds) is not None
+
+
+class CPJFile(object):
+    """
+    The sections of a CPJ file indexed by the network name. The sections are
+    kept as text, and only the sections which are used are parsed. Updating a
+    network only replaces its section, the other sections are saved as they
+    were read.
+    """
+
+    def __init__(self, filepath):
+        self.FilePath = filepath
+        self.Sections = []
+        self.Networks = {}
+        self.NetworkNames = []
+        if os.path.isfile(filepath):
+            with open(filepath, "r") as f:
+                self.SetContent(f.read())
+
+    def SetContent(self, content):
+        # Split the content into sections, each starting with its '[' line.
+        # Any text before the first section is kept as a section of its own.
+        self.Sections = []
+        for line in content.splitlines(True):
+            if line.startswith("[") or not self.Sections:
+                self.Sections.append(line)
+            else:
+                self.Sections[-1] += line
+
+        # Index the TOPOLOGY sections by their NetName. Earlier versions
+        # appended the network each time it was saved, so if the name is used
+        # by many sections, the last one is used. The names are kept in the
+        # order they first appear in.
+        self.Networks = {}
+        self.NetworkNames = []
+        for pos, section in enumerate(self.Sections):
+            if not section[1:].upper().startswith("TOPOLOGY]"):
+                continue
+            name = ""
+            for line in section.splitlines():
+                keyname, sep, value = line.partition("=")
+                if sep and keyname.upper() == "NETNAME":
+                    name = value.strip()
+            if name not in self.Networks:
+                self.NetworkNames.append(name)
+            self.Networks[name] = pos
+
+    def GetNetworkNames(self):
+        return list(self.NetworkNames)
+
+    def GetNetwork(self, netname=None):
+        """ Parse and return the network netname, or the first network if
+            netname is None. Returns None if the network doesn't exist.
+        """
+        if netname is None:
+            names = self.GetNetworkNames()
+            if not names:
+                return None
+            netname = names[0]
+        if netname not in self.Networks:
+            return None
+        networks = eds_utils.ParseCPJContent(self.Sections[self.Networks[netname]])
+        return networks[0] if networks else None
+
+    def SetNetwork(self, netname, content):
+        """ Replace the section of the network netname with content, or add
+            it if the network doesn't exist
+        """
+        if netname in self.Networks:
+            self.Sections[self.Networks[netname]] = content
+            return
+        if self.Sections and not self.Sections[-1].endswith("\n"):
+            self.Sections[-1] += "\n"
+        self.Networks[netname] = len(self.Sections)
+        self.NetworkNames.append(netname)
+        self.Sections.append(content)
+
+    def GetContent(self):
+        return "".join(self.Sections)
+
+    def Save(self):
+        with open(self.FilePath, "w") as f:
+            f.write(self.GetContent())
+
 
 # ------------------------------------------------------------------------------
 #                          Definition of NodeList Object
@@ -47,7 +187,7 @@ class NodeList(object):
         self.Manager = manager
         self.NetworkName = netname
         self.SlaveNodes = {}
-        self.EDSNodes = {}
+        self.EDSNodes = EDSNodeDict()
         self.CurrentSelected = None
         self.Changed = False
 
@@ -74,9 +214,8 @@ class NodeList(object):
     def GetSlaveIDs(self):
         return list(sorted(self.SlaveNodes))
 
-    def LoadProject(self, root, netname=None):
+    def LoadProject(self, root, netname=None, processes=None):
         self.SlaveNodes = {}
-        self.EDSNodes = {}
 
         self.Root = root
         if not os.path.exists(self.Root):
@@ -87,14 +226,15 @@ class NodeList(object):
             os.mkdir(eds_folder)
             # raise ValueError("'%s' folder doesn't contain a 'eds' folder" % self.Root)
 
-        files = os.listdir(eds_folder)
-        for file in files:
-            filepath = os.path.join(eds_folder, file)
-            if os.path.isfile(filepath) and os.path.splitext(filepath)[-1] == ".eds":
-                self.LoadEDS(file)
+        # The EDS files are loaded when they are used
+        self.EDSNodes = EDSNodeDict(eds_folder, [
+            file for file in os.listdir(eds_folder)
+            if os.path.isfile(os.path.join(eds_folder, file))
+            and os.path.splitext(file)[-1] == ".eds"
+        ])
 
         self.LoadMasterNode(netname)
-        self.LoadSlaveNodes(netname)
+        self.LoadSlaveNodes(netname, processes=processes)
         self.NetworkName = netname
 
     def SaveProject(self, netname=None):
@@ -116,6 +256,34 @@ class NodeList(object):
         node = eds_utils.GenerateNode(edspath)
         self.EDSNodes[eds] = node
 
+    def LoadEDSFiles(self, files, processes=None):
+        """ Load the EDS files in parallel in a process pool with processes
+            workers. All the files are loaded before the files that failed to
+            load are reported. Files which are already loaded are skipped.
+        """
+        files = [eds for eds in files if not self.EDSNodes.IsLoaded(eds)]
+        edspaths = [os.path.join(self.GetEDSFolder(), eds) for eds in files]
+        if processes == 1 or len(edspaths) < 2:
+            results = [load_eds(edspath) for edspath in edspaths]
+        else:
+            import multiprocessing  # pylint: disable=import-outside-toplevel
+            pool = multiprocessing.Pool(processes)
+            try:
+                results = pool.map(load_eds, edspaths)
+            finally:
+                pool.close()
+                pool.join()
+
+        errors = []
+        for eds, (node, error) in zip(files, results):
+            if error:
+                errors.append("%s: %s" % (eds, error))
+            else:
+                self.EDSNodes[eds] = node
+        if errors:
+            raise ValueError("Unable to load %d of %d EDS files:\n    %s" % (
+                len(errors), len(files), "\n    ".join(errors)))
+
     def AddSlaveNode(self, nodename, nodeid, eds):
         if eds not in self.EDSNodes:
             raise ValueError("'%s' EDS file is not available" % eds)
@@ -150,21 +318,22 @@ class NodeList(object):
         except Exception as exc:  # pylint: disable=broad-except
             raise_from(ValueError("Fail to save master node in '%s'" % (masterpath, )), exc)
 
-    def LoadSlaveNodes(self, netname=None):
+    def LoadSlaveNodes(self, netname=None, processes=None):
         cpjpath = os.path.join(self.Root, "nodelist.cpj")
         if os.path.isfile(cpjpath):
             try:
-                networks = eds_utils.ParseCPJFile(cpjpath)
-                network = None
+                # Only the section of the network is parsed
+                network = CPJFile(cpjpath).GetNetwork(netname or None)
                 if netname:
-                    for net in networks:
-                        if net["Name"] == netname:
-                            network = net
                     self.NetworkName = netname
-                elif len(networks) > 0:
-                    network = networks[0]
+                elif network:
                     self.NetworkName = network["Name"]
                 if network:
+                    # Load the EDS files of the slaves up front in parallel
+                    self.LoadEDSFiles(sorted(set(
+                        node["DCFName"] for node in network["Nodes"].values()
+                        if node["Present"] == 1 and node["DCFName"] in self.EDSNodes
+                    )), processes=processes)
                     for nodeid, node in network["Nodes"].items():
                         if node["Present"] == 1:
                             self.AddSlaveNode(node["Name"], nodeid, node["DCFName"])
@@ -178,11 +347,14 @@ class NodeList(object):
             cpjpath = os.path.join(self.Root, "nodelist.cpj")
             content = eds_utils.GenerateCPJContent(self)
             if netname:
-                mode = "a"
+                # Replace the section of the network, the other networks in
+                # the file are kept as they are
+                cpj = CPJFile(cpjpath)
+                cpj.SetNetwork(self.NetworkName, content)
+                cpj.Save()
             else:
-                mode = "w"
-            with open(cpjpath, mode=mode) as f:
-                f.write(content)
+                with open(cpjpath, mode="w") as f:
+                    f.write(content)
             self.Changed = False
         except Exception as exc:  # pylint: disable=broad-except
             raise_from(ValueError("Fail to save node list in '%s'" % (cpjpath)), exc)
@@ -246,12 +418,33 @@ class NodeList(object):
         return [], []
 
     def AddToMasterDCF(self, node_id, index, subindex, size, value):
+        self.AddEntriesToMasterDCF(node_id, [(index, subindex, size, value)])
+
+    def AddEntriesToMasterDCF(self, node_id, entries):
+        """ Add the (index, subindex, size, value) entries to the concise DCF
+            of the slave node_id in the master node
+        """
         # Adding DCF entry into Master node
         if not self.Manager.IsCurrentEntry(0x1F22):
             self.Manager.ManageEntriesOfCurrent([0x1F22], [])
         self.Manager.AddSubentriesToCurrent(0x1F22, 127)
 
-        self.Manager.AddToDCF(node_id, index, subindex, size, value)
+        self.Manager.AddEntriesToDCF(node_id, entries)
+
+    def GenerateDCFFiles(self, folder=None):
+        """ Generate a DCF file for each of the slave nodes. The files are
+            named after the name and the node id of the slave.
+        """
+        if folder is None:
+            folder = self.Root
+        filepaths = []
+        for nodeid in sorted(self.SlaveNodes):
+            slave = self.SlaveNodes[nodeid]
+            filepath = os.path.join(folder, "%s_0x%2.2X.dcf" % (slave["Name"], nodeid))
+            eds_utils.GenerateDCFFile(filepath, slave["Node"], nodeid,
+                                      nodename=slave["Name"], netname=self.NetworkName)
+            filepaths.append(filepath)
+        return filepaths
 
 
 def main(projectdir):
@@ -26,12 +26,11 @@ from builtins import range
 
 import os
 import re
-import codecs
 import logging
 import colorama
 
-from objdictgen.node import Node, Find, ImportProfile, BE_to_LE, LE_to_BE
-from objdictgen import maps
+from objdictgen.node import Node, Find, ImportProfile, DomainToHex, HexToDomain
+from objdictgen import maps, dcf
 from objdictgen.maps import OD, MAPPING_DICTIONARY
 
 log = logging.getLogger('objdictgen')
@@ -204,6 +203,8 @@ class NodeManager(object):
             node.ProfileName = "None"
             node.Profile = {}
             node.SpecificMenu = []
+        # The profile data is part of the index fingerprints
+        node.InvalidateFingerprint()
         # Initialising node
         self.CurrentNode = node
         self.CurrentNode.Name = name
@@ -222,6 +223,7 @@ class NodeManager(object):
                 mapping, menuentries = ImportProfile("DS-302")
                 self.CurrentNode.DS302 = mapping
                 self.CurrentNode.SpecificMenu.extend(menuentries)
+                self.CurrentNode.InvalidateFingerprint()
             elif option == "GenSYNC":
                 addindexlist.extend([0x1005, 0x1006])
             elif option == "Emergency":
@@ -647,11 +649,8 @@ class NodeManager(object):
                     # Might fail with ValueError if number is malformed
                     node.SetEntry(index, subindex, float(value))
                 elif editor == "domain":
-                    # Might fail with binascii.Error if hex is malformed
-                    if len(value) % 2 != 0:
-                        value = "0" + value
-                    value = codecs.decode(value, 'hex_codec')
-                    node.SetEntry(index, subindex, value)
+                    # Might fail with ValueError if hex is malformed
+                    node.SetEntry(index, subindex, HexToDomain(value))
                 elif editor == "dcf":
                     node.SetEntry(index, subindex, value)
                 else:
@@ -1031,7 +1030,7 @@ class NodeManager(object):
                                 editor["value"] = "dcf"
                             else:
                                 editor["value"] = "domain"
-                            dic["value"] = codecs.encode(dic["value"].encode(), 'hex_codec')
+                            dic["value"] = DomainToHex(dic["value"])
                         elif dic["type"] == "BOOLEAN":
                             editor["value"] = "bool"
                             dic["value"] = maps.BOOL_TYPE[dic["value"]]
@@ -1068,14 +1067,16 @@ class NodeManager(object):
         return None
 
     def AddToDCF(self, node_id, index, subindex, size, value):
+        self.AddEntriesToDCF(node_id, [(index, subindex, size, value)])
+
+    def AddEntriesToDCF(self, node_id, entries):
+        """
+        Append the (index, subindex, size, value) entries to the concise DCF
+        of the slave node_id
+        """
         if self.CurrentNode.IsEntry(0x1F22, node_id):
             dcf_value = self.CurrentNode.GetEntry(0x1F22, node_id)
-            if dcf_value:
-                nbparams = BE_to_LE(dcf_value[:4])
-            else:
-                nbparams = 0
-            new_value = LE_to_BE(nbparams + 1, 4) + dcf_value[4:]
-            new_value += LE_to_BE(index, 2) + LE_to_BE(subindex, 1) + LE_to_BE(size, 4) + LE_to_BE(value, size)
+            new_value = dcf.AppendConciseDCF(dcf_value, entries)
             self.CurrentNode.SetEntry(0x1F22, node_id, new_value)
 
     # --------------------------------------------------------------------------
@@ -0,0 +1,185 @@
+""" Server mode of odg, which runs the commands in a persistent process """
+#
+#    Copyright (C) 2022-2023  Svein Seldal, Laerdal Medical AS
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301
+#    USA
+
+# The server listens on a unix socket and runs one command at a time. The
+# client sends a JSON request {"args": [...], "cwd": "...", "env": {...}} and
+# closes its side for writing. The server runs the command in the cwd and
+# with the FORWARD_ENV environment variables of the client and replies with
+# {"code": <exit code>, "output": "..."}. A command which fails with an
+# exception replies with a non-zero code and the traceback as the output.
+#
+# The server keeps the imported modules, the compiled profiles, the JSON
+# schema validators and the loaded nodes (see node.NODE_CACHE) between the
+# commands.
+
+from __future__ import absolute_import
+
+import os
+import json
+import stat
+import socket
+import logging
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import objdictgen
+
+log = logging.getLogger('objdictgen')
+
+# Commands which are not sent to the server
+LOCAL_COMMANDS = ('serve', 'edit', 'network')
+
+# Environment variables of the client which are used by the commands
+FORWARD_ENV = ('SOURCE_DATE_EPOCH', 'ODG_PROFILE_DIR', 'ODG_CACHE_DIR')
+
+# Timeout in seconds for receiving the request and sending the reply, so a
+# client which stops responding can't block the server
+REQUEST_TIMEOUT = 30
+
+
+def recv_all(sock):
+    """ Read from the socket until it is closed by the other end """
+    chunks = []
+    while True:
+        data = sock.recv(65536)
+        if not data:
+            return b''.join(chunks)
+        chunks.append(data)
+
+
+def request(sockpath, args):
+    """ Run the command args on the server. Returns the exit code and the
+        output of the command.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(sockpath)
+        sock.sendall(json.dumps({
+            'args': list(args), 'cwd': os.getcwd(),
+            'env': {k: os.environ[k] for k in FORWARD_ENV if k in os.environ},
+        }).encode('utf-8'))
+        sock.shutdown(socket.SHUT_WR)
+        reply = json.loads(recv_all(sock).decode('utf-8'))
+    finally:
+        sock.close()
+    return reply['code'], reply['output']
+
+
+@contextmanager
+def client_context(cwd, env):
+    """ Run in the working directory and with the environment variables of
+        the client
+    """
+    saved = (os.getcwd(), dict((k, os.environ.get(k)) for k in FORWARD_ENV),
+             objdictgen.SOURCE_DATE_EPOCH, objdictgen.PROFILE_DIRECTORIES)
+
+    def _setenv(values):
+        for k in FORWARD_ENV:
+            if values.get(k) is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = values[k]
+
+    try:
+        os.chdir(cwd)
+        _setenv(env)
+        # These are read from the environment when objdictgen is imported
+        objdictgen.SOURCE_DATE_EPOCH = env.get('SOURCE_DATE_EPOCH')
+        objdictgen.PROFILE_DIRECTORIES = [os.path.join(objdictgen.SCRIPT_DIRECTORY, 'config')]
+        if env.get('ODG_PROFILE_DIR'):
+            objdictgen.PROFILE_DIRECTORIES.append(env['ODG_PROFILE_DIR'])
+        yield
+    finally:
+        cwd, env, objdictgen.SOURCE_DATE_EPOCH, objdictgen.PROFILE_DIRECTORIES = saved
+        _setenv(env)
+        os.chdir(cwd)
+
+
+def handle(conn, run):
+    """ Run the request from the client connection with run(args) """
+    req = json.loads(recv_all(conn).decode('utf-8'))
+    try:
+        with client_context(req['cwd'], req.get('env', {})):
+            code, output = run(req['args'])
+    except Exception:  # pylint: disable=broad-except
+        # E.g. with -D the error is raised instead of being printed
+        code, output = 1, traceback.format_exc()
+    conn.sendall(json.dumps({
+        'code': code, 'output': output,
+    }).encode('utf-8'))
+
+
+def remove_stale_socket(sockpath):
+    """ Remove the socket sockpath if it is left by a server which is no
+        longer running. Raises ValueError if sockpath is not a socket or if a
+        server is listening on it.
+    """
+    try:
+        st = os.stat(sockpath)
+    except OSError:
+        return
+    if not stat.S_ISSOCK(st.st_mode):
+        raise ValueError("'{}' exists and is not a socket".format(sockpath))
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(sockpath)
+    except socket.error:
+        os.remove(sockpath)
+        return
+    finally:
+        sock.close()
+    raise ValueError("A server is already listening on '{}'".format(sockpath))
+
+
+def serve(sockpath, run):
+    """ Listen on the unix socket sockpath and run the commands with
+        run(args), which returns the exit code and the output.
+    """
+    # Enable the cache of the loaded nodes
+    if objdictgen.node.NODE_CACHE is None:
+        objdictgen.node.NODE_CACHE = OrderedDict()
+
+    remove_stale_socket(sockpath)
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    # Only the user is allowed to connect to the socket
+    umask = os.umask(0o077)
+    try:
+        sock.bind(sockpath)
+    finally:
+        os.umask(umask)
+
+    try:
+        sock.listen(16)
+        log.info("Listening on '%s'" % sockpath)
+        while True:
+            conn, _ = sock.accept()
+            conn.settimeout(REQUEST_TIMEOUT)
+            try:
+                handle(conn, run)
+            except Exception as exc:  # pylint: disable=broad-except
+                log.error("Request failed: %s: %s" % (exc.__class__.__name__, exc))
+            finally:
+                conn.close()
+    finally:
+        sock.close()
+        os.remove(sockpath)
@@ -0,0 +1,130 @@
+""" OD binary snapshot format for fast reload """
+#
+#    Copyright (C) 2022-2023  Svein Seldal, Laerdal Medical AS
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301
+#    USA
+
+# The snapshot is the internal data of the Node object serialized with
+# marshal. It is intended as a cache of parsed nodes, e.g. for build systems
+# and the editor. It is not an exchange format, as a snapshot can only be
+# loaded by the same version of objdictgen and the same major version of
+# python. Snapshots must only be loaded from trusted sources, as marshal
+# is not secure against maliciously constructed data.
+#
+# File layout (little endian):
+#   8 bytes    MAGIC
+#   uint16     SNAPSHOT_VERSION
+#   uint8      Python major version
+#   uint8      marshal format version
+#   16 bytes   ODG_VERSION, zero padded
+#   uint32     Length of payload
+#   uint32     CRC32 of payload
+#   payload    marshal of [(name, isdict, value), ...] of Node.__dict__
+
+from __future__ import absolute_import
+
+import sys
+import struct
+import marshal
+import zlib
+from collections import OrderedDict
+from future.utils import raise_from
+
+import objdictgen
+
+if sys.version_info[0] >= 3:
+    ODict = dict
+else:
+    ODict = OrderedDict
+
+MAGIC = b'ODGSNAP\x00'
+
+# Increment when the layout of the snapshot or the Node data changes
+SNAPSHOT_VERSION = 1
+
+HEADER = struct.Struct('<8sHBB16sII')
+
+
+def odg_version():
+    """ Return the objdictgen version as stored in the snapshot header """
+    return objdictgen.ODG_VERSION.encode('ascii')
+
+
+def GenerateSnapshot(node):
+    """ Return the binary snapshot of the node """
+
+    # Dicts are stored as lists of items to preserve the order of the
+    # OrderedDicts used in py2
+    data = [
+        (k, isinstance(v, dict), list(v.items()) if isinstance(v, dict) else v)
+        for k, v in node.__dict__.items()
+    ]
+    try:
+        payload = marshal.dumps(data)
+    except ValueError as exc:
+        raise_from(ValueError("Unable to create snapshot of node: {}".format(exc)), exc)
+
+    header = HEADER.pack(
+        MAGIC, SNAPSHOT_VERSION, sys.version_info[0], marshal.version,
+        odg_version(), len(payload), zlib.crc32(payload) & 0xffffffff,
+    )
+    return header + payload
+
+
+def LoadSnapshot(data):
+    """ Create a new node from the binary snapshot data, which is bytes or a
+        memoryview
+    """
+
+    if len(data) < HEADER.size or bytes(data[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Not an OD snapshot")
+
+    _, version, pyversion, marshalversion, odgversion, length, crc = HEADER.unpack_from(data)
+
+    if (version != SNAPSHOT_VERSION or pyversion != sys.version_info[0]
+            or marshalversion > marshal.version or odgversion.rstrip(b'\x00') != odg_version()):
+        raise ValueError("Stale OD snapshot, it must be regenerated")
+
+    payload = data[HEADER.size:]
+    if len(payload) != length or zlib.crc32(payload) & 0xffffffff != crc:
+        raise ValueError("Corrupt OD snapshot, checksum mismatch")
+
+    # The node is restored with exactly the attributes it was saved with
+    node = objdictgen.Node.__new__(objdictgen.Node)
+    for k, isdict, v in marshal.loads(payload):
+        setattr(node, k, ODict(v) if isdict else v)
+    return node
+
+
+def GenerateSnapshotFile(filepath, node):
+    """ Write the binary snapshot of the node to filepath """
+    data = GenerateSnapshot(node)
+    with objdictgen.node.OpenOutput(filepath, "wb") as f:
+        f.write(data)
+
+
+def GenerateNode(filepath, f=None):
+    """ Load the node from the snapshot file filepath. f is the binary file
+        object of filepath if it is already open.
+    """
+    if f is None:
+        with open(filepath, "rb") as f:
+            return GenerateNode(filepath, f)
+    try:
+        with objdictgen.node.MapFile(f) as data:
+            return LoadSnapshot(data)
+    except ValueError as exc:
+        raise_from(ValueError("{}: {}".format(filepath, exc)), exc)
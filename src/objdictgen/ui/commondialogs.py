@@ -30,7 +30,7 @@ import wx
 import wx.grid
 
 import objdictgen
-from objdictgen.node import BE_to_LE, LE_to_BE
+from objdictgen import dcf
 from objdictgen.maps import OD
 
 log = logging.getLogger('objdictgen')
@@ -1587,31 +1587,19 @@ class DCFEntryValuesDialog(wx.Dialog):
             self.RefreshValues()
 
     def SetValues(self, values):
-        self.Values = []
-        if values:
-            data = values[4:]
-            current = 0
-            for _ in range(BE_to_LE(values[:4])):
-                value = {}
-                value["Index"] = BE_to_LE(data[current:current + 2])
-                value["Subindex"] = BE_to_LE(data[current + 2:current + 3])
-                size = BE_to_LE(data[current + 3:current + 7])
-                value["Size"] = size
-                value["Value"] = BE_to_LE(data[current + 7:current + 7 + size])
-                current += 7 + size
-                self.Values.append(value)
+        self.Values = [
+            {"Index": index, "Subindex": subindex, "Size": size, "Value": value}
+            for index, subindex, size, value in dcf.DecodeConciseDCF(values)
+        ]
         self.RefreshValues()
 
     def GetValues(self):
         if len(self.Values) <= 0:
             return ""
-        value = LE_to_BE(len(self.Values), 4)
-        for row in self.Values:
-            value += LE_to_BE(row["Index"], 2)
-            value += LE_to_BE(row["Subindex"], 1)
-            value += LE_to_BE(row["Size"], 4)
-            value += LE_to_BE(row["Value"], row["Size"])
-        return value
+        return dcf.EncodeConciseDCF(
+            (row["Index"], row["Subindex"], row["Size"], row["Value"])
+            for row in self.Values
+        )
 
     def RefreshValues(self):
         if len(self.Table.data) > 0:
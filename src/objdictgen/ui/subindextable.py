@@ -24,14 +24,13 @@ from __future__ import absolute_import
 from builtins import map
 from builtins import range
 
-import codecs
-
 import wx
 import wx.grid
 
 from objdictgen.ui import commondialogs as cdia
 from objdictgen import maps
 from objdictgen.maps import OD
+from objdictgen.node import HexToDomain
 
 
 COL_SIZES = [75, 250, 150, 125, 100, 60, 250, 60]
@@ -693,7 +692,7 @@ class EditingPanel(wx.SplitterWindow):
                 index = self.ListIndex[selected]
                 if self.Manager.IsCurrentEntry(index):
                     dialog = cdia.DCFEntryValuesDialog(self, self.Editable)
-                    dialog.SetValues(codecs.decode(self.Table.GetValue(row, col), "hex_codec"))
+                    dialog.SetValues(HexToDomain(self.Table.GetValue(row, col)))
                     if dialog.ShowModal() == wx.ID_OK and self.Editable:
                         value = dialog.GetValues()
                         self.Manager.SetCurrentEntry(index, row, value, "value", "dcf")
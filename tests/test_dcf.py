@@ -0,0 +1,55 @@
+import os
+import pytest
+
+from objdictgen import dcf, eds_utils
+from objdictgen.nodemanager import NodeManager
+from objdictgen.nodelist import NodeList
+
+
+def test_concise_dcf():
+    """ Encode and decode concise DCF values """
+
+    entries = [(0x1017, 0, 2, 1000), (0x1400, 1, 4, 0x80000201), (0x2000, 3, 1, 0xFF)]
+
+    value = dcf.EncodeConciseDCF(entries)
+    assert value[:4] == "\x03\x00\x00\x00"
+    assert value[4:13] == "\x17\x10\x00\x02\x00\x00\x00\xe8\x03"
+    assert dcf.DecodeConciseDCF(value) == entries
+
+    assert dcf.AppendConciseDCF("", entries) == value
+    assert dcf.AppendConciseDCF(dcf.EncodeConciseDCF(entries[:1]), entries[1:]) == value
+
+    assert dcf.DecodeConciseDCF("") == []
+    with pytest.raises(ValueError, match="Invalid concise DCF"):
+        dcf.DecodeConciseDCF(value[:-1])
+
+
+def test_nodelist_dcf(wd, oddir):
+    """ Add entries to the master DCF and export DCF files of the slaves """
+
+    os.mkdir('eds')
+    manager = NodeManager()
+    manager.OpenFileInCurrent(os.path.join(oddir, 'slave.od'))
+    manager.CurrentNode.DumpFile(os.path.join('eds', 'slave.eds'), filetype='eds')
+
+    manager = NodeManager()
+    nodelist = NodeList(manager, netname="net")
+    nodelist.LoadProject('.')
+    nodelist.AddSlaveNode("Slave", 2, 'slave.eds')
+
+    nodelist.AddToMasterDCF(2, 0x1017, 0, 2, 1000)
+    nodelist.AddEntriesToMasterDCF(2, [(0x1800, 1, 4, 0x182), (0x1800, 2, 1, 0xFF)])
+    assert dcf.DecodeConciseDCF(manager.CurrentNode.GetEntry(0x1F22, 2)) == [
+        (0x1017, 0, 2, 1000), (0x1800, 1, 4, 0x182), (0x1800, 2, 1, 0xFF),
+    ]
+
+    filepaths = nodelist.GenerateDCFFiles()
+    assert filepaths == [os.path.join('.', 'Slave_0x02.dcf')]
+    with open(filepaths[0], 'r') as f:
+        assert "\n[DeviceComissioning]\nNodeID=0x02\nNodeName=Slave\n" in f.read()
+
+    # The DCF file can be loaded as an EDS file
+    eds = eds_utils.ParseEDSFile(filepaths[0])
+    assert eds["DEVICECOMISSIONING"]["NODEID"] == 2
+    node = eds_utils.GenerateNode(filepaths[0])
+    assert node.GetEntry(0x1018, 1) == nodelist.SlaveNodes[2]["Node"].GetEntry(0x1018, 1)
@@ -15,9 +15,16 @@ def test_edsfail_null(wd, oddir, suffix):
 
     m0 = Node.LoadFile(fa + suffix)
 
+    # The previous output is kept when the export fails
+    with open('out.eds', 'w') as f:
+        f.write('previous')
+
     with pytest.raises(KeyError) as exc:
-        m0.DumpFile(fa + '.eds', filetype='eds')
+        m0.DumpFile('out.eds', filetype='eds')
     assert "Index 0x1018 does not exist" in str(exc.value)
+    with open('out.eds', 'r') as f:
+        assert f.read() == 'previous'
+    assert os.listdir('.') == ['out.eds']
 
 
 @pytest.mark.parametrize("suffix", ['.od', '.json'])
@@ -1,8 +1,9 @@
 import os
 import shutil
+import pytest
 
 from objdictgen.nodemanager import NodeManager
-from objdictgen.nodelist import NodeList
+from objdictgen.nodelist import NodeList, CPJFile
 
 
 def test_nodelist_create(wd):
@@ -22,3 +23,105 @@ def test_nodelist_load(wd):
     nodelist = NodeList(manager)
 
     nodelist.LoadProject('.')
+
+
+def test_nodelist_load_eds(wd, oddir):
+    """ Load the EDS files of a nodelist when they are used """
+
+    os.mkdir('eds')
+    for name in ('master', 'slave'):
+        manager = NodeManager()
+        manager.OpenFileInCurrent(os.path.join(oddir, name + '.od'))
+        manager.CurrentNode.DumpFile(os.path.join('eds', name + '.eds'), filetype='eds')
+    with open(os.path.join('eds', 'broken.eds'), 'w') as f:
+        f.write("[1000]\nNot an assignment\n")
+
+    manager = NodeManager()
+    nodelist = NodeList(manager)
+    nodelist.LoadProject('.')
+    assert list(nodelist.EDSNodes) == ['broken.eds', 'master.eds', 'slave.eds']
+    assert not nodelist.EDSNodes.IsLoaded('slave.eds')
+
+    nodelist.AddSlaveNode("Slave", 2, 'slave.eds')
+    assert nodelist.EDSNodes.IsLoaded('slave.eds')
+    assert nodelist.SlaveNodes[2]["Node"].GetEntry(0x1018, 1) is not None
+    nodelist.SaveProject()
+
+    # Only the EDS files used by the slaves are loaded with the project
+    nodelist = NodeList(manager)
+    nodelist.LoadProject('.', processes=2)
+    assert nodelist.EDSNodes.IsLoaded('slave.eds')
+    assert not nodelist.EDSNodes.IsLoaded('master.eds')
+    assert not nodelist.EDSNodes.IsLoaded('broken.eds')
+
+    # All files are loaded before the failures are reported
+    with pytest.raises(ValueError, match="Unable to load 1 of 2 EDS files") as exc:
+        nodelist.LoadEDSFiles(list(nodelist.EDSNodes), processes=2)
+    assert "broken.eds: ValueError: 'Not an assignment'" in str(exc.value)
+    assert nodelist.EDSNodes.IsLoaded('master.eds')
+
+
+def test_nodelist_networks(wd, oddir):
+    """ Load and save one network of a nodelist with many networks """
+
+    os.mkdir('eds')
+    manager = NodeManager()
+    manager.OpenFileInCurrent(os.path.join(oddir, 'slave.od'))
+    manager.CurrentNode.DumpFile(os.path.join('eds', 'slave.eds'), filetype='eds')
+
+    net1 = (
+        "; Comment\n"
+        "[TOPOLOGY]\n"
+        "NetName=net1\n"
+        "Nodes=0x01\n"
+        "Node2Present=0x01\n"
+        "Node2Name=First\n"
+        "Node2DCFName=slave.eds\n"
+        "EDSBaseName=eds\n"
+        "\n"
+    )
+    net2 = (
+        "[TOPOLOGY]\n"
+        "NetName=net2\n"
+        "Nodes=0x00\n"
+        "EDSBaseName=eds\n"
+    )
+    with open('nodelist.cpj', 'w') as f:
+        f.write(net1 + net2)
+
+    cpj = CPJFile('nodelist.cpj')
+    assert cpj.GetNetworkNames() == ['net1', 'net2']
+    assert cpj.GetNetwork()["Name"] == 'net1'
+    assert cpj.GetNetwork('net2')["Nodes"] == {}
+    assert cpj.GetNetwork('net3') is None
+
+    nodelist = NodeList(NodeManager())
+    nodelist.LoadProject('.', netname='net2')
+    assert nodelist.NetworkName == 'net2'
+    assert nodelist.SlaveNodes == {}
+
+    # Only the section of the saved network is changed
+    nodelist.AddSlaveNode("Second", 3, 'slave.eds')
+    nodelist.SaveNodeList('net2')
+    with open('nodelist.cpj', 'r') as f:
+        content = f.read()
+    assert content.startswith(net1 + "[TOPOLOGY]\nNetName=net2\nNodes=0x01\nNode3Present=0x01\n")
+    assert content.count("[TOPOLOGY]") == 2
+
+    nodelist = NodeList(NodeManager())
+    nodelist.LoadProject('.', netname='net2')
+    assert nodelist.SlaveNodes[3]["Name"] == "Second"
+
+    # A new network is added to the file
+    nodelist.NetworkName = 'net3'
+    nodelist.SaveNodeList('net3')
+    assert CPJFile('nodelist.cpj').GetNetworkNames() == ['net1', 'net2', 'net3']
+
+    # A network saved many times by appending uses its last section, in the
+    # position of the first
+    with open('nodelist.cpj', 'w') as f:
+        f.write(net1 + net2 + net2.replace("net2", "net1"))
+    cpj = CPJFile('nodelist.cpj')
+    assert cpj.GetNetworkNames() == ['net1', 'net2']
+    assert cpj.GetNetwork()["Name"] == 'net1'
+    assert cpj.GetNetwork()["Nodes"] == {}
@@ -1,6 +1,10 @@
 from pprint import pprint
 import os
+import pytest
 from objdictgen.nodemanager import NodeManager
+from objdictgen.node import (
+    DomainToBytes, BytesToDomain, DomainToHex, HexToDomain, DomainToC, LE_to_BE, BE_to_LE,
+)
 
 
 def test_create_master():
@@ -21,3 +25,39 @@ def test_load(basepath):
 
     m1 = NodeManager()
     m1.OpenFileInCurrent(os.path.join(basepath, 'tests', 'od', 'master.od'))
+
+
+def test_domain(basepath):
+
+    m1 = NodeManager()
+    m1.OpenFileInCurrent(os.path.join(basepath, 'tests', 'od', 'alltypes.json'))
+
+    # DOMAIN values are edited as hex strings in the UI
+    values, editors = m1.GetCurrentEntryValues(0x200F)
+    assert values[0]["value"] == "4041424344"
+    assert editors[0]["value"] == "domain"
+
+    m1.SetCurrentEntry(0x200F, 0, "a00ff", "value", "domain")
+    assert m1.CurrentNode.GetEntry(0x200F, 0) == "\x0a\x00\xff"
+    values, _ = m1.GetCurrentEntryValues(0x200F)
+    assert values[0]["value"] == "0a00ff"
+
+    with pytest.raises(ValueError):
+        m1.SetCurrentEntry(0x200F, 0, "xyz", "value", "domain")
+
+
+def test_domain_codec():
+
+    value = "".join(chr(i) for i in range(256))
+    assert DomainToBytes(value) == bytes(bytearray(range(256)))
+    assert BytesToDomain(bytearray(range(256))) == value
+    assert BytesToDomain(memoryview(DomainToBytes(value))) == value
+    assert HexToDomain(DomainToHex(value)) == value
+    assert DomainToC("\x00A\xff") == "\\x00\\x41\\xff"
+    assert LE_to_BE(0x1234, 4) == "\x34\x12\x00\x00"
+    assert BE_to_LE("\x34\x12\x00\x00") == 0x1234
+
+    # Characters above 0xff can't be converted to bytes
+    for fn in (DomainToBytes, DomainToHex, DomainToC):
+        with pytest.raises(ValueError, match="position 1 is not a byte"):
+            fn(u"a\u1234")
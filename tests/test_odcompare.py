@@ -1,4 +1,6 @@
 import copy
+import io
+import json
 import shutil
 import re
 import os
@@ -6,7 +8,11 @@ import sys
 from collections import OrderedDict
 import pytest
 
+import objdictgen
 from objdictgen import Node
+from objdictgen import jsonod
+from objdictgen import maps
+from objdictgen import snapshot
 
 if sys.version_info[0] >= 3:
     ODict = dict
@@ -158,6 +164,23 @@ def test_jsonexport(wd, odfile):
     assert m1.__dict__ == m2.__dict__
 
 
+def test_jsonexport_nocopy(odfile):
+    ''' Test that the JSON export, which reads the node data without making
+        copies of it, doesn't modify the node or the built-in mappings.
+    '''
+    m1 = Node.LoadFile(odfile + '.od')
+    m1.Validate(fix=True)
+
+    m0 = copy.deepcopy(m1)
+    mapping = copy.deepcopy(maps.MAPPING_DICTIONARY)
+
+    m1.DumpJson()
+    m1.DumpJson(compact=True)
+
+    assert m0.__dict__ == m1.__dict__
+    assert mapping == maps.MAPPING_DICTIONARY
+
+
 def test_cexport(wd, odfile, fn):
     ''' Test that the file can be exported to c and that the loaded file
         is equal to the stored template (if present).
@@ -232,6 +255,186 @@ def test_edsimport(wd, odfile):
     # assert a == b
 
 
+def test_edsparse(wd):
+    ''' Test the parsing of the EDS sections and assignments '''
+    from objdictgen import eds_utils
+
+    with open('test.eds', 'w') as f:
+        f.write(
+            "; Lines before the first section are ignored\n"
+            "[FileInfo]\n"
+            "FileName=test.eds\n"
+            "; Comment\n"
+            "\n"
+            "[Ignored Section]\n"
+            "Not an assignment\n"
+            "[2001sub0] \n"
+            "ParameterName=Count\n"
+            "DataType=0x0005\n"
+            "AccessType=ro\n"
+            "DefaultValue=010\n"
+            "[2000ObjectLinks]\n"
+            "ObjectLinks=1\n"
+            "[2000]\n"
+            "ParameterName=Var\n"
+            "DataType=0x0007\n"
+            "AccessType=rw\n"
+            "DefaultValue=$NODEID+0x100\n"
+            "LowLimit=\n"
+            "[2001]\n"
+            "ParameterName=Array\n"
+            "ObjectType=0x8\n"
+            "SubNumber=1\n"
+        )
+
+    eds = eds_utils.ParseEDSFile('test.eds')
+    assert eds == {
+        'FILEINFO': {'FILENAME': 'test.eds'},
+        0x2000: {
+            'subindexes': {}, 'PARAMETERNAME': 'Var', 'OBJECTTYPE': 7,
+            'DATATYPE': 7, 'ACCESSTYPE': 'rw', 'DEFAULTVALUE': '"$NODEID+0x100"',
+        },
+        0x2001: {
+            'subindexes': {0: {
+                'PARAMETERNAME': 'Count', 'OBJECTTYPE': 7, 'DATATYPE': 5,
+                'ACCESSTYPE': 'ro', 'DEFAULTVALUE': 8,
+            }},
+            'PARAMETERNAME': 'Array', 'OBJECTTYPE': 8, 'SUBNUMBER': 1,
+        },
+    }
+
+    with open('test.eds', 'a') as f:
+        f.write("[2000]\nParameterName=Again\n")
+    with pytest.raises(ValueError, match="defined two times"):
+        eds_utils.ParseEDSFile('test.eds')
+
+    with open('test.eds', 'w') as f:
+        f.write("[2000]\nParameterName=Var\nDataType=0x0007\nAccessType=rw\nPDOMapping\n")
+    with pytest.raises(ValueError, match="not a valid EDS line"):
+        eds_utils.ParseEDSFile('test.eds')
+
+
+def test_edsnode(wd):
+    ''' Test the node generated from the EDS entries '''
+    from objdictgen import eds_utils
+
+    with open('test.eds', 'w') as f:
+        f.write(
+            "[1000]\nParameterName=Device Type\nDataType=0x0007\nAccessType=ro\n"
+            "[2000]\nParameterName=Var\nDataType=0x0007\nAccessType=rw\n"
+            "[2001]\nParameterName=Record\nObjectType=0x9\nSubNumber=2\n"
+            "[2001sub1]\nParameterName=First\nDataType=0x0009\nAccessType=rw\n"
+            "[2001sub3]\nParameterName=Third\nDataType=0x0006\nAccessType=ro\n"
+            "DefaultValue=0x20\nPDOMapping=1\n"
+        )
+
+    node = eds_utils.GenerateNode('test.eds')
+    assert node.GetEntry(0x1000) == 0
+    assert node.GetEntry(0x2000) == 0
+    assert node.GetEntry(0x2001) == [3, "", 0, 0x20]
+    assert [v["name"] for v in node.UserMapping[0x2001]["values"]] == [
+        "Number of Entries", "First", "Compatibility Entry", "Third",
+    ]
+    assert node.GetSubentryInfos(0x2001, 3)["pdo"]
+    assert 0x1000 not in node.UserMapping
+
+
+def test_edscache(wd, oddir, monkeypatch):
+    ''' Test the cache of the nodes generated from EDS files '''
+    from objdictgen import eds_utils
+
+    for name in ('master', 'slave'):
+        m0 = Node.LoadFile(os.path.join(oddir, name + '.od'))
+        m0.DumpFile(name + '.eds', filetype='eds')
+
+    m1 = eds_utils.GenerateNode('master.eds', cachedir='cache')
+    assert len(os.listdir('cache')) == 1
+
+    # The node is loaded from the cache without parsing the file
+    def fail(*args):
+        raise AssertionError("Node not loaded from the cache")
+    with monkeypatch.context() as m:
+        m.setattr(eds_utils, 'BuildNode', fail)
+        m2 = eds_utils.GenerateNode('master.eds', cachedir='cache')
+    assert m1.__dict__ == m2.__dict__
+
+    # The least recently used node is removed when the cache is full
+    monkeypatch.setattr(eds_utils, 'EDS_CACHE_SIZE', 1)
+    eds_utils.GenerateNode('slave.eds', cachedir='cache')
+    assert len(os.listdir('cache')) == 1
+    with pytest.raises(AssertionError):
+        with monkeypatch.context() as m:
+            m.setattr(eds_utils, 'BuildNode', fail)
+            eds_utils.GenerateNode('master.eds', cachedir='cache')
+
+
+def test_edscache_profile(wd, oddir, monkeypatch):
+    ''' Test that the cached EDS nodes depend on the profile directories '''
+    from objdictgen import node as nodemod, eds_utils
+
+    m0 = Node.LoadFile(os.path.join(oddir, 'master-ds401.od'))
+    # The device type selects the DS-401 profile when the EDS is read
+    m0.SetEntry(0x1000, 0, 401)
+    m0.DumpFile('master.eds', filetype='eds')
+
+    # The profile is not found, which is silently ignored
+    os.mkdir('profiles')
+    monkeypatch.setattr(objdictgen, 'PROFILE_DIRECTORIES', [os.path.abspath('profiles')])
+    with nodemod.RecordInputFiles() as inputfiles:
+        m1 = eds_utils.GenerateNode('master.eds', cachedir='cache')
+    assert m1.ProfileName == 'DS-301'
+    assert inputfiles.missing == [os.path.abspath(os.path.join('profiles', 'DS-401.prf'))]
+
+    # Adding the missing profile invalidates the cached node
+    shutil.copy(os.path.join(objdictgen.SCRIPT_DIRECTORY, 'config', 'DS-401.prf'), 'profiles')
+    m2 = eds_utils.GenerateNode('master.eds', cachedir='cache')
+    assert m2.ProfileName == 'DS-401'
+    assert len(os.listdir('cache')) == 1
+
+    # Other profile directories give another cache entry
+    os.mkdir('other')
+    monkeypatch.setattr(objdictgen, 'PROFILE_DIRECTORIES', [os.path.abspath('other')])
+    m3 = eds_utils.GenerateNode('master.eds', cachedir='cache')
+    assert m3.ProfileName == 'DS-301'
+    assert len(os.listdir('cache')) == 2
+
+
+def test_nodecache(wd, oddir, monkeypatch):
+    ''' Test that the cached nodes are reloaded when a profile changes '''
+    from objdictgen import node as nodemod
+
+    m0 = Node.LoadFile(os.path.join(oddir, 'master-ds401.od'))
+    # The device type selects the DS-401 profile when the EDS is read
+    m0.SetEntry(0x1000, 0, 401)
+    m0.DumpFile('master.eds', filetype='eds')
+
+    os.mkdir('profiles')
+    shutil.copy(os.path.join(objdictgen.SCRIPT_DIRECTORY, 'config', 'DS-401.prf'), 'profiles')
+    monkeypatch.setattr(objdictgen, 'PROFILE_DIRECTORIES', [os.path.abspath('profiles')])
+    monkeypatch.setattr(nodemod, 'NODE_CACHE', {})
+
+    m1 = Node.LoadFile('master.eds')
+
+    # The node is loaded from the cache without reading the file
+    def fail(filepath):
+        raise AssertionError("{} was read".format(filepath))
+    with monkeypatch.context() as m:
+        m.setattr(Node, 'ReadFile', staticmethod(fail))
+        m2 = Node.LoadFile('master.eds')
+        assert m1.__dict__ == m2.__dict__
+
+        # A changed profile is read again
+        st = os.stat(os.path.join('profiles', 'DS-401.prf'))
+        os.utime(os.path.join('profiles', 'DS-401.prf'), (st.st_atime, st.st_mtime + 10))
+        with pytest.raises(AssertionError, match="was read"):
+            Node.LoadFile('master.eds')
+
+    # Only the most recently used nodes are kept
+    monkeypatch.setattr(nodemod, 'NODE_CACHE_SIZE', 1)
+    Node.LoadFile(os.path.join(oddir, 'master.json'))
+    assert [key[0] for key in nodemod.NODE_CACHE] == [os.path.join(oddir, 'master.json')]
+
+
 def test_jsonimport(wd, odfile):
     ''' Test that JSON files can be exported and read back. It will be
         compared with orginal contents.
@@ -258,6 +461,172 @@ def test_jsonimport(wd, odfile):
     assert a == b
 
 
+@pytest.mark.parametrize("compact", [False, True])
+def test_jsonstream(wd, odfile, compact):
+    ''' Test that the streamed JSON file output is identical to the JSON
+        string output.
+        L(od) -> fix -> S(json), json == DumpJson()
+    '''
+    od = odfile.name
+
+    m1 = Node.LoadFile(odfile + '.od')
+
+    # Need this to fix any incorrect ODs which cause import error
+    m1.Validate(fix=True)
+
+    m1.DumpFile(od + '.json', filetype='json', compact=compact)
+    text = m1.DumpJson(compact=compact)
+
+    with open(od + '.json', 'r') as f:
+        data = f.read()
+
+    # The timestamps will differ between the two
+    RE_DATE = re.compile(r'"\$date": ?"[^"]*"')
+    assert RE_DATE.sub('', data) == RE_DATE.sub('', text)
+
+
+def test_jsonstream_fail(wd, oddir):
+    ''' Test that a failed JSON export keeps the existing file '''
+
+    m1 = Node.LoadFile(os.path.join(oddir, 'master.od'))
+    m1.DumpFile('master.json', filetype='json')
+    with open('master.json', 'r') as f:
+        data = f.read()
+
+    m1.Dictionary[0x1018] = None
+    with pytest.raises(Exception):
+        m1.DumpFile('master.json', filetype='json')
+
+    with open('master.json', 'r') as f:
+        assert f.read() == data
+    assert os.listdir('.') == ['master.json']
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_json_backend(odfile, compact, monkeypatch):
+    ''' Test that the JSON backends produce identical output '''
+    if not jsonod.ORJSON_INSTALLED:
+        pytest.skip("orjson not installed")
+
+    m1 = Node.LoadFile(odfile + '.od')
+
+    # Need this to fix any incorrect ODs which cause import error
+    m1.Validate(fix=True)
+
+    monkeypatch.setattr(jsonod, 'JSON_BACKEND', 'json')
+    text1 = m1.DumpJson(compact=compact)
+    monkeypatch.setattr(jsonod, 'JSON_BACKEND', 'orjson')
+    text2 = m1.DumpJson(compact=compact)
+
+    # The timestamps will differ between the two
+    RE_DATE = re.compile(r'"\$date": ?"[^"]*"')
+    assert RE_DATE.sub('', text1) == RE_DATE.sub('', text2)
+
+    m2 = Node.LoadJson(text2)
+    monkeypatch.setattr(jsonod, 'JSON_BACKEND', 'json')
+    m3 = Node.LoadJson(text2)
+
+    assert m2.__dict__ == m3.__dict__
+
+
+def test_json_backend_load(oddir, monkeypatch):
+    ''' Test that small JSON files are loaded with the JSON backend and
+        large files with the incremental reader
+    '''
+    fa = os.path.join(oddir, 'master.json')
+
+    calls = []
+    json_loads = jsonod.json_loads
+    def _loads(text):
+        calls.append(text)
+        return json_loads(text)
+    monkeypatch.setattr(jsonod, 'json_loads', _loads)
+
+    m1 = Node.ReadFile(fa)
+    assert len(calls) == 1
+
+    monkeypatch.setattr(jsonod, 'STREAM_THRESHOLD', 0)
+    m2 = Node.ReadFile(fa)
+    assert len(calls) == 1
+
+    assert m1.__dict__ == m2.__dict__
+
+
+def test_snapshot(wd, odfile):
+    ''' Test that the node can be stored in a snapshot and be loaded back
+        with identical contents.
+        L(od) -> S(snap), od == L(snap)
+    '''
+    od = odfile.name
+
+    m1 = Node.LoadFile(odfile + '.od')
+    m1.DumpFile(od + '.snap', filetype='snap')
+
+    m2 = Node.LoadFile(od + '.snap')
+
+    assert m1.__dict__ == m2.__dict__
+
+    # The internal format must round-trip exactly
+    RE_DATE = re.compile(r'"\$date": ?"[^"]*"')
+    a = m1.DumpJson(internal=True)
+    b = m2.DumpJson(internal=True)
+    assert RE_DATE.sub('', a) == RE_DATE.sub('', b)
+
+
+def test_snapshot_reject(wd, oddir, monkeypatch):
+    ''' Test that stale and corrupt snapshots are rejected '''
+
+    m1 = Node.LoadFile(os.path.join(oddir, 'master.od'))
+    data = snapshot.GenerateSnapshot(m1)
+
+    with pytest.raises(ValueError, match="Corrupt"):
+        snapshot.LoadSnapshot(data[:-1] + b'\xff')
+
+    with pytest.raises(ValueError, match="Not an OD snapshot"):
+        snapshot.LoadSnapshot(b'x' + data)
+
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_VERSION', snapshot.SNAPSHOT_VERSION + 1)
+    with pytest.raises(ValueError, match="Stale"):
+        snapshot.LoadSnapshot(data)
+    monkeypatch.undo()
+
+    monkeypatch.setattr(objdictgen, 'ODG_VERSION', '0.0')
+    with pytest.raises(ValueError, match="Stale"):
+        snapshot.LoadSnapshot(data)
+
+
+def test_mapfile(wd, oddir, monkeypatch):
+    ''' Test that the files are sniffed and loaded the same when they are
+        memory-mapped
+    '''
+    from objdictgen import node as nodemod, eds_utils
+
+    m0 = Node.LoadFile(os.path.join(oddir, 'master.od'))
+    shutil.copy(os.path.join(oddir, 'master.od'), 'master.od')
+    for filetype in ('json', 'eds', 'snap'):
+        m0.DumpFile('master.' + filetype, filetype=filetype)
+
+    for filetype in ('od', 'json', 'eds', 'snap'):
+        fname = 'master.' + filetype
+        assert nodemod.SniffFile(fname) == {'od': 'xml'}.get(filetype, filetype)
+        m1 = Node.ReadFile(fname)
+        with monkeypatch.context() as m:
+            m.setattr(nodemod, 'MMAP_THRESHOLD', 0)
+            m2 = Node.ReadFile(fname)
+            m3 = eds_utils.GenerateNode('master.eds', cachedir='cache')
+            m4 = eds_utils.GenerateNode('master.eds', cachedir='cache')
+        assert m1.__dict__ == m2.__dict__
+        assert m3.__dict__ == m4.__dict__
+
+    # The errors of a mapped file are reported
+    with open('master.snap', 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b'\xff')
+    monkeypatch.setattr(nodemod, 'MMAP_THRESHOLD', 0)
+    with pytest.raises(ValueError, match="master.snap: Corrupt"):
+        Node.ReadFile('master.snap')
+
+
 def test_od_json_compare(odfile):
     ''' Test reading the od and compare it with the corresponding json file
         L(od) == L(json)
@@ -368,3 +737,318 @@ def test_legacy_compare(oddir, equivs):
 
     a, b = shave_equal(m1, m2, ignore=('Description', 'IndexOrder'))
     assert a == b
+
+
+@pytest.mark.parametrize("chunksize", [None, 1])
+@pytest.mark.parametrize("oddut", [
+    'minimal.json', 'master.json', 'slave.json', 'alltypes.json', 'unicode.json',
+])
+def test_jsonstream_import(oddir, oddut, chunksize, monkeypatch):
+    ''' Test that the incremental JSON reader gives the same result as
+        reading the complete JSON text.
+    '''
+    if chunksize:
+        monkeypatch.setattr(jsonod.JsonStreamReader, 'CHUNKSIZE', chunksize)
+
+    fa = os.path.join(oddir, oddut)
+
+    with open(fa, 'r') as f:
+        m1 = Node.LoadJson(f.read())
+    with open(fa, 'r') as f:
+        m2 = jsonod.GenerateNodeStream(f)
+
+    assert m1.__dict__ == m2.__dict__
+
+    with open(fa, 'r') as f:
+        indexes = [index for index, _ in jsonod.ScanJson(f)]
+
+    assert indexes == m1.IndexOrder
+
+
+def test_jsonstream_import_order(oddir):
+    ''' Test that the incremental JSON reader handles the dictionary
+        preceding the other top-level fields.
+    '''
+    fa = os.path.join(oddir, 'master.json')
+
+    with open(fa, 'r') as f:
+        jd = json.loads(jsonod.remove_jasonc(f.read()))
+
+    m1 = Node.LoadJson(json.dumps(jd))
+
+    jd = ODict([('dictionary', jd.pop('dictionary'))] + list(jd.items()))
+    m2 = jsonod.GenerateNodeStream(io.StringIO(json.dumps(jd)))
+
+    assert m1.__dict__ == m2.__dict__
+
+
+def test_jsonstream_import_trailing(oddir):
+    ''' Test that the incremental JSON reader uses the optional top-level
+        fields following the dictionary.
+    '''
+    fa = os.path.join(oddir, 'master.json')
+
+    with open(fa, 'r') as f:
+        jd = json.loads(jsonod.remove_jasonc(f.read()))
+
+    jd.pop('id', None)
+    jd.pop('default_string_size', None)
+    jd = ODict(list(jd.items()) + [('id', 42), ('default_string_size', 17)])
+    text = json.dumps(jd)
+
+    m1 = Node.LoadJson(text)
+    m2 = jsonod.GenerateNodeStream(io.StringIO(text))
+
+    assert (m2.ID, m2.DefaultStringSize) == (42, 17)
+    assert m1.__dict__ == m2.__dict__
+
+
+@pytest.mark.parametrize("chunksize", [None, 1, 100])
+def test_jsonstream_error(oddir, chunksize, monkeypatch):
+    ''' Test that the JSON errors of the incremental reader have the
+        position in the file.
+    '''
+    if chunksize:
+        monkeypatch.setattr(jsonod.JsonStreamReader, 'CHUNKSIZE', chunksize)
+
+    with open(os.path.join(oddir, 'master.json'), 'r') as f:
+        lines = f.read().split('\n')
+    lines[79] += ' @'
+    text = '\n'.join(lines)
+
+    with pytest.raises(ValueError) as ref:
+        json.loads(jsonod.remove_jasonc(text))
+    with pytest.raises(ValueError) as exc:
+        list(jsonod.read_json_iter(io.StringIO(text)))
+    assert str(exc.value) == str(ref.value)
+    assert 'line 80 ' in str(exc.value)
+
+
+def test_jsonstream_comments():
+    ''' Test the detection of the /* */ comments spanning lines '''
+    reader = jsonod.JsonStreamReader(io.StringIO(''))
+    assert not reader.in_comment('"a": "/* no comment", // /*\n', False)
+    assert reader.in_comment('"a": 1, /* comment\n', False)
+    assert reader.in_comment('still comment\n', True)
+    assert not reader.in_comment('end */ "b": "/*",\n', True)
+
+    text = '{\n"a": "/*",\n/* x\n */ "b": 2\n}\n'
+    reader = jsonod.JsonStreamReader(io.StringIO(text), chunksize=1)
+    reader.expect('{')
+    assert reader.value() == 'a'
+    # The string doesn't prevent reading the file in chunks
+    assert not reader.eof
+    assert list(jsonod.read_json_iter(io.StringIO(text))) == [('a', '/*'), ('b', 2)]
+
+
+def test_jsonstream_import_interleaved(oddir, monkeypatch):
+    ''' Test that the incremental JSON reader converts the entries while
+        the file is read.
+    '''
+    monkeypatch.setattr(jsonod.JsonStreamReader, 'CHUNKSIZE', 1)
+
+    with open(os.path.join(oddir, 'master.json'), 'r') as f:
+        lines = f.readlines()
+
+    class Reader(object):
+        ''' File object counting the lines read '''
+        count = 0
+
+        def __iter__(self):
+            while self.count < len(lines):
+                self.count += 1
+                yield lines[self.count - 1]
+
+    reader = Reader()
+    converted = []
+    node_fromdict_entry = jsonod.node_fromdict_entry
+
+    def _entry(node, obj, *args, **kw):
+        converted.append(reader.count)
+        return node_fromdict_entry(node, obj, *args, **kw)
+    monkeypatch.setattr(jsonod, 'node_fromdict_entry', _entry)
+
+    m1 = jsonod.GenerateNodeStream(reader)
+
+    assert len(converted) == len(m1.IndexOrder)
+    # Each entry is converted before the next one is read
+    assert converted == sorted(converted)
+    assert converted[0] < converted[-1] < len(lines)
+
+
+@pytest.mark.parametrize("as_dict", [True, False])
+def test_diff_nodes(oddir, as_dict):
+    ''' Test that the diff reports structured changes per index '''
+    fa = os.path.join(oddir, 'master.json')
+
+    m1 = Node.LoadFile(fa)
+    m2 = Node.LoadFile(os.path.join(oddir, 'master.od'))
+    assert jsonod.diff_nodes(m1, m2, as_dict=as_dict) == {}
+
+    m2 = Node.LoadFile(fa)
+    m2.Name = 'Other'
+    m2.Dictionary[0x1018][1] = 42
+    m2.Dictionary[0x1006] = 42
+    del m2.Dictionary[0x1001]
+    diffs = jsonod.diff_nodes(m1, m2, as_dict=as_dict)
+
+    assert set(diffs) == {'', 0x1001, 0x1006, 0x1018}
+
+    change, = diffs['']
+    assert change.chtype == 'values_changed'
+    assert change.keys[-1] in ('name', 'Name')
+    assert (change.t1, change.t2) == ('Master', 'Other')
+
+    change, = diffs[0x1018]
+    assert change.chtype == 'values_changed'
+    assert change.path in ("['sub'][2]['value']", "['Dictionary'][1]")
+    assert (change.t1, change.t2) == (0, 42)
+
+    change, = diffs[0x1006]
+    assert change.chtype == 'dictionary_item_added'
+    assert change.keys == ()
+    assert change.t1 is None
+
+    change, = diffs[0x1001]
+    assert change.chtype == 'dictionary_item_removed'
+    assert change.t2 is None
+
+
+@pytest.mark.parametrize("as_dict", [True, False])
+def test_diff_nodes_brief(oddir, as_dict):
+    ''' Test that the brief diff stops at the first difference '''
+    fa = os.path.join(oddir, 'master.json')
+
+    m1 = Node.LoadFile(fa)
+    m2 = Node.LoadFile(fa)
+    assert jsonod.diff_nodes(m1, m2, as_dict=as_dict, brief=True) == {}
+
+    m2.Dictionary[0x1018][1] = 42
+    m2.Dictionary[0x1006] = 42
+    assert jsonod.diff_nodes(m1, m2, as_dict=as_dict, brief=True) == {0x1006: []}
+
+    m2.Name = 'Other'
+    assert jsonod.diff_nodes(m1, m2, as_dict=as_dict, brief=True) == {'': []}
+
+
+def test_diff_corpus(oddir, tmp_path, monkeypatch):
+    ''' Test the comparison of many files and the fingerprint cache '''
+    files = [os.path.join(oddir, fn) for fn in ('master.json', 'master.od', 'slave.json')]
+    cachedir = str(tmp_path / 'cache')
+
+    diffs = jsonod.diff_corpus(files, cachedir=cachedir, processes=2)
+    assert len(os.listdir(cachedir)) == 3
+    assert 0x1200 in diffs
+    assert set(change.keys for changes in diffs.values() for change in changes) == {(files[2],)}
+
+    change, = diffs[0x1200]
+    assert change.chtype == 'dictionary_item_added'
+    assert change.t1 is None
+
+    # All fingerprints are taken from the cache on the second run
+    def fail(args):
+        raise AssertionError("{} was loaded".format(args[0]))
+    monkeypatch.setattr(jsonod, 'file_fingerprints', fail)
+
+    assert jsonod.diff_corpus(files, cachedir=cachedir) == diffs
+    assert jsonod.diff_corpus(files[:2], cachedir=cachedir) == {}
+
+    # The least recently used fingerprints are removed when the cache is full
+    monkeypatch.undo()
+    monkeypatch.setattr(jsonod, 'CORPUS_CACHE_SIZE', 2)
+    jsonod.diff_corpus(files[:2], validate=False, cachedir=cachedir)
+    assert len(os.listdir(cachedir)) == 2
+
+
+
+def test_diff_corpus_profile(wd, oddir, monkeypatch):
+    ''' Test that the cached fingerprints are not used when a profile used
+        by the file changes
+    '''
+    m0 = Node.LoadFile(os.path.join(oddir, 'master-ds401.od'))
+    # The device type selects the DS-401 profile when the EDS is read
+    m0.SetEntry(0x1000, 0, 401)
+    m0.DumpFile('master.eds', filetype='eds')
+    files = ['master.eds', 'master.eds']
+
+    os.mkdir('profiles')
+    profile = os.path.join('profiles', 'DS-401.prf')
+    shutil.copy(os.path.join(objdictgen.SCRIPT_DIRECTORY, 'config', 'DS-401.prf'), profile)
+    monkeypatch.setattr(objdictgen, 'PROFILE_DIRECTORIES', [os.path.abspath('profiles')])
+
+    assert jsonod.diff_corpus(files, cachedir='cache', processes=1) == {}
+
+    file_fingerprints = jsonod.file_fingerprints
+    loaded = []
+    def _load(args):
+        loaded.append(args[0])
+        return file_fingerprints(args)
+    monkeypatch.setattr(jsonod, 'file_fingerprints', _load)
+
+    jsonod.diff_corpus(files, cachedir='cache', processes=1)
+    assert loaded == []
+
+    st = os.stat(profile)
+    os.utime(profile, (st.st_atime, st.st_mtime + 10))
+    jsonod.diff_corpus(files, cachedir='cache', processes=1)
+    assert loaded == files
+
+
+def test_fingerprint(odfile):
+    ''' Test that the fingerprint depends on the content of the node only '''
+    if not os.path.exists(odfile + '.json'):
+        raise pytest.skip("No .json file for '%s'" %(odfile + '.od'))
+
+    m1 = Node.LoadFile(odfile + '.od')
+    m1.Validate(fix=True)
+    m2 = Node.LoadFile(odfile + '.json')
+    m2.IndexOrder.reverse()
+    keys = set(m2.__dict__)
+
+    fp = m2.Fingerprint()
+    assert m1.Fingerprint() == fp
+    assert m2.Copy().Fingerprint() == fp
+
+    # The fingerprint cache must not be a part of the node data
+    assert set(m2.__dict__) == keys
+
+
+def test_fingerprint_update(oddir):
+    ''' Test that the index fingerprints are updated when the node changes '''
+    m1 = Node.LoadFile(os.path.join(oddir, 'master.json'))
+
+    fp = m1.Fingerprint()
+    fp1018 = m1.GetIndexFingerprint(0x1018)
+    fp1000 = m1.GetIndexFingerprint(0x1000)
+    assert m1.GetIndexFingerprint(0x1006) is None
+
+    m1.SetEntry(0x1018, 1, 42)
+    assert m1.GetIndexFingerprint(0x1018) != fp1018
+    assert m1.GetIndexFingerprint(0x1000) == fp1000
+    assert m1.Fingerprint() != fp
+
+    m1.SetEntry(0x1018, 1, 0)
+    assert m1.GetIndexFingerprint(0x1018) == fp1018
+    assert m1.Fingerprint() == fp
+
+    m1.SetParamsEntry(0x1000, comment="Comment")
+    assert m1.GetIndexFingerprint(0x1000) != fp1000
+
+    m1.RemoveIndex(0x1000)
+    assert m1.GetIndexFingerprint(0x1000) is None
+
+    # Changing the data directly is seen without InvalidateFingerprint()
+    fp = m1.Fingerprint()
+    m1.Dictionary[0x1018][1] = 42
+    assert m1.GetIndexFingerprint(0x1018) != fp1018
+    assert m1.Fingerprint() != fp
+    m1.Dictionary[0x1018][1] = 0
+    assert m1.GetIndexFingerprint(0x1018) == fp1018
+    assert m1.Fingerprint() == fp
+
+    # The display only attributes are not a part of the fingerprint
+    m1.Description = 'Other description'
+    m1.SpecificMenu = []
+    assert m1.Fingerprint() == fp
+    m1.Name = 'Other'
+    assert m1.Fingerprint() != fp
@@ -1,6 +1,12 @@
 import os
+import sys
+import time
+import threading
+import subprocess
 import pytest
-from objdictgen.__main__ import main
+import objdictgen
+from objdictgen import jsonod
+from objdictgen.__main__ import main, run_main
 
 
 @pytest.mark.parametrize("suffix", ['.od', '.json', '.eds'])
@@ -27,3 +33,281 @@ def test_odg_list_wprofile(odfile, suffix, profile):
         'list',
         fname
     ))
+
+
+def test_odg_version(capsys):
+
+    with pytest.raises(SystemExit):
+        main((
+            '--version',
+        ))
+
+    out = capsys.readouterr().out
+    assert objdictgen.ODG_VERSION in out
+    assert jsonod.JSON_BACKEND in out
+
+
+@pytest.mark.parametrize("fn, code", [('master.json', 0), ('slave.json', 1)])
+def test_odg_diff_quiet(oddir, capsys, fn, code):
+
+    with pytest.raises(SystemExit) as exc:
+        main((
+            'diff', '--quiet',
+            os.path.join(oddir, 'master.od'),
+            os.path.join(oddir, fn),
+        ))
+    assert exc.value.code == code
+
+    out = capsys.readouterr().out
+    assert len(out.splitlines()) == 1
+
+
+def test_odg_diff_many(oddir, capsys):
+
+    with pytest.raises(SystemExit) as exc:
+        main((
+            'diff', '--many',
+            os.path.join(oddir, 'master.od'),
+            os.path.join(oddir, 'master.json'),
+            os.path.join(oddir, 'slave.json'),
+        ))
+    assert exc.value.code == 1
+
+    out = capsys.readouterr().out
+    slave = os.path.join(oddir, 'slave.json')
+    assert "1 of 2 files differ" in out
+    assert "'{}' differs".format(slave) in out
+    assert "only in '{}'".format(slave) in out
+    assert "value changed" not in out
+
+
+@pytest.mark.parametrize("epoch, date", [(None, '1970-01-01'), ('1700000000', '2023-11-14')])
+def test_odg_convert_reproducible(oddir, wd, monkeypatch, epoch, date):
+
+    monkeypatch.setattr(objdictgen, 'SOURCE_DATE_EPOCH', epoch)
+
+    for fn, typ in (('out.json', 'json'), ('out.eds', 'eds')):
+        main((
+            'convert', '--reproducible', '-t', typ,
+            os.path.join(oddir, 'master.json'), fn,
+        ))
+
+    with open('out.json', 'r') as f:
+        assert '"$date": "{}T'.format(date) in f.read()
+
+    month, day, year = date[5:7], date[8:], date[:4]
+    with open('out.eds', 'r') as f:
+        assert 'CreationDate={}-{}-{}\n'.format(month, day, year) in f.read()
+
+    # The fixed time is only used by the command
+    assert objdictgen.SOURCE_DATE_EPOCH == epoch
+
+
+def test_odg_convert_bad_epoch(oddir, wd, monkeypatch, capsys):
+
+    monkeypatch.setattr(objdictgen, 'SOURCE_DATE_EPOCH', 'yesterday')
+
+    with pytest.raises(SystemExit) as exc:
+        main(('convert', os.path.join(oddir, 'master.json'), 'out.json'))
+    assert exc.value.code == 2
+    assert "SOURCE_DATE_EPOCH must be an integer number of seconds, not 'yesterday'" in capsys.readouterr().err
+    assert not os.path.exists('out.json')
+
+
+@pytest.mark.parametrize("typ, files", [
+    ('json', ['out.json']),
+    ('c', ['out.c', 'out.h', 'out_objectdefines.h']),
+])
+def test_odg_convert_skip_unchanged(oddir, wd, monkeypatch, capsys, typ, files):
+
+    monkeypatch.setattr(objdictgen, 'SOURCE_DATE_EPOCH', None)
+
+    def convert(fn):
+        main((
+            'convert', '--reproducible', '--skip-unchanged', '-t', typ,
+            os.path.join(oddir, fn), files[0],
+        ))
+        return capsys.readouterr().out
+
+    assert 'unchanged' not in convert('master.json')
+    for fn in files:
+        os.utime(fn, (0, 0))
+
+    assert "'out.{}' unchanged".format(typ) in convert('master.json')
+    assert [os.path.getmtime(fn) for fn in files] == [0] * len(files)
+    assert sorted(os.listdir('.')) == sorted(files)
+
+    assert 'unchanged' not in convert('slave.json')
+    assert os.path.getmtime(files[0]) != 0
+
+
+def test_odg_convert_depfile(oddir, wd):
+
+    od = os.path.join(oddir, 'master.json')
+    main((
+        'convert', '-t', 'c', '--depfile', 'out.d', od, 'out.c',
+    ))
+
+    with open('out.d', 'r') as f:
+        assert f.read() == "out.c out.h out_objectdefines.h: {0}\n\n{0}:\n".format(od)
+
+
+def test_record_input_files():
+
+    with objdictgen.node.RecordInputFiles() as files:
+        with objdictgen.node.RecordInputFiles() as inner:
+            objdictgen.ImportProfile('DS-401')
+        objdictgen.ImportProfile('DS-302')
+
+    assert [os.path.basename(f) for f in inner] == ['DS-401.prf']
+    assert [os.path.basename(f) for f in files] == ['DS-401.prf', 'DS-302.prf']
+    assert not objdictgen.node.INPUT_FILES
+
+
+def test_odg_convert_batch(oddir, wd, capsys):
+
+    with open('manifest', 'w') as f:
+        f.write("# Comment\n\n")
+        f.write("{} out.c -t c\n".format(os.path.join(oddir, 'master.json')))
+        f.write("{} missing.json -t json\n".format(os.path.join(oddir, 'missing.od')))
+        f.write("{} missing2.json -t json -D\n".format(os.path.join(oddir, 'missing.od')))
+        f.write("{} 'out slave.json' -t json --reproducible\n".format(os.path.join(oddir, 'slave.json')))
+
+    with pytest.raises(SystemExit) as exc:
+        main((
+            'convert', '--batch', 'manifest', '-j', '2',
+        ))
+    assert exc.value.code == 1
+
+    assert os.path.exists('out.c')
+    assert not os.path.exists('missing.json')
+    with open('out slave.json', 'r') as f:
+        assert '1970-01-01' in f.read()
+
+    out = capsys.readouterr().out
+    assert "2 of 4 conversions failed" in out
+    assert "missing.od missing.json -t json: " in out
+    assert "missing.od missing2.json -t json -D: " in out
+
+
+@pytest.mark.skipif(not hasattr(__import__('socket'), 'AF_UNIX'), reason="Requires unix sockets")
+def test_odg_serve(oddir, wd, monkeypatch, capsys):
+    from objdictgen import server
+
+    monkeypatch.setattr(objdictgen.node, 'NODE_CACHE', None)
+    sockpath = os.path.join(str(wd), 'odg.sock')
+
+    thread = threading.Thread(target=server.serve, args=(sockpath, run_main))
+    thread.daemon = True
+    thread.start()
+    for _ in range(100):
+        if os.path.exists(sockpath):
+            break
+        time.sleep(0.05)
+
+    # A running server is not replaced, nor is a file which is not a socket
+    with pytest.raises(ValueError, match="already listening"):
+        server.serve(sockpath, run_main)
+    with open('notsock', 'w') as f:
+        f.write('data')
+    with pytest.raises(ValueError, match="not a socket"):
+        server.serve('notsock', run_main)
+    assert os.path.exists('notsock')
+
+    # A client which doesn't send its request doesn't block the server
+    monkeypatch.setattr(server, 'REQUEST_TIMEOUT', 0.1)
+    stalled = server.socket.socket(server.socket.AF_UNIX, server.socket.SOCK_STREAM)
+    stalled.connect(sockpath)
+
+    od = os.path.join(oddir, 'master.json')
+    code, output = server.request(sockpath, ['list', od])
+    assert code == 0
+    assert 'master' in output
+    stalled.close()
+
+    # The second load of the same file uses the cache
+    assert os.path.abspath(od) in [key[0] for key in objdictgen.node.NODE_CACHE]
+    code, output2 = server.request(sockpath, ['list', od])
+    assert code == 0
+    assert output2 == output
+
+    code, output = server.request(sockpath, ['list', 'missing.json'])
+    assert code != 0
+
+    # Errors raised with -D are replied with the traceback
+    code, output = server.request(sockpath, ['convert', 'missing.json', 'out.json', '-D'])
+    assert code == 1
+    assert 'Traceback' in output
+
+    # The environment of the client is used by the command
+    epoch = objdictgen.SOURCE_DATE_EPOCH
+    monkeypatch.setenv('SOURCE_DATE_EPOCH', '1700000000')
+    code, output = server.request(sockpath, ['convert', '--reproducible', od, 'epoch.json', '-t', 'json'])
+    assert code == 0
+    with open('epoch.json', 'r') as f:
+        assert '2023-11-14' in f.read()
+    assert objdictgen.SOURCE_DATE_EPOCH == epoch
+
+    # The client forwards the commands to the server
+    monkeypatch.setenv('ODG_SERVER', sockpath)
+    monkeypatch.setattr(sys, 'argv', ['odg', 'convert', od, 'out.json', '-t', 'json'])
+    with pytest.raises(SystemExit) as exc:
+        main()  # pylint: disable=no-value-for-parameter
+    assert exc.value.code == 0
+    assert os.path.exists('out.json')
+
+    # and runs them locally if the server is not available
+    monkeypatch.setenv('ODG_SERVER', os.path.join(str(wd), 'missing.sock'))
+    monkeypatch.setattr(sys, 'argv', ['odg', 'list', od])
+    main()  # pylint: disable=no-value-for-parameter
+    assert 'master' in capsys.readouterr().out
+
+    # or if the server doesn't reply
+    badpath = os.path.join(str(wd), 'bad.sock')
+    bad = server.socket.socket(server.socket.AF_UNIX, server.socket.SOCK_STREAM)
+    bad.bind(badpath)
+    bad.listen(1)
+    def _close():
+        conn, _ = bad.accept()
+        conn.close()
+    closer = threading.Thread(target=_close)
+    closer.start()
+    monkeypatch.setenv('ODG_SERVER', badpath)
+    main()  # pylint: disable=no-value-for-parameter
+    closer.join()
+    bad.close()
+    assert 'master' in capsys.readouterr().out
+
+
+# Modules which are slow to import and must only be imported when needed
+LAZY_MODULES = [
+    'jsonschema', 'deepdiff', 'attr', 'multiprocessing', 'concurrent.futures',
+    'socket', 'objdictgen.server', 'orjson', 'wx',
+    'objdictgen.gen_cfile', 'objdictgen.nosis.pickle',
+]
+
+# Budget for the import time of the odg command in microseconds. The time
+# depends on the machine, so it is only checked when ODG_IMPORT_BUDGET is set.
+IMPORT_BUDGET = os.environ.get('ODG_IMPORT_BUDGET')
+
+
+def test_odg_importtime():
+
+    res = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import objdictgen.__main__'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+        check=True,
+    )
+
+    # Lines are "import time: self [us] | cumulative | imported package"
+    imports = {}
+    for line in res.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                imports[name.strip()] = int(cumulative)
+
+    assert 'objdictgen.__main__' in imports
+    assert not [m for m in LAZY_MODULES if m in imports]
+    if IMPORT_BUDGET:
+        assert imports['objdictgen.__main__'] < int(IMPORT_BUDGET)